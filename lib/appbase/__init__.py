@@ -1,9 +1,9 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-CUI Application Package
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-__all__ = ["app", "option", "prompt"]
+﻿# -*- coding: utf_8 -*-
+u"""
+CUI Application Package
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+__all__ = ["app", "option", "prompt"]
@@ -1,9 +1,9 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-LiveAlive Application Package
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-__all__ = ["app", "option", "const", "plugin"]
+﻿# -*- coding: utf_8 -*-
+u"""
+LiveAlive Application Package
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+__all__ = ["app", "option", "const", "plugin"]
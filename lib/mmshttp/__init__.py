@@ -1,9 +1,11 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-MMS-HTTP Protocol Support Package
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-__all__ = ["server", "client", "source", "packet", "asf"]
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Protocol Support Package
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+__all__ = ["server", "asyncserver", "client", "source", "packet", "ring",
+           "shared", "registry", "admission", "asf", "stats", "failover",
+           "infocache", "jitter"]
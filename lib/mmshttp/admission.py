@@ -0,0 +1,402 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Admission Policy Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+MMSHTTPServer が新しい接続を受け付けるかどうかを判断するポリシー.
+サーバーは登録されているポリシーを順番に調べ, 1つでも受け付けない場合は
+max_handler で 503 Service Unavailable を返す.
+"""
+
+from multiprocessing.sharedctypes import RawArray, RawValue
+import multiprocessing
+import threading
+import logging
+import ctypes
+import time
+
+__all__ = ["AdmissionPolicy", "ClientMaxPolicy", "BandwidthPolicy",
+           "DelayPolicy", "RatePolicy", "AddressRatePolicy",
+           "AddressMaxPolicy", "TokenBucket", "AddressCounter",
+           "SharedAddressCounter"]
+
+#-------------------------------------------------------------------------------
+# TokenBucket
+#-------------------------------------------------------------------------------
+
+class TokenBucket(object):
+    u"""
+    1秒間に rate 個ずつ, 最大 burst 個までトークンが溜まるバケツ.
+    """
+
+    def __init__(self, rate, burst = 0):
+        self.rate    = float(rate)
+        self.burst   = max(float(burst or rate), 1.0)
+        self.tokens  = self.burst
+        self.updated = time.time()
+
+    def consume(self, n = 1):
+        u"""トークンを n 個取り出す. 足りない場合は偽を返す."""
+        now = time.time()
+        self.tokens  = min(self.burst,
+                           self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens < n:
+            return False
+        self.tokens -= n
+        return True
+
+    def is_full(self):
+        u"""トークンが最大まで溜まっているかどうかを返す."""
+        elapsed = time.time() - self.updated
+        return self.tokens + elapsed * self.rate >= self.burst
+
+#-------------------------------------------------------------------------------
+# AddressCounter
+#-------------------------------------------------------------------------------
+
+class AddressCounter(object):
+    u"""
+    IP アドレス毎の接続数を数えるクラス.
+    """
+
+    def __init__(self):
+        self.counts  = { }
+        self.lockobj = threading.Lock()
+
+    def reserve(self, ip, limit):
+        u"""
+        ip の接続数が limit 未満なら1つ増やして真を返す.
+        limit に達している場合は増やさずに偽を返す.
+        """
+        self.lockobj.acquire()
+        try:
+            count = self.counts.get(ip, 0)
+            if count >= limit: return False
+            self.counts[ip] = count + 1
+            return True
+        finally:
+            self.lockobj.release()
+
+    def release(self, ip):
+        u"""reserve() で増やした ip の接続数を1つ減らす."""
+        self.lockobj.acquire()
+        try:
+            count = self.counts.get(ip, 0)
+            if count > 1:
+                self.counts[ip] = count - 1
+            else:
+                self.counts.pop(ip, None)
+        finally:
+            self.lockobj.release()
+
+    def count(self, ip):
+        u"""ip の接続数を返す."""
+        return self.counts.get(ip, 0)
+
+class SharedAddressCounter(AddressCounter):
+    u"""
+    IP アドレス毎の接続数を共有メモリで数えて, fork した
+    ワーカープロセスと共有するクラス.
+
+    IP アドレスのハッシュ値をキーにした, 大きさ slots のオープンアドレス法の
+    ハッシュテーブルを使う. 接続数が 0 になったスロットは他の IP アドレスに
+    使い回す. 空いているスロットがない場合は接続を受け付けない.
+    """
+
+    def __init__(self, slots = 4096):
+        self.keys    = RawArray("l", slots)     # 0 は空きスロット
+        self.counts  = RawArray("i", slots)
+        self.lockobj = multiprocessing.Lock()
+
+    def key(self, ip):
+        u"""ip のハッシュテーブルのキーを返す."""
+        return hash(ip) or 1
+
+    def find(self, key):
+        u"""
+        key のスロットの位置を返す. ない場合は key に使えるスロットの位置を,
+        それもない場合は -1 を返す.
+        """
+        size = len(self.keys)
+        free = -1
+        i = key % size
+        for n in xrange(size):
+            k = self.keys[i]
+            if k == key: return i
+            if free < 0 and not self.counts[i]: free = i
+            if not k: break
+            i = (i + 1) % size
+        return free
+
+    def reserve(self, ip, limit):
+        key = self.key(ip)
+        self.lockobj.acquire()
+        try:
+            i = self.find(key)
+            if i < 0:
+                logging.warning("SharedAddressCounter has no slot for %s." % ip)
+                return False
+            if self.keys[i] != key:
+                self.keys[i]   = key
+                self.counts[i] = 0
+            if self.counts[i] >= limit: return False
+            self.counts[i] += 1
+            return True
+        finally:
+            self.lockobj.release()
+
+    def release(self, ip):
+        key = self.key(ip)
+        self.lockobj.acquire()
+        try:
+            i = self.find(key)
+            if i >= 0 and self.keys[i] == key and self.counts[i] > 0:
+                self.counts[i] -= 1
+        finally:
+            self.lockobj.release()
+
+    def count(self, ip):
+        key = self.key(ip)
+        self.lockobj.acquire()
+        try:
+            i = self.find(key)
+            if i >= 0 and self.keys[i] == key: return self.counts[i]
+            return 0
+        finally:
+            self.lockobj.release()
+
+#-------------------------------------------------------------------------------
+# AdmissionPolicy
+#-------------------------------------------------------------------------------
+
+class AdmissionPolicy(object):
+    u"""
+    新しい接続を受け付けるかどうかを判断するポリシーの基底クラス.
+    """
+
+    # 受け付けない理由
+    reason = "Service Unavailable"
+
+    # 空くまで待たせてもよいかどうか
+    # 偽の場合は待たせずにすぐに断る
+    queueable = True
+
+    def __str__(self):
+        return self.__class__.__name__
+
+    def admit(self, server, client_address):
+        u"""
+        client_address からの接続を受け付ける場合は真を返す.
+        接続数などを確保した場合は release() で解放する.
+        """
+        return True
+
+    def release(self, server, client_address):
+        u"""
+        admit() で受け付けた client_address からの接続が閉じられたか,
+        後のポリシーが受け付けなかった時に呼ばれる.
+        admit() で確保したものを解放する.
+        """
+        pass
+
+    def admit_stream(self, server, connection):
+        u"""
+        接続 connection でストリーミングの配信を開始してよい場合は真を返す.
+        リクエストのパスで振り分けたソースのビットレート (bps) が
+        connection.bitrate に入っている.
+        """
+        return True
+
+    def release_stream(self, server, connection):
+        u"""
+        admit_stream() で受け付けた, ビットレートが分かるストリーミングの
+        接続が取り除かれたか, 後のポリシーが受け付けなかった時に呼ばれる.
+        admit_stream() で確保したものを解放する.
+        """
+        pass
+
+    def share(self):
+        u"""
+        ワーカープロセスで配信する場合に, 状態をワーカープロセス全体で
+        共有するようにする. fork する前に呼ぶこと.
+        """
+        pass
+
+class ClientMaxPolicy(AdmissionPolicy):
+    u"""
+    接続数がサーバーの client_max に達している場合は受け付けない.
+    """
+
+    reason = "Too Many Clients"
+
+    def admit(self, server, client_address):
+        return server.total_client_num() < server.client_max
+
+class BandwidthPolicy(AdmissionPolicy):
+    u"""
+    配信中のストリーミングのビットレートの合計で見積もった送信量が
+    maxrate (bps) を超える場合は受け付けない.
+    同じインスタンスを追加した全てのサーバーの合計に適用される.
+
+    ビットレートはリクエストのパスで振り分けたソースで決まるので,
+    ストリーミングを開始する時に admit_stream() で調べて確保する.
+    接続を受け付ける時は, 既に上限に達しているかどうかだけを調べる.
+    ビットレートが分からないストリーミングは受け付ける.
+    """
+
+    reason = "Bandwidth Limit Exceeded"
+
+    def __init__(self, maxrate):
+        self.maxrate = maxrate
+        self.total   = ctypes.c_double(0)   # 確保したビットレートの合計
+        self.lockobj = threading.Lock()
+
+    def admit(self, server, client_address):
+        return self.total.value < self.maxrate
+
+    def admit_stream(self, server, connection):
+        if not connection.bitrate: return True
+        self.lockobj.acquire()
+        try:
+            if self.total.value + connection.bitrate > self.maxrate:
+                return False
+            self.total.value += connection.bitrate
+            return True
+        finally:
+            self.lockobj.release()
+
+    def release_stream(self, server, connection):
+        if not connection.bitrate: return
+        self.lockobj.acquire()
+        try:
+            self.total.value = max(0.0, self.total.value - connection.bitrate)
+        finally:
+            self.lockobj.release()
+
+    def share(self):
+        self.total   = RawValue("d", 0)
+        self.lockobj = multiprocessing.Lock()
+
+class DelayPolicy(AdmissionPolicy):
+    u"""
+    スケジューリングの遅れが maxdelay 秒を超えている場合は受け付けない.
+
+    別スレッドで interval 秒ずつ眠り, 実際に起きるまでにかかった時間との
+    差を遅れとして測る. CPU や GIL が混み合っているとこの遅れが大きくなる.
+    """
+
+    reason = "Server Too Busy"
+
+    # 遅れの移動平均に使う最新の値の重み
+    weight = 0.2
+
+    def __init__(self, maxdelay, interval = 0.1):
+        self.maxdelay = maxdelay
+        self.interval = interval
+        self.delay    = 0.0
+        self.thread   = None
+
+    def admit(self, server, client_address):
+        self.start()
+        return self.delay <= self.maxdelay
+
+    def start(self):
+        u"""遅れを測るスレッドを開始する."""
+        if self.thread: return
+        t = threading.Thread(target = self.monitor_thread_proc)
+        t.setName(str(self))
+        t.setDaemon(1)
+        t.start()
+        self.thread = t
+
+    def monitor_thread_proc(self):
+        u"""遅れを測るスレッド用プロシージャ"""
+        while True:
+            start = time.time()
+            time.sleep(self.interval)
+            delay = max(0.0, time.time() - start - self.interval)
+            self.delay += (delay - self.delay) * self.weight
+
+class RatePolicy(AdmissionPolicy):
+    u"""
+    新しい接続を1秒間に rate 個 (瞬間的には burst 個) までしか受け付けない.
+    """
+
+    reason = "Too Many Connections"
+    queueable = False
+
+    def __init__(self, rate, burst = 0):
+        self.bucket  = TokenBucket(rate, burst)
+        self.lockobj = threading.Lock()
+
+    def admit(self, server, client_address):
+        self.lockobj.acquire()
+        try:
+            return self.bucket.consume()
+        finally:
+            self.lockobj.release()
+
+class AddressRatePolicy(AdmissionPolicy):
+    u"""
+    同じ IP アドレスからの新しい接続を1秒間に rate 個
+    (瞬間的には burst 個) までしか受け付けない.
+    """
+
+    reason = "Too Many Connections"
+    queueable = False
+
+    # この数を超えたら満杯のバケツを削除する
+    bucket_max = 4096
+
+    def __init__(self, rate, burst = 0):
+        self.rate    = rate
+        self.burst   = burst
+        self.buckets = { }
+        self.lockobj = threading.Lock()
+
+    def admit(self, server, client_address):
+        ip = client_address[0]
+        self.lockobj.acquire()
+        try:
+            if ip not in self.buckets:
+                if len(self.buckets) >= self.bucket_max: self.expire()
+                self.buckets[ip] = TokenBucket(self.rate, self.burst)
+            return self.buckets[ip].consume()
+        finally:
+            self.lockobj.release()
+
+    def expire(self):
+        u"""満杯になっている (しばらく接続のない) バケツを削除する."""
+        for ip, bucket in self.buckets.items():
+            if bucket.is_full(): del self.buckets[ip]
+
+class AddressMaxPolicy(AdmissionPolicy):
+    u"""
+    同じ IP アドレスからの接続が maxconns 個に達している場合は受け付けない.
+
+    接続の登録はハンドラのスレッドで行われるので, 続けて届いた接続も
+    数えられるように, 受け付けた時点で接続数を増やしておく.
+    """
+
+    reason = "Too Many Connections"
+    queueable = False
+
+    # ワーカープロセスと共有するハッシュテーブルのスロット数
+    shared_slots = 4096
+
+    def __init__(self, maxconns):
+        self.maxconns = maxconns
+        self.counter  = AddressCounter()
+
+    def admit(self, server, client_address):
+        return self.counter.reserve(client_address[0], self.maxconns)
+
+    def release(self, server, client_address):
+        self.counter.release(client_address[0])
+
+    def share(self):
+        self.counter = SharedAddressCounter(self.shared_slots)
@@ -1,219 +1,414 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-MMS-HTTP ASF Format Reader
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-import struct
-
-__all__ = ["ASFReader"]
-
-#-------------------------------------------------------------------------------
-# ASFReader
-#-------------------------------------------------------------------------------
-
-class ASFReader(object):
-    u"""
-    ASF フォーマットを読み込んで, それに含まれる
-    メタ情報（タイトル、製作者など）を取り出すクラス.
-    """
-
-    def __init__(self, fp = None):
-        self.media_info = { }
-        self.ext_info   = { }
-        self.fp         = fp
-        if fp: self.read()
-
-    def read(self, fp = None):
-        u"""
-        渡されたファイルオブジェクトからメタ情報を読み込む.
-        読み込めなかった場合は EOFError 例外を生成する.
-        """
-        if fp:
-            self.fp = fp
-        elif not self.fp:
-            raise EOFException("file pointer is not set.")
-
-        if self.fp.closed:
-            raise EOFException("file pointer is closed.")
-
-        return self._read_object()
-
-    def close(self):
-        u"""ファイルポインタを解放する."""
-        self.fp = None
-
-    def _read_object(self):
-        u"""
-        ASF ファイルに含まれるオブジェクトを1つ読み込む.
-        """
-        # オブジェクトの先頭にある 16 byte の GUID と 64bit のデータ長を読み込む
-        guid, size = self._read_format("16sQ")
-
-        # GUID に従ってオブジェクトを処理する
-        if self._object_process_table.has_key(guid):
-            # オブジェクトを処理するメソッドが登録されている
-            func, args_format = self._object_process_table[guid]
-
-            # フォーマットに従ってデータから引数を作成する
-            args = ()
-            if args_format:
-                args = self._read_format(args_format)
-
-            # オブジェクトを処理するメソッドに渡す
-            return func(self, *args)
-        else:
-            # オブジェクトを処理できるメソッドがないので残りはスキップ
-            self.fp.seek(size - struct.calcsize("16sQ"), 1)
-            return False
-
-    def _read_format(self, format):
-        u"""
-        フォーマットに従ってデータを読み込んで unpack したものを返す.
-        読み込めなかった場合は EOFError 例外を生成する.
-        """
-        size = struct.calcsize(format)
-        data = self.fp.read(size)
-        if not data: raise EOFError("can't read a complete block.")
-        return struct.unpack(format, data)
-
-    def _read_string(self, length):
-        u"""
-        指定した長さの Unicode 文字列を読み込んで返す.
-        読み込めなかった場合は EOFError 例外を生成する.
-        """
-        text = self.fp.read(length)
-        if not text: raise EOFError("can't read a complete string.")
-        if text[-2:] == "\x00\x00": text = text[:-2]  # ターミネータを削除
-        return unicode(text, encoding = 'utf_16_le', errors = 'ignore')
-
-    # 以下は各オブジェクト別の処理
-
-    def _read_header_object(self, object_num, reserved1, reserved2):
-        u"""
-        ASF Header Object の処理.
-        """
-        # 含まれるオブジェクトを全て読み込む
-        if object_num > 0:
-            while object_num > 0:
-                object_num -= 1
-                self._read_object()
-            return True
-        else:
-            return False
-
-    def _read_content_description_object(self, *lengths):
-        u"""
-        ASF Content Description Object の処理.
-        """
-        keys = ("title", "author", "copyright", "description", "rating")
-        for key, size in zip(keys, lengths):
-            if size > 0:
-                self.media_info[key] = self._read_string(size)
-
-    def _read_extended_content_description_object(self, descriptors_num):
-        u"""
-        ASF Extended Content Description Object の処理.
-        """
-        while descriptors_num > 0:
-            descriptors_num -= 1
-
-            size = (self._read_format("H"))[0]
-            if size <= 0: continue
-            key = self._read_string(size)
-
-            desctype, size = self._read_format("HH")
-            data = None
-            if desctype in self._descriptor_reader:
-                data = self._descriptor_reader[desctype](self, size)
-            else:
-                data = self.fp.read(size)
-
-            if not data: EOFError("can't read a descriptor block.")
-            self.ext_info[key] = data
-
-            # 「規制」は rating としても登録する
-            if key == "WM/ParentalRating":
-                self.media_info["rating"] = self.ext_info[key]
-
-    # Descriptor の種類による処理分け
-    _descriptor_reader = {
-        0: lambda self, size: self._read_string(size),           # STRING
-        1: lambda self, size: self.fp.read(size),                # BYTEARRAY
-        2: lambda self, size: (self._read_format("I"))[0] != 0,  # BOOL
-        3: lambda self, size: (self._read_format("I"))[0],       # DWORD
-        4: lambda self, size: (self._read_format("Q"))[0],       # QWORD
-        5: lambda self, size: (self._read_format("H"))[0],       # WORD
-    }
-
-    # オブジェクトの GUID から処理するメソッドを決定するためのテーブル
-    _object_process_table = {
-
-        # ASF Header Object のフォーマット
-        # [#] [名前]                     [型]    [サイズ]  [struct用]
-        # [0] Number of Header Objects   DWORD   4byte     I
-        # [1] Reserved1                  BYTE    1byte     B
-        # [2] Reserved2                  BYTE    1byte     B
-        "\x30\x26\xB2\x75\x8E\x66\xCF\x11\xA6\xD9\x00\xAA\x00\x62\xCE\x6C": (
-            _read_header_object, "IBB"
-        ),
-
-        # ASF Content Description Object のフォーマット
-        # [#] [名前]                     [型]    [サイズ]  [struct用]
-        # [0] Title Length               WORD    2byte     H
-        # [1] Author Length              WORD    2byte     H
-        # [2] Copyright Length           WORD    2byte     H
-        # [3] Description Length         WORD    2byte     H
-        # [4] Rating Length              WORD    2byte     H
-        #  -  (Title, Author, Copyright, Description, Rating の文字列)
-        "\x33\x26\xB2\x75\x8E\x66\xCF\x11\xA6\xD9\x00\xAA\x00\x62\xCE\x6C": (
-            _read_content_description_object, "5H"
-        ),
-
-        # ASF Extended Content Description Object のフォーマット
-        # [#] [名前]                     [型]    [サイズ]  [struct用]
-        # [0] Content Descriptors Count  WORD    2byte     H
-        #  -  (Content Descriptors)
-        "\x40\xA4\xD0\xD2\x07\xE3\xD2\x11\x97\xF0\x00\xA0\xC9\x5E\xA8\x50": (
-            _read_extended_content_description_object, "H"
-        ),
-
-    }
-
-if __name__ == "__main__":
-    import zlib, base64, StringIO
-
-    # サンプルの ASF データで試してみる
-    example = """\
-eNrtWGlIVFEU/t7Ma8wQ9bXvjf2QFrPr0iKBODljihqipdWUNulU0zLGmEULJFkhuEQUbUSLTYtaBE
-MhtJAQLaOUZv3IiLKFaKMMIiSL6bxlxtG0P/2L9z3Oveeee893zr3v/Dos3FVctbJZONuGWqx4sK5j
-KCQMJOE0Mb12j8mbmIkgBGMKaS72k7UzPdbBhk2wIgx65Hr0yIYB6chACjJhIlsqaWn0mWgNZLEkZm
-GlbD+jSJ54j1sb7xnjCfQAa1i+smNnL9kF5mbvmTZ3sXWOtbQgjTUU5jAjG+8ZSycfFHduq0x6KFTu
-xPJD7mpXuJKbBhyeuMW58RaPU8/qKubVNAtVb9AQpM+yrlZOfb0X+G1EnN1U/b1rfuq5kpCJw2R7R9
-eVz69W3+U8BPSBsiHyHEjiHCBLdeUAXNHezIsU47yW44wS5HNC66O6q6L9rWzX4WMoUJOUuL39y89U
-1+S4+OeGpbvDFHYOujWwkNJ05u1Qx53oxNIjNbZMnXnJIvSNw9e6U/LXzbyXsCd689r74W3fz/u4/H
-X4HhloGTzEl3bGgRt3duwJSCk9fXdLWH3MRY1kX1b+NXyX6dO8E3nB1gl8pnu015v70NR5+5J5c/Ku
-VbUVxh9pjU+VHV5iCyJ+kSEFRVRIc6WSkePE0qgjMVKpbaKSy6c5EYWwYyWNDqyn17NL1gUk67GBCt
-OCjaSDii9ayb0/fs0/8WdRuQMbH+tGvmgMNDmvHq1rOlj7LjQEKlSoUKFChQoVKlSoUKFCxX+PfQHP
-6uv9GiAOxZ5w3NaZbm4Wzv9CSd5S49SM+7du7rU0C+Uu1OLyK73Xf6y3GQWxAWXhNDBeAIpGiD2OUA
-wCyoAJaJtIJ8y8mef+jLhbYWr4Muq6f0TkdOkX+q8VzOrucVDEBGLsEFcRiBDTVpYcRiInPTumryvz
-hhIuwdnSGvC6VTjUgZPu3PMZTmVPSxfKQTqSkAUjUpENKxwogk1qMsgXjgJDJEn3GEvjDKk5MbqH93
-zytqJAEhHDFZ9In6/4AUE9Wh0ayN2hhMyHe8ZFtQinnZSjNvn7NyVHQy+7RvKh+1KWdopUiM3Epqc8
-xLg2WEg3oFjSC0mPo9hR5DOF9FjMpnEtVmAD+URIlljJkoyt0rpIap84SETfScQ0nTKdTHoUppGXhU
-6I0RJ92Vs4jm76t2yyaS5QGOOUNhgv/a+ZvTqa0f30A73/kuN+A6b7VsY="""
-
-    example = zlib.decompress( base64.b64decode(example) )
-
-    reader = ASFReader( StringIO.StringIO(example) )
-    reader.close()
-
-    print "*** Media Info ***"
-    for k, v in reader.media_info.items():
-        print "%-20s : %s" % (k, v)
-
-    print "*** Extended Info ***"
-    for k, v in reader.ext_info.items():
-        print "%-20s : %s" % (k, v)
-
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP ASF Format Reader
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+import struct
+
+__all__ = ["ASFReader", "ASFDataPacket"]
+
+#-------------------------------------------------------------------------------
+# ASFReader
+#-------------------------------------------------------------------------------
+
+class ASFReader(object):
+    u"""
+    ASF フォーマットを読み込んで, それに含まれる
+    メタ情報（タイトル、製作者など）を取り出すクラス.
+    """
+
+    def __init__(self, fp = None):
+        self.media_info      = { }
+        self.ext_info        = { }
+        self.file_properties = { }
+        self.stream_bitrates = { }
+        self.streams         = { }
+        self.fp              = fp
+        if fp: self.read()
+
+    def read(self, fp = None):
+        u"""
+        渡されたファイルオブジェクトからメタ情報を読み込む.
+        読み込めなかった場合は EOFError 例外を生成する.
+        """
+        if fp:
+            self.fp = fp
+        elif not self.fp:
+            raise EOFException("file pointer is not set.")
+
+        if self.fp.closed:
+            raise EOFException("file pointer is closed.")
+
+        return self._read_object()
+
+    def close(self):
+        u"""ファイルポインタを解放する."""
+        self.fp = None
+
+    def bitrate(self):
+        u"""
+        ストリーミングのビットレート (bps) を返す.
+        分からない場合は 0 を返す.
+        """
+        return self.file_properties.get("max_bitrate", 0) or \
+               sum(self.stream_bitrates.values())
+
+    def video_streams(self):
+        u"""
+        映像のストリーム番号のリストを返す.
+        """
+        return [n for n, t in self.streams.items() if t == "video"]
+
+    def _read_object(self):
+        u"""
+        ASF ファイルに含まれるオブジェクトを1つ読み込む.
+        """
+        # オブジェクトの先頭にある 16 byte の GUID と 64bit のデータ長を読み込む
+        guid, size = self._read_format("16sQ")
+
+        # GUID に従ってオブジェクトを処理する
+        if self._object_process_table.has_key(guid):
+            # オブジェクトを処理するメソッドが登録されている
+            func, args_format = self._object_process_table[guid]
+
+            # フォーマットに従ってデータから引数を作成する
+            args = ()
+            if args_format:
+                args = self._read_format(args_format)
+
+            # オブジェクトを処理するメソッドに渡す
+            return func(self, *args)
+        else:
+            # オブジェクトを処理できるメソッドがないので残りはスキップ
+            self.fp.seek(size - struct.calcsize("16sQ"), 1)
+            return False
+
+    def _read_format(self, format):
+        u"""
+        フォーマットに従ってデータを読み込んで unpack したものを返す.
+        読み込めなかった場合は EOFError 例外を生成する.
+        """
+        size = struct.calcsize(format)
+        data = self.fp.read(size)
+        if not data: raise EOFError("can't read a complete block.")
+        return struct.unpack(format, data)
+
+    def _read_string(self, length):
+        u"""
+        指定した長さの Unicode 文字列を読み込んで返す.
+        読み込めなかった場合は EOFError 例外を生成する.
+        """
+        text = self.fp.read(length)
+        if not text: raise EOFError("can't read a complete string.")
+        if text[-2:] == "\x00\x00": text = text[:-2]  # ターミネータを削除
+        return unicode(text, encoding = 'utf_16_le', errors = 'ignore')
+
+    # 以下は各オブジェクト別の処理
+
+    def _read_header_object(self, object_num, reserved1, reserved2):
+        u"""
+        ASF Header Object の処理.
+        """
+        # 含まれるオブジェクトを全て読み込む
+        if object_num > 0:
+            while object_num > 0:
+                object_num -= 1
+                self._read_object()
+            return True
+        else:
+            return False
+
+    def _read_content_description_object(self, *lengths):
+        u"""
+        ASF Content Description Object の処理.
+        """
+        keys = ("title", "author", "copyright", "description", "rating")
+        for key, size in zip(keys, lengths):
+            if size > 0:
+                self.media_info[key] = self._read_string(size)
+
+    def _read_extended_content_description_object(self, descriptors_num):
+        u"""
+        ASF Extended Content Description Object の処理.
+        """
+        while descriptors_num > 0:
+            descriptors_num -= 1
+
+            size = (self._read_format("H"))[0]
+            if size <= 0: continue
+            key = self._read_string(size)
+
+            desctype, size = self._read_format("HH")
+            data = None
+            if desctype in self._descriptor_reader:
+                data = self._descriptor_reader[desctype](self, size)
+            else:
+                data = self.fp.read(size)
+
+            if not data: EOFError("can't read a descriptor block.")
+            self.ext_info[key] = data
+
+            # 「規制」は rating としても登録する
+            if key == "WM/ParentalRating":
+                self.media_info["rating"] = self.ext_info[key]
+
+    def _read_file_properties_object(self, file_id, *values):
+        u"""
+        ASF File Properties Object の処理.
+        """
+        keys = ("file_size", "creation_date", "packets", "play_duration",
+                "send_duration", "preroll", "flags", "min_packet_size",
+                "max_packet_size", "max_bitrate")
+        self.file_properties.update(zip(keys, values))
+
+    def _read_stream_bitrate_properties_object(self, records_num):
+        u"""
+        ASF Stream Bitrate Properties Object の処理.
+        """
+        while records_num > 0:
+            records_num -= 1
+
+            flags, bitrate = self._read_format("<HI")
+            self.stream_bitrates[flags & 0x7F] = bitrate
+
+    def _read_stream_properties_object(self, stream_type, ec_type,
+                                       time_offset, type_data_length,
+                                       ec_data_length, flags, reserved):
+        u"""
+        ASF Stream Properties Object の処理.
+        """
+        self.streams[flags & 0x7F] = self._stream_types.get(stream_type,
+                                                            "unknown")
+
+        # Type-Specific Data と Error Correction Data はスキップ
+        self.fp.seek(type_data_length + ec_data_length, 1)
+
+    # Stream Type の GUID とストリームの種類の対応
+    _stream_types = {
+        "\x40\x9E\x69\xF8\x4D\x5B\xCF\x11\xA8\xFD\x00\x80\x5F\x5C\x44\x2B": "audio",
+        "\xC0\xEF\x19\xBC\x4D\x5B\xCF\x11\xA8\xFD\x00\x80\x5F\x5C\x44\x2B": "video",
+    }
+
+    # Descriptor の種類による処理分け
+    _descriptor_reader = {
+        0: lambda self, size: self._read_string(size),           # STRING
+        1: lambda self, size: self.fp.read(size),                # BYTEARRAY
+        2: lambda self, size: (self._read_format("I"))[0] != 0,  # BOOL
+        3: lambda self, size: (self._read_format("I"))[0],       # DWORD
+        4: lambda self, size: (self._read_format("Q"))[0],       # QWORD
+        5: lambda self, size: (self._read_format("H"))[0],       # WORD
+    }
+
+    # オブジェクトの GUID から処理するメソッドを決定するためのテーブル
+    _object_process_table = {
+
+        # ASF Header Object のフォーマット
+        # [#] [名前]                     [型]    [サイズ]  [struct用]
+        # [0] Number of Header Objects   DWORD   4byte     I
+        # [1] Reserved1                  BYTE    1byte     B
+        # [2] Reserved2                  BYTE    1byte     B
+        "\x30\x26\xB2\x75\x8E\x66\xCF\x11\xA6\xD9\x00\xAA\x00\x62\xCE\x6C": (
+            _read_header_object, "IBB"
+        ),
+
+        # ASF Content Description Object のフォーマット
+        # [#] [名前]                     [型]    [サイズ]  [struct用]
+        # [0] Title Length               WORD    2byte     H
+        # [1] Author Length              WORD    2byte     H
+        # [2] Copyright Length           WORD    2byte     H
+        # [3] Description Length         WORD    2byte     H
+        # [4] Rating Length              WORD    2byte     H
+        #  -  (Title, Author, Copyright, Description, Rating の文字列)
+        "\x33\x26\xB2\x75\x8E\x66\xCF\x11\xA6\xD9\x00\xAA\x00\x62\xCE\x6C": (
+            _read_content_description_object, "5H"
+        ),
+
+        # ASF Extended Content Description Object のフォーマット
+        # [#] [名前]                     [型]    [サイズ]  [struct用]
+        # [0] Content Descriptors Count  WORD    2byte     H
+        #  -  (Content Descriptors)
+        "\x40\xA4\xD0\xD2\x07\xE3\xD2\x11\x97\xF0\x00\xA0\xC9\x5E\xA8\x50": (
+            _read_extended_content_description_object, "H"
+        ),
+
+        # ASF File Properties Object のフォーマット
+        # [#] [名前]                     [型]    [サイズ]  [struct用]
+        # [0] File ID                    GUID    16byte    16s
+        # [1] File Size                  QWORD   8byte     Q
+        # [2] Creation Date              QWORD   8byte     Q
+        # [3] Data Packets Count         QWORD   8byte     Q
+        # [4] Play Duration              QWORD   8byte     Q
+        # [5] Send Duration              QWORD   8byte     Q
+        # [6] Preroll                    QWORD   8byte     Q
+        # [7] Flags                      DWORD   4byte     I
+        # [8] Minimum Data Packet Size   DWORD   4byte     I
+        # [9] Maximum Data Packet Size   DWORD   4byte     I
+        # [10] Maximum Bitrate           DWORD   4byte     I
+        "\xA1\xDC\xAB\x8C\x47\xA9\xCF\x11\x8E\xE4\x00\xC0\x0C\x20\x53\x65": (
+            _read_file_properties_object, "<16s6Q4I"
+        ),
+
+        # ASF Stream Bitrate Properties Object のフォーマット
+        # [#] [名前]                     [型]    [サイズ]  [struct用]
+        # [0] Bitrate Records Count      WORD    2byte     H
+        #  -  (Bitrate Records: Flags WORD, Average Bitrate DWORD)
+        "\xCE\x75\xF8\x7B\x8D\x46\xD1\x11\x8D\x82\x00\x60\x97\xC9\xA2\xB2": (
+            _read_stream_bitrate_properties_object, "<H"
+        ),
+
+        # ASF Stream Properties Object のフォーマット
+        # [#] [名前]                     [型]    [サイズ]  [struct用]
+        # [0] Stream Type                GUID    16byte    16s
+        # [1] Error Correction Type      GUID    16byte    16s
+        # [2] Time Offset                QWORD   8byte     Q
+        # [3] Type-Specific Data Length  DWORD   4byte     I
+        # [4] Error Correction Data Len  DWORD   4byte     I
+        # [5] Flags                      WORD    2byte     H
+        # [6] Reserved                   DWORD   4byte     I
+        #  -  (Type-Specific Data, Error Correction Data)
+        "\x91\x07\xDC\xB7\xB7\xA9\xCF\x11\x8E\xE6\x00\xC0\x0C\x20\x53\x65": (
+            _read_stream_properties_object, "<16s16sQIIHI"
+        ),
+
+    }
+
+#-------------------------------------------------------------------------------
+# ASFDataPacket
+#-------------------------------------------------------------------------------
+
+class ASFDataPacket(object):
+    u"""
+    ASF のデータパケットのヘッダーを読み込んで, 送信時刻と
+    含まれるペイロードの情報を取り出すクラス.
+
+    payloads は (ストリーム番号, キーフレームかどうか, メディアオブジェクト内の
+    オフセット) のリストになる. 圧縮されたペイロードはメディアオブジェクトを
+    丸ごと含むので, オフセットは 0 とする.
+    """
+
+    # Length Type の値とフィールドのフォーマットの対応
+    _length_formats = (None, "<B", "<H", "<I")
+
+    def __init__(self, data = None, offset = 0):
+        self.sequence  = 0
+        self.send_time = 0
+        self.duration  = 0
+        self.payloads  = [ ]
+        if data is not None: self.parse(data, offset)
+
+    def parse(self, data, offset = 0):
+        u"""
+        data の offset の位置から始まるデータパケットを読み込む.
+        読み込めなかった場合は struct.error 例外を生成する.
+        """
+        self.data = data
+        self.pos  = offset
+
+        # Error Correction Data
+        flags = self._read("<B")
+        if flags & 0x80:
+            self.pos += flags & 0x0F
+            flags = self._read("<B")
+
+        # Payload Parsing Information
+        properties = self._read("<B")
+        self._read_length(flags >> 5)               # Packet Length
+        self.sequence = self._read_length(flags >> 1)   # Sequence
+        padding = self._read_length(flags >> 3)     # Padding Length
+        self.send_time, self.duration = self._read("<IH")
+
+        # Payload Data
+        if flags & 0x01:
+            payload_flags = self._read("<B")
+            count  = payload_flags & 0x3F
+            length = payload_flags >> 6
+        else:
+            count  = 1
+            length = None
+
+        self.payloads = [ ]
+        while count > 0:
+            count -= 1
+            stream = self._read("<B")
+            self._read_length(properties >> 4)                # Media Object Number
+            obj_offset = self._read_length(properties >> 2)   # Offset Into Media Object
+            replicated = self._read_length(properties)        # Replicated Data Length
+            if replicated == 1:
+                obj_offset = 0
+                self.pos += 1       # Presentation Time Delta
+            else:
+                self.pos += replicated
+
+            if length is None:
+                size = len(data) - self.pos - padding
+            else:
+                size = self._read_length(length)
+            self.pos += size
+
+            self.payloads.append( (stream & 0x7F, bool(stream & 0x80),
+                                   obj_offset) )
+
+        self.data = None
+        return self
+
+    def has_keyframe(self, streams = None):
+        u"""
+        キーフレームの先頭が含まれているかどうかを返す.
+        streams を指定した場合は, そのストリーム番号のペイロードだけを調べる.
+        """
+        for stream, key, obj_offset in self.payloads:
+            if key and obj_offset == 0 and (not streams or stream in streams):
+                return True
+        return False
+
+    def _read(self, format):
+        values = struct.unpack_from(format, self.data, self.pos)
+        self.pos += struct.calcsize(format)
+        if len(values) == 1: return values[0]
+        return values
+
+    def _read_length(self, length_type):
+        format = self._length_formats[length_type & 0x03]
+        if not format: return 0
+        return self._read(format)
+
+#-------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import zlib, base64, StringIO
+
+    # サンプルの ASF データで試してみる
+    example = """\
+eNrtWGlIVFEU/t7Ma8wQ9bXvjf2QFrPr0iKBODljihqipdWUNulU0zLGmEULJFkhuEQUbUSLTYtaBE
+MhtJAQLaOUZv3IiLKFaKMMIiSL6bxlxtG0P/2L9z3Oveeee893zr3v/Dos3FVctbJZONuGWqx4sK5j
+KCQMJOE0Mb12j8mbmIkgBGMKaS72k7UzPdbBhk2wIgx65Hr0yIYB6chACjJhIlsqaWn0mWgNZLEkZm
+GlbD+jSJ54j1sb7xnjCfQAa1i+smNnL9kF5mbvmTZ3sXWOtbQgjTUU5jAjG+8ZSycfFHduq0x6KFTu
+xPJD7mpXuJKbBhyeuMW58RaPU8/qKubVNAtVb9AQpM+yrlZOfb0X+G1EnN1U/b1rfuq5kpCJw2R7R9
+eVz69W3+U8BPSBsiHyHEjiHCBLdeUAXNHezIsU47yW44wS5HNC66O6q6L9rWzX4WMoUJOUuL39y89U
+1+S4+OeGpbvDFHYOujWwkNJ05u1Qx53oxNIjNbZMnXnJIvSNw9e6U/LXzbyXsCd689r74W3fz/u4/H
+X4HhloGTzEl3bGgRt3duwJSCk9fXdLWH3MRY1kX1b+NXyX6dO8E3nB1gl8pnu015v70NR5+5J5c/Ku
+VbUVxh9pjU+VHV5iCyJ+kSEFRVRIc6WSkePE0qgjMVKpbaKSy6c5EYWwYyWNDqyn17NL1gUk67GBCt
+OCjaSDii9ayb0/fs0/8WdRuQMbH+tGvmgMNDmvHq1rOlj7LjQEKlSoUKFChQoVKlSoUKFCxX+PfQHP
+6uv9GiAOxZ5w3NaZbm4Wzv9CSd5S49SM+7du7rU0C+Uu1OLyK73Xf6y3GQWxAWXhNDBeAIpGiD2OUA
+wCyoAJaJtIJ8y8mef+jLhbYWr4Muq6f0TkdOkX+q8VzOrucVDEBGLsEFcRiBDTVpYcRiInPTumryvz
+hhIuwdnSGvC6VTjUgZPu3PMZTmVPSxfKQTqSkAUjUpENKxwogk1qMsgXjgJDJEn3GEvjDKk5MbqH93
+zytqJAEhHDFZ9In6/4AUE9Wh0ayN2hhMyHe8ZFtQinnZSjNvn7NyVHQy+7RvKh+1KWdopUiM3Epqc8
+xLg2WEg3oFjSC0mPo9hR5DOF9FjMpnEtVmAD+URIlljJkoyt0rpIap84SETfScQ0nTKdTHoUppGXhU
+6I0RJ92Vs4jm76t2yyaS5QGOOUNhgv/a+ZvTqa0f30A73/kuN+A6b7VsY="""
+
+    example = zlib.decompress( base64.b64decode(example) )
+
+    reader = ASFReader( StringIO.StringIO(example) )
+    reader.close()
+
+    print "*** Media Info ***"
+    for k, v in reader.media_info.items():
+        print "%-20s : %s" % (k, v)
+
+    print "*** Extended Info ***"
+    for k, v in reader.ext_info.items():
+        print "%-20s : %s" % (k, v)
+
@@ -0,0 +1,859 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Asynchronous Server Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+MMSHTTPServer はクライアント毎にスレッドを作成して配信するが,
+MMSHTTPAsyncServer は1つのスレッドでイベントループを回して
+全てのクライアントの受け付け, リクエストの解析, 配信を行う.
+
+待機には使える場合は epoll か poll を, それ以外 (Windows) では select を使う.
+受信クライアントが新しいパケットを保存した時はソケットの組 (ウェイカー) で
+イベントループを起こすので, 配信中でも一定間隔で起きることはしない.
+
+リクエストの解析と応答には MMSHTTPServer と同じハンドラクラスを利用する.
+ハンドラにはソケットの代わりに MMSHTTPAsyncConnection が渡され,
+ハンドラの読み書きは全てバッファを介して非ブロッキングで行われる.
+
+イベントループで発生したイベントは, プラグインの処理で配信が止まらないように
+別のスレッド (イベントスレッド) から順番に通知する.
+"""
+
+from StringIO import StringIO
+from Queue import Queue
+import threading
+import logging
+import traceback
+import select
+import re
+import socket
+import errno
+import time
+
+from server import *
+
+__all__ = ["MMSHTTPAsyncStreamingHandler", "MMSHTTPAsyncConnection",
+           "MMSHTTPAsyncServer"]
+
+# 非ブロッキングのソケットで再試行すれば良いエラー
+_retry_errors = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+
+# リクエストヘッダーの終わりと Content-Length ヘッダー
+_header_end     = re.compile(r"\r?\n\r?\n")
+_content_length = re.compile(r"^content-length[ \t]*:[ \t]*(.*?)[ \t]*\r?$",
+                             re.I | re.M)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPAsyncPoller
+#-------------------------------------------------------------------------------
+
+class MMSHTTPAsyncPoller(object):
+    u"""
+    ファイルディスクリプタ毎に待つイベントを登録して, 発生を待つクラス.
+    select.epoll, select.poll, select.select の順に使えるものを使う.
+    epoll と poll では 1024 以上のファイルディスクリプタも扱える.
+
+    poll() は (fd, 読み込めるか, 書き込めるか, 無効か) のリストを返す.
+    相手が閉じた場合やエラーは読み込めるとして返し, 受信で調べさせる.
+    無効なファイルディスクリプタは登録から外して, 無効として返す.
+    """
+
+    def __init__(self):
+        self.masks = { }    # fd -> (読み込みを待つか, 書き込みを待つか)
+        self.impl  = None
+        if hasattr(select, "epoll"):
+            self.impl = select.epoll()
+            self.flags = (select.EPOLLIN, select.EPOLLOUT,
+                          select.EPOLLERR | select.EPOLLHUP, 0)
+        elif hasattr(select, "poll"):
+            self.impl = select.poll()
+            self.flags = (select.POLLIN, select.POLLOUT,
+                          select.POLLERR | select.POLLHUP, select.POLLNVAL)
+
+    def __str__(self):
+        return "Poller[%s]" % (self.impl and
+                               self.impl.__class__.__name__ or "select")
+
+    def register(self, fd, readable, writable):
+        u"""
+        fd で待つイベントを登録する. 前回と同じ場合は何もしない.
+        登録できなかった場合は偽を返す.
+        """
+        mask = (bool(readable), bool(writable))
+        old  = self.masks.get(fd)
+        if old == mask: return True
+        self.masks[fd] = mask
+        if not self.impl: return True
+
+        events = (mask[0] and self.flags[0]) | (mask[1] and self.flags[1])
+        try:
+            if old is None:
+                self.impl.register(fd, events)
+            else:
+                self.impl.modify(fd, events)
+        except (IOError, OSError), e:
+            # epoll は閉じられたファイルディスクリプタを自動的に外す
+            if e.errno == errno.ENOENT:
+                return self._retry(fd, events, self.impl.register)
+            if e.errno == errno.EEXIST:
+                return self._retry(fd, events, self.impl.modify)
+            del self.masks[fd]
+            return False
+        return True
+
+    def _retry(self, fd, events, func):
+        try:
+            func(fd, events)
+        except (IOError, OSError):
+            del self.masks[fd]
+            return False
+        return True
+
+    def unregister(self, fd):
+        u"""fd の登録を外す. 閉じる前に呼ぶこと."""
+        if self.masks.pop(fd, None) is None or not self.impl: return
+        try:
+            self.impl.unregister(fd)
+        except (IOError, OSError, KeyError, ValueError):
+            pass
+
+    def poll(self, timeout):
+        u"""
+        最大 timeout 秒イベントの発生を待って, 発生したものを返す.
+        timeout が None の場合は発生するまで待つ.
+        """
+        if self.impl is None: return self.select(timeout)
+
+        if isinstance(self.impl, getattr(select, "epoll", ())):
+            if timeout is None: timeout = -1
+        elif timeout is not None:
+            timeout = int(timeout * 1000)
+        try:
+            events = self.impl.poll(timeout)
+        except (IOError, OSError, select.error), e:
+            if e.args[0] == errno.EINTR: return [ ]
+            raise
+
+        readable, writable, error, invalid = self.flags
+        results = [ ]
+        for fd, event in events:
+            if event & invalid:
+                self.unregister(fd)
+                results.append((fd, False, False, True))
+            else:
+                results.append((fd, bool(event & (readable | error)),
+                                bool(event & writable), False))
+        return results
+
+    def select(self, timeout):
+        u"""select で待つ. 無効なファイルディスクリプタは1つずつ調べて外す."""
+        rlist = [fd for fd, mask in self.masks.iteritems() if mask[0]]
+        wlist = [fd for fd, mask in self.masks.iteritems() if mask[1]]
+        try:
+            r, w, e = select.select(rlist, wlist, [], timeout)
+        except (select.error, socket.error), e:
+            if e.args[0] == errno.EINTR: return [ ]
+            return self.find_invalid()
+        except ValueError:
+            return self.find_invalid()
+
+        results = dict([(fd, [fd, True, False, False]) for fd in r])
+        for fd in w:
+            results.setdefault(fd, [fd, False, False, False])[2] = True
+        return [tuple(result) for result in results.itervalues()]
+
+    def find_invalid(self):
+        u"""select に渡せないファイルディスクリプタを探して外す."""
+        results = [ ]
+        for fd in self.masks.keys():
+            try:
+                select.select([fd], [], [], 0)
+            except (select.error, socket.error, ValueError):
+                self.unregister(fd)
+                results.append((fd, False, False, True))
+        return results
+
+    def close(self):
+        u"""後始末を行う."""
+        if self.impl and hasattr(self.impl, "close"): self.impl.close()
+        self.masks.clear()
+
+class MMSHTTPAsyncWaker(object):
+    u"""
+    他のスレッドからイベントループを起こす為のソケットの組.
+    wake() は読み込み側を読み込めるようにする. 起こした後に drain() で
+    読み込むまでは, 何度呼ばれても1バイトしか書き込まない.
+    """
+
+    def __init__(self):
+        self.reader, self.writer = self.socketpair()
+        self.reader.setblocking(0)
+        self.writer.setblocking(0)
+        self.pending = False
+
+    def socketpair(self):
+        u"""
+        接続されたソケットの組を返す.
+        socket.socketpair() がない環境 (Windows) ではループバックで接続する.
+        """
+        if hasattr(socket, "socketpair"): return socket.socketpair()
+
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(1)
+            writer = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            writer.connect(listener.getsockname())
+            reader, address = listener.accept()
+        finally:
+            listener.close()
+        return (reader, writer)
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def wake(self):
+        u"""イベントループを起こす. 他のスレッドから呼んでもよい."""
+        if self.pending: return
+        self.pending = True
+        try:
+            self.writer.send("\0")
+        except socket.error:
+            # 書き込めない場合は既に起こされている
+            pass
+
+    def drain(self):
+        u"""
+        書き込まれたデータを読み捨てる.
+        この後に wake() されたものは次の待機で起きる.
+        """
+        self.pending = False
+        try:
+            while self.reader.recv(4096): pass
+        except socket.error:
+            pass
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+#-------------------------------------------------------------------------------
+# MMSHTTPAsyncStreamingHandler
+#-------------------------------------------------------------------------------
+
+class MMSHTTPAsyncStreamingHandler(MMSHTTPStreamingHandler):
+    u"""
+    MMSHTTPAsyncServer でメディアストリーミングを配信するハンドラ.
+    ストリーミングの送信は接続に任せて, すぐに処理を返す.
+    """
+
+    def send_streaming(self):
+        u"""
+        ストリーミングのイテレーターを接続に渡す.
+        実際の送信はイベントループの中で行われる.
+        """
+        logging.debug("%s starts sending streaming." % self)
+
+        self.connection.start_streaming(self.start_stream())
+
+    def wait_for_request(self):
+        u"""
+        次のリクエストは接続がイベントループで受信して, 新しいハンドラに
+        処理させるので待たない.
+        """
+        return False
+
+    def finish(self):
+        u"""
+        処理の後始末を行う.
+        ストリーミング中は接続が閉じられるまで後始末を遅らせる.
+        """
+        if not self.connection.is_streaming():
+            MMSHTTPStreamingHandler.finish(self)
+
+    def finish_streaming(self):
+        u"""ストリーミングの終了時に遅らせていた後始末を行う."""
+        MMSHTTPStreamingHandler.finish(self)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPAsyncConnection
+#-------------------------------------------------------------------------------
+
+class MMSHTTPAsyncInput(StringIO):
+    u"""
+    ハンドラの rfile として渡される, 受信済みのリクエストを読み込むファイル.
+    閉じた時に読み込んだバイト数を consumed に残す.
+    """
+
+    consumed = 0
+
+    def close(self):
+        if not self.closed: self.consumed = self.pos
+        StringIO.close(self)
+
+class MMSHTTPAsyncOutput(object):
+    u"""
+    ハンドラの wfile として渡される, 接続の送信バッファに書き込むファイル.
+    """
+
+    def __init__(self, conn):
+        self.conn   = conn
+        self.closed = False
+
+    def write(self, data):
+        self.conn.write(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class MMSHTTPAsyncConnection(object):
+    u"""
+    MMSHTTPAsyncServer が受け付けたクライアントとの接続1つを表すクラス.
+
+    ハンドラからはソケットとして扱われる.
+    リクエストヘッダーを全て受信したらハンドラを作成して処理させる.
+    ハンドラがストリーミングを開始した場合は, イベントループから
+    呼ばれる度にイテレーターからパケットを取り出して送信バッファに積む.
+
+    ハンドラが接続を維持した場合は, サーバーの keepalive 秒まで
+    次のリクエストを待って新しいハンドラに処理させる.
+    """
+
+    def __init__(self, server, request, client_address, handler_class,
+                 admitted = False):
+        self.server         = server
+        self.request        = request
+        self.client_address = client_address
+        self.handler_class  = handler_class
+        self.handler        = None
+        self.iterator       = None
+        self.infile         = None
+        self.idle_since     = 0
+        self.inbuf          = ""
+        self.request_size   = 0
+        self.unframed       = False
+        self.outbuf         = bytearray()
+        self.outbuf_since   = 0
+        self.sent_at        = 0
+        self.closing        = False
+        self.closed         = False
+        self.fd             = request.fileno()
+        self.connection     = server.add_connection(client_address, request,
+                                                    admitted)
+
+    def __str__(self):
+        return "Connection[%s]" % self.server.connection_name(self.connection)
+
+    def fileno(self):
+        return self.request.fileno()
+
+    def settimeout(self, timeout):
+        u"""
+        ハンドラから呼ばれるが, 非ブロッキングなので何もしない.
+        送信のタイムアウトは check_timeout() で調べる.
+        """
+        pass
+
+    def makefile(self, mode = "r", bufsize = -1):
+        u"""
+        ハンドラが読み書きに使うファイルオブジェクトを返す.
+        読み込み用には受信済みのリクエストを, 書き込み用には送信バッファを返す.
+        """
+        if "r" in mode:
+            self.infile = MMSHTTPAsyncInput(self.inbuf)
+            return self.infile
+        else:
+            return MMSHTTPAsyncOutput(self)
+
+    def write(self, data):
+        u"""送信バッファにデータを積む."""
+        if isinstance(data, unicode): data = data.encode("utf_8")
+        if not self.outbuf:
+            self.outbuf_since = self.sent_at = time.time()
+            self.connection.set_waiting(True)
+        self.outbuf += data
+
+    def is_streaming(self):
+        u"""ストリーミングを配信中かどうかを返す."""
+        return self.iterator is not None
+
+    def start_streaming(self, iterator):
+        u"""
+        ストリーミングの配信を開始する.
+        受信クライアントに新しいパケットでイベントループを起こさせる.
+        """
+        self.iterator = iterator
+        self.wakeable = self.server.watch_client(getattr(iterator, "client",
+                                                         None))
+
+    wakeable = False
+
+    def readable(self):
+        u"""受信を待つ必要があるかどうかを返す."""
+        return not self.closed
+
+    def writable(self):
+        u"""
+        送信を待つ必要があるかどうかを返す.
+        ストリーミング中はサーバーの sendbytes バイトに達するか,
+        senddelay 秒経つまで送信バッファにパケットを溜める.
+        """
+        return bool(self.outbuf) and self.send_wait() <= 0
+
+    def send_wait(self):
+        u"""
+        送信バッファのデータを送信し始めるまでの秒数を返す.
+        送信するデータがない場合は None を返す.
+        """
+        if not self.outbuf: return None
+        if self.closing or not self.is_streaming(): return 0
+        if len(self.outbuf) >= self.server.sendbytes: return 0
+        return self.outbuf_since + self.server.senddelay - time.time()
+
+    def closable(self):
+        u"""接続を閉じてよいかどうかを返す."""
+        return self.closing and not self.closed and not self.outbuf
+
+    def check_timeout(self):
+        u"""
+        次のリクエストを待っている接続が, サーバーの keepalive 秒以上
+        何も受信していないか, サーバーが終了した場合は閉じる準備をする.
+        送信バッファのデータがサーバーの sendtimeout 秒以上少しも
+        送信できない場合は, 送信バッファを捨てて閉じる準備をする.
+        """
+        if self.closing: return
+        now = time.time()
+
+        if self.idle_since and (self.server.terminated or
+                                now - self.idle_since >= self.server.keepalive):
+            logging.debug("%s closes the idle connection." % self)
+            self.closing = True
+
+        elif self.outbuf and self.server.sendtimeout > 0 and \
+             now - self.sent_at >= self.server.sendtimeout:
+            self.server.reap(self.connection, "send timeout", False)
+            self.abort()
+
+    def abort(self):
+        u"""送信バッファを捨てて接続を閉じる準備をする."""
+        del self.outbuf[:]
+        self.closing = True
+
+    def handle_read(self):
+        u"""
+        データを受信する.
+        リクエストヘッダーを全て受信したらハンドラに処理させる.
+        """
+        try:
+            data = self.request.recv(self.server.recv_size)
+        except socket.error, e:
+            if e.args[0] in _retry_errors: return
+            logging.debug("%s stopped receiving. Reason: %s" % (self, e))
+            self.abort()
+            return
+
+        if not data:
+            self.abort()
+            return
+
+        # リクエストを受信した後に送られてきたデータは捨てる
+        if self.handler or self.closing: return
+
+        self.inbuf += data
+        self.idle_since = 0
+        if self.has_request():
+            self.handle_request()
+        elif len(self.inbuf) > self.server.request_max:
+            logging.warning("%s sent too long request." % self)
+            self.abort()
+
+    def has_request(self):
+        u"""
+        リクエストヘッダーと, Content-Length で指定された長さの本文を
+        全て受信したかどうかを返す.
+
+        本文のバイト数は request_size に残す. Content-Length がない POST などの
+        リクエストは本文の終わりが分からないので, 受信済みのデータ全てを
+        リクエストとして, 処理した後に接続を閉じるように unframed を真にする.
+        """
+        m = _header_end.search(self.inbuf)
+        if not m: return False
+
+        header = self.inbuf[:m.end()]
+        length = _content_length.search(header)
+        self.unframed = False
+        if length:
+            try:
+                size = int(length.group(1))
+                if size < 0: raise ValueError(size)
+            except ValueError:
+                size = len(self.inbuf) - m.end()
+                self.unframed = True
+        elif header.split(None, 1)[:1] in (["GET"], ["HEAD"]):
+            size = 0
+        else:
+            size = len(self.inbuf) - m.end()
+            self.unframed = True
+
+        self.request_size = m.end() + size
+        return len(self.inbuf) >= self.request_size
+
+    def handle_request(self):
+        u"""
+        受信したリクエストをハンドラに処理させる.
+        ハンドラが接続を維持する場合は, 処理したリクエストを取り除いて
+        次のリクエストを待つ. 既に届いている場合は続けて処理する.
+        """
+        while True:
+            try:
+                self.handler = self.handler_class(self, self.client_address,
+                                                  self.server, self.connection)
+            except:
+                logging.error("%s failed handling the request:\n%s\n%s\n%s" %
+                    (self, "-"*40, traceback.format_exc().strip(), "-"*40))
+                self.abort()
+                return
+
+            if self.is_streaming(): return
+
+            if self.handler.close_connection or self.unframed or \
+               self.server.keepalive <= 0 or self.server.terminated:
+                self.closing = True
+                return
+
+            # ハンドラが読まなかった本文も読み捨てる
+            self.inbuf      = self.inbuf[max(self.infile.consumed,
+                                             self.request_size):]
+            self.handler    = None
+            self.idle_since = time.time()
+            if not self.has_request(): return
+
+    def handle_write(self):
+        u"""送信バッファのデータをできるだけ送信する."""
+        try:
+            sent = self.request.send(self.outbuf)
+        except socket.error, e:
+            if e.args[0] in _retry_errors: return
+            logging.debug("%s stopped sending. Reason: %s" % (self, e))
+            self.abort()
+            return
+
+        del self.outbuf[:sent]
+
+        # 送信が進んだら, 残りのデータについて待ち始める
+        if sent:
+            self.sent_at = time.time()
+            self.connection.set_waiting(False)
+            if self.outbuf: self.connection.set_waiting(True)
+
+    def pull(self):
+        u"""
+        ストリーミングのパケットを送信バッファに積む.
+        送信バッファが一杯になるか, ブロッキングする所まで取り出す.
+        積む間に受信で上書きされたパケットは捨てて, 次で読み飛ばす.
+        """
+        if not self.is_streaming() or self.closing: return
+
+        while len(self.outbuf) < self.server.output_max:
+            if not self.iterator.available(): return
+            try:
+                packets = self.iterator.next_packets()
+            except StopIteration:
+                # サーバーや受信の終了で止められた場合は終了パケットを送信する
+                if self.handler.is_end_of_stream():
+                    self.write(self.handler.end_of_stream)
+                self.closing = True
+                return
+            mark = len(self.outbuf)
+            for packet in packets:
+                self.write(packet)
+            if not self.iterator.is_intact():
+                del self.outbuf[mark:]
+                if not self.outbuf: self.connection.set_waiting(False)
+                continue
+            self.connection.sent(len(self.outbuf) - mark, len(packets))
+            self.connection.set_lag(self.iterator.lag())
+
+    def close(self):
+        u"""接続を閉じて後始末を行う."""
+        self.closed = True
+        self.server.shutdown_request(self.request)
+
+        if self.is_streaming():
+            self.handler.finish_streaming()
+
+        self.server.notify_event("processed")
+        self.server.remove_connection(self.connection)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPAsyncServer
+#-------------------------------------------------------------------------------
+
+class MMSHTTPAsyncServer(MMSHTTPServer):
+    u"""
+    MMS-HTTP プロトコルによる接続を1つのスレッドで受け付けて配信するクラス.
+    クライアント毎にスレッドを作らないので, 多数のクライアントを扱える.
+    発生するイベントは MMSHTTPServer と同じだが, イベントループで
+    発生したものはイベントスレッドから通知される.
+    """
+
+    # サーバーのバージョン
+    version = ("MMSHTTPAsyncServer", "1.0")
+
+    # 新しいパケットで起こせないクライアントを配信している間,
+    # イベントループで待機する最大秒数
+    poll_interval = 0.01
+
+    # 接続のタイムアウトを調べる為に, イベントループで待機する最大秒数
+    timeout_interval = 1.0
+
+    # 1回に受信するバイト数
+    recv_size = 4096
+
+    # リクエストヘッダーの最大バイト数
+    request_max = 65536
+
+    # 送信バッファがこのバイト数を超えたらパケットの取り出しを止める
+    output_max = 262144
+
+    def __init__( self,
+                  source_class,
+                  bindings       = ('', 8080),
+                  req_handler    = MMSHTTPAsyncStreamingHandler,
+                  max_handler    = MMSHTTPClientMaxHandler,
+                  client_max     = 100,
+                  timeout        = 180,
+                  countdown      = 10,
+                  sendbytes      = 65536,
+                  senddelay      = 0,
+                  reuseport      = False,
+                  resolve        = True,
+                  resolvettl     = 3600,
+                  admitwait      = 0,
+                  fastpath       = True,
+                  keepalive      = 15,
+                  sendtimeout    = 60,
+                  idletimeout    = 120,
+                  pool           = True,
+                  stacksize      = 0,
+                  stats          = False ):
+
+        self.async_connections = []
+        self.watched_clients   = []
+        self.waker             = None
+        self.poller            = None
+        self.listen_fd         = None
+        self.loop_thread       = None
+        self.event_thread      = None
+        self.event_queue       = Queue()
+
+        # イベントループを止めないように, 接続を待たせることはしない
+        # 元々接続毎のスレッドを作らないので fast_responder と
+        # スレッドプールも使わない
+        MMSHTTPServer.__init__(self, source_class, bindings,
+                               req_handler, max_handler,
+                               client_max, timeout, countdown,
+                               sendbytes, senddelay, reuseport,
+                               resolve, resolvettl, 0, False, keepalive,
+                               sendtimeout, idletimeout, False, 0, stats)
+        self.socket.setblocking(0)
+
+    def rebind(self):
+        u"""待ち受け用のソケットを作り直して同じアドレスにバインドする."""
+        MMSHTTPServer.rebind(self)
+        self.socket.setblocking(0)
+
+    def serve_forever(self):
+        u"""別スレッドでリクエストを処理し続ける."""
+        if self.serving_thread: return
+
+        t = threading.Thread(target = self.event_thread_proc)
+        t.setName( "%s Event" % self )
+        t.setDaemon(1)
+        t.start()
+        self.event_thread = t
+
+        MMSHTTPServer.serve_forever(self)
+
+    def server_thread_proc(self):
+        u"""
+        サーバースレッド用プロシージャ.
+        終了後も配信中の接続が全て閉じられるまでイベントループを回す.
+        """
+        self.loop_thread = threading.currentThread()
+        try:
+            self.notify_event("start")
+            self.event_loop()
+        finally:
+            # 積まれたイベントを全て通知したらイベントスレッドを終了させる
+            self.loop_thread = None
+            self.event_queue.put(None)
+
+    def event_loop(self):
+        u"""配信中の接続が全て閉じられるまでイベントループを回す."""
+        # fork したワーカープロセスと共有しないように, 回すスレッドで作成する
+        self.poller = MMSHTTPAsyncPoller()
+        self.waker  = MMSHTTPAsyncWaker()
+        self.poller.register(self.waker.fileno(), True, False)
+        logging.debug("%s polls with %s." % (self, self.poller))
+        try:
+            while not self.terminated or self.async_connections:
+                self.poll()
+        finally:
+            for client in self.watched_clients:
+                client.remove_waker(self.waker.wake)
+            self.watched_clients = []
+            self.poller.close()
+            self.waker.close()
+
+    def event_thread_proc(self):
+        u"""イベントスレッド用プロシージャ"""
+        while True:
+            event = self.event_queue.get()
+            try:
+                if event is None: return
+                name, args, kwargs = event
+                MMSHTTPServer.notify_event(self, name, *args, **kwargs)
+            finally:
+                self.event_queue.task_done()
+
+    def notify_event(self, event_name, *args, **kwargs):
+        u"""
+        イベントを通知する.
+        イベントループで発生したイベントはイベントスレッドに渡して,
+        すぐに返る. それ以外のスレッドでは, 先に渡したイベントの通知が
+        全て済むのを待ってから通知するので, 順番は入れ替わらない.
+        """
+        current = threading.currentThread()
+        if current is self.loop_thread and self.event_thread:
+            self.event_queue.put((event_name, args, kwargs))
+            return
+        if current is not self.event_thread:
+            self.event_queue.join()
+        MMSHTTPServer.notify_event(self, event_name, *args, **kwargs)
+
+    def watch_client(self, client):
+        u"""
+        受信クライアント client に, 新しいパケットを保存した時に
+        イベントループを起こさせる. 起こせない場合は偽を返す.
+        """
+        if client in self.watched_clients: return True
+        if not hasattr(client, "add_waker"): return False
+        if not client.add_waker(self.waker.wake): return False
+        self.watched_clients.append(client)
+        return True
+
+    def drain(self):
+        u"""
+        配信中の全ての接続のストリーミングを止めて, 終了パケットを
+        送信させる. 待ち受けをやめた事に気づいて, 次のリクエストを待っている
+        接続を閉じるようにイベントループを起こす.
+        """
+        MMSHTTPServer.drain(self)
+        if self.waker: self.waker.wake()
+
+    def poll_timeout(self, conns):
+        u"""
+        イベントループで待機する秒数を返す.
+        起こせないクライアントを配信している間は poll_interval 秒,
+        送信を待っているデータがある場合はその送信までの秒数,
+        次のリクエストを待っている接続がある場合は keepalive 秒経つまで,
+        それ以外は timeout_interval 秒になる.
+        """
+        now = time.time()
+        timeout = self.timeout_interval
+        for c in conns:
+            if c.idle_since:
+                timeout = min(timeout,
+                              max(0, c.idle_since + self.keepalive - now))
+            if c.is_streaming() and not c.wakeable and not c.closing:
+                timeout = min(timeout, self.poll_interval)
+            wait = c.send_wait()
+            if wait is not None:
+                timeout = min(timeout, max(0, wait))
+        return timeout
+
+    def poll(self):
+        u"""イベントループを1回分処理する."""
+        conns = self.async_connections[:]
+        for c in conns:
+            c.pull()
+            c.check_timeout()
+
+        fds = { }
+        for c in conns:
+            if c.closable(): continue
+            if self.poller.register(c.fd, c.readable(), c.writable()):
+                fds[c.fd] = c
+            else:
+                logging.error("%s can't poll %s (fd %d)." % (self, c, c.fd))
+                c.abort()
+
+        # 終了して閉じられた待ち受け用のソケットは外す
+        listen_fd = None
+        if not self.terminated:
+            try:
+                listen_fd = self.socket.fileno()
+            except socket.error:
+                pass
+        if listen_fd != self.listen_fd and self.listen_fd is not None:
+            self.poller.unregister(self.listen_fd)
+        self.listen_fd = listen_fd
+        if listen_fd is not None and \
+           self.poller.register(listen_fd, True, False):
+            fds[listen_fd] = self
+
+        try:
+            events = self.poller.poll(self.poll_timeout(conns))
+        except (IOError, OSError, select.error), e:
+            logging.error("%s failed polling: %s" % (self, e))
+            events = [ ]
+
+        for fd, readable, writable, invalid in events:
+            if fd == self.waker.fileno():
+                self.waker.drain()
+                continue
+            c = fds.get(fd)
+            if c is None: continue
+            if invalid:
+                if c is not self:
+                    logging.error("%s closes %s with invalid fd %d." %
+                                  (self, c, fd))
+                    c.abort()
+            elif c is self:
+                self.handle_accept()
+            else:
+                if readable: c.handle_read()
+                if writable: c.handle_write()
+
+        for c in conns:
+            if c.closable():
+                self.async_connections.remove(c)
+                self.poller.unregister(c.fd)
+                c.close()
+
+    def process_request(self, request, client_address):
+        u"""
+        リクエストを処理する.
+        接続をイベントループに登録し, リクエストの受信を待つ.
+        """
+        logging.info("%s is processing request from %r." %
+                     (self, client_address))
+
+        request.setblocking(0)
+        policy = self.admit(client_address)
+        handler_class = self.handler_for(client_address, policy)
+
+        self.notify_event("request", client_address)
+        logging.debug("%s has selected %s for request handling." %
+                      (self, repr(handler_class)))
+
+        conn = MMSHTTPAsyncConnection(self, request, client_address,
+                                      handler_class, not policy)
+        self.async_connections.append(conn)
+        self.notify_event("processing")
@@ -1,497 +1,1093 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-MMS-HTTP Client Classes
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-
-HTTP のヘッダーと、ストリーミング中に含まれるヘッダーパケットを区別するため
-ヘッダーパケットの事を "情報パケット" (info_packets) と呼びます.
-"""
-
-import sys
-import logging
-import httplib
-import socket
-import threading
-import time
-
-from packet import *
-from utils.event import EventHolder
-
-__all__ = ["RequestNotSucceeded", "HTTPClient",
-           "MMSHTTPClient", "MMSHTTPBufferedClient"]
-
-#-------------------------------------------------------------------------------
-# HTTPClient
-#-------------------------------------------------------------------------------
-
-class RequestNotSucceeded(Exception): pass
-
-class HTTPClient(EventHolder):
-    u"""
-    HTTP プロトコルによる受信を行うクライアントを表すクラス.
-    """
-
-    # リクエストのメソッド
-    request_method = "GET"
-
-    # デフォルトのリクエストヘッダー
-    default_header = {
-        "Accept":     "*/*",
-        "User-Agent": "HTTPClient/1.0",
-    }
-
-    # デーモンスレッドにする
-    daemon_thread = False
-
-    def __init__(self, host = 'localhost', port = 8080, path = '/',
-                 addheader = {}, timeout = 30, retry = 5, retrysec = 10):
-        EventHolder.__init__(self,
-            "start", "terminate", "processing", "processed",
-            "connecting", "connected", "request", "response",
-        )
-
-        self.host           = host
-        self.port           = port
-        self.path           = path
-        self.peer_info      = (host, port, path)
-        self.url            = "http://%s:%d%s" % self.peer_info
-        self.timeout        = timeout
-        self.retry          = retry
-        self.retrysec       = retrysec
-        self.status_line    = None
-        self.header         = None
-        self.body           = None
-        self.request_header = self.default_header.copy()
-        self.request_header.update(addheader)
-        self.sock           = None
-        self.terminating    = False
-        self.terminated     = False
-        self.client_thread  = None
-
-        logging.debug("%s is initialized successfully." % self)
-
-    def __str__(self):
-        return "Client[%s:%d%s]" % self.peer_info
-
-    def start(self):
-        u"""別スレッドで受信を開始する."""
-        if self.client_thread: return
-        t = threading.Thread(target = self.client_thread_proc)
-        t.setName( str(self) )
-        if self.daemon_thread: t.setDaemon(1)
-        self.terminating = False
-        self.terminated = False
-        self.client_thread = t
-        t.start()
-
-    def client_thread_proc(self):
-        u"""クライアントスレッド用プロシージャ"""
-        logging.debug("%s thread started." % self)
-        self.notify_event("start")
-
-        try:
-            try:
-                self.setup()
-                self.notify_event("processing")
-                self._process()
-                self.notify_event("processed")
-                self.finish()
-            except RequestNotSucceeded, e:
-                logging.error("%s failed request: %r" % (self, e))
-            except socket.error, e:
-                if self.terminating:
-                    logging.info("%s closed for termination." % self)
-                else:
-                    logging.error("%s closed: %s" % (self, e))
-        finally:
-            self.terminated = True
-
-        self.notify_event("terminate")
-        logging.debug("%s thread finished." % self)
-
-    def setup(self):
-        u"""受信を開始する前の準備."""
-        pass
-
-    def _process(self):
-        u"""受信処理を行い, 失敗したらリトライする."""
-        retry = self.retry
-        first = True
-        while True:
-            try:
-                if first:
-                    first = False
-                    self.process()
-                else:
-                    self.retry_process()
-                break
-            except socket.error, e:
-                if not self.terminating and retry > 0 and self.retrysec > 0:
-                    retry -= 1
-                    logging.error("%s closed: %s. Retrying %d/%d after %d sec."
-                            % (self, e, self.retry - retry, self.retry,
-                               self.retrysec))
-                    time.sleep(self.retrysec)
-                else:
-                    raise
-
-    def process(self):
-        u"""実際の受信を行う処理."""
-        self.send_request(self.receive_body)
-
-    def retry_process(self):
-        u"""リトライ時に行う処理."""
-        self.process()
-
-    def receive_body(self, fp):
-        u"""ボディ部の受信を行う処理."""
-        self.body = fp.read()
-
-    def finish(self):
-        u"""受信を終了する時の処理."""
-        pass
-
-    def join(self, timeout = None):
-        u"""受信が終了するかタイムアウトするまで待機する."""
-        self.client_thread.join(timeout)
-
-    def terminate(self):
-        u"""強制的に終了する."""
-        self.terminating = True
-        if self.sock:
-            self.sock.close()
-
-    def build_header(self, addheader = {}):
-        u"""リクエストヘッダーを作成する."""
-        h = self.request_header.copy()
-        h["Host"] = "%s:%d" % (self.host, self.port)  # Host は自動設定
-        h.update(addheader)
-        return h
-
-    def send_request(self, body_receiver, addheader = {}):
-        u"""
-        サーバーに接続してリクエストを送信する.
-        接続に成功したら body_receiver に
-        HTTPResponse オブジェクトを渡して呼び出す.
-        """
-        con = httplib.HTTPConnection(self.host, self.port)
-        res = None
-        try:
-            logging.info("%s is connecting to %s." % (self, self.url))
-            self.notify_event("connecting")
-
-            con.connect()
-            self.sock = con.sock
-            self.sock.settimeout(self.timeout)
-
-            self.notify_event("connected")
-            logging.info("%s connected successfully." % self)
-
-            header = self.build_header(addheader)
-
-            logging.debug("%s is sending the request:\n%s\n%s %s %s\n%s\n%s" %
-                          ( self,
-                            "-" * 40,
-                            self.request_method, self.path, "HTTP/1.1",
-                            "\n".join(["%s: %s" % (k.capitalize(), v)
-                                       for k, v in header.items()]),
-                            "-" * 40,
-                          ))
-
-            self.notify_event("request", header)
-            con.request(self.request_method, self.path, None, header)
-            res = con.getresponse()
-            self.notify_event("response", res)
-
-            version = "HTTP/1.0"
-            if   res.version < 10: version = "HTTP/0.9"
-            elif res.version > 10: version = "HTTP/1.1"
-
-            self.header      = res.msg
-            self.status_line = "%s %d %s" % (version, res.status, res.reason)
-
-            logging.debug("%s received the response from the server:\n" \
-                          "%s\n%s %d %s\n%s\n%s" %
-                          ( self,
-                            "-" * 40,
-                            version, res.status, res.reason,
-                            "".join(self.header.headers).strip(),
-                            "-" * 40,
-                          ))
-
-            if res.status >= 200 and res.status < 300:
-                try:
-                    body_receiver(res.fp)
-                except EOFError, e:
-                    logging.error("%s receiving failed. Reason: %s" % (self, e))
-            else:
-                logging.warning("%s received error from the server: %d %s" %
-                                (self, res.status, res.reason))
-                raise RequestNotSucceeded(res.status, res.reason)
-        finally:
-            if self.sock:
-                self.sock = None
-            if res:
-                res.close()
-                res = None
-            if con:
-                con.close()
-                con = None
-
-        logging.info("%s disconnected successfully." % self)
-
-#-------------------------------------------------------------------------------
-# MMSHTTPClient
-#-------------------------------------------------------------------------------
-
-class MMSHTTPClient(HTTPClient):
-    u"""
-    MMS-HTTP プロトコルによって動画ストリーミングを受信するクラス.
-    """
-
-    # デフォルトのリクエストヘッダー
-    default_header = {
-        "Accept":     "*/*",
-        "User-Agent": "NSPlayer/4.1.0.3928",
-    }
-
-    # 動画の情報のリクエスト(1回目)に利用する追加ヘッダー
-    addheader_for_info = {
-        "Pragma":     {
-            "no-cache":        "",
-            "rate":            "1.000000",
-            "stream-time":     "0",
-            "stream-offset":   "0:0",
-            "request-context": "1",
-            "max-duration":    "0",
-        }
-    }
-
-    # 動画のストリーミングのリクエスト(2回目)に利用する追加ヘッダー
-    addheader_for_streaming = {
-        "Pragma":      {
-            "no-cache":            "",
-            "rate":                "1.000000",
-            "stream-time":         "0",
-            "stream-offset":       "0:0",
-            "request-context":     "2",
-            "max-duration":        "0",
-            "xPlayStrm":           "1",
-            "stream-switch-count": "2",
-            "stream-switch-entry": "ffff:1:0 ffff:2:0",
-        }
-    }
-
-    # パケットを表すクラス
-    packet_class = MMSHTTPPacket
-
-    # 情報パケットを表すクラス
-    info_packet_class = MMSHTTPInfoPacket
-
-    def __init__(self, *args, **kwargs):
-        HTTPClient.__init__(self, *args, **kwargs)
-
-        self.info_packet = None
-        self.started     = False
-        self.media_info  = { }
-        self.ext_info    = { }
-        self.register_event("info_packet", "start_streaming",
-                            "finish_streaming")
-
-    def process(self):
-        u"""実際の受信を行う処理."""
-        logging.info("%s first connect to the server for media info." % self)
-        self.request_for_info()
-        logging.info("%s second connect to the server for streaming." % self)
-        self.request_for_streaming()
-
-    def retry_process(self):
-        u"""リトライ時に行う処理."""
-        if not self.info_packet:
-            self.process()
-        else:
-            logging.info("%s skipped first connect." % self)
-            logging.info("%s second connect to the server for streaming." % self)
-            self.request_for_streaming()
-
-    def request_for_info(self):
-        u"""動画の情報をリクエストする."""
-        self.send_request(self.receive_info,
-                          self.addheader_for_info)
-
-    def receive_info(self, fp):
-        u"""動画の情報を受信する."""
-        self.info_packet = self.info_packet_class(fp)
-        self.media_info.update(self.info_packet.media_info)
-        self.ext_info.update(self.info_packet.ext_info)
-        self.notify_event("info_packet")
-
-        logging.info("%s received the media info successfully." % self)
-
-        def format_info(info):
-            s = ""
-            enc = sys.getfilesystemencoding()
-            for k, v in info.items():
-                if isinstance(k, unicode): k = k.encode(enc)
-                if isinstance(v, unicode): v = v.encode(enc)
-                s += "%-20s : %s\n" % (k, v)
-            return s.rstrip()
-
-        if self.media_info:
-            logging.info("%s Media Info:\n%s\n%s\n%s" %
-                ( self, "-" * 40, format_info(self.media_info), "-" * 40 ))
-
-        if self.info_packet.ext_info:
-            logging.debug("%s Extended Info:\n%s\n%s\n%s" %
-                ( self, "-" * 40, format_info(self.ext_info), "-" * 40 ))
-
-    def request_for_streaming(self):
-        u"""動画のストリーミングをリクエストする."""
-        self.send_request(self.receive_streaming,
-                          self.addheader_for_streaming)
-
-    def receive_streaming(self, fp):
-        u"""動画のストリーミングを受信する."""
-        packet_num = 0
-        try:
-            for packet in self.packet_class.StreamingIterator(fp):
-                if self.terminating: break
-
-                # WME はストリーミング配信を停止した後でも接続を受け付け
-                # ヘッダーパケットを送信するので, パケットを3つほど受信したら
-                # ストリーミングの開始と判断する.
-                packet_num += 1
-                if packet_num == 3:
-                    logging.info("%s has started receiving media streaming." % self)
-                    self.notify_event("start_streaming")
-                    self.started = True
-
-                self.process_packet(packet)
-
-        finally:
-            if self.started:
-                self.notify_event("finish_streaming")
-                logging.info("%s has finished receiving media streaming." % self)
-
-    def process_packet(self, packet):
-        u"""動画のデータパケットを1つ処理する."""
-        pass
-
-    def build_header(self, addheader = {}):
-        u"""リクエストヘッダーを作成する."""
-        h = HTTPClient.build_header(self, addheader)
-
-        # Pragma ヘッダーを「名前=値,名前=値,名前=値...」形式に変換
-        pragmas = []
-        for k, v in h["Pragma"].items():
-            if v:
-                pragmas.append("%s=%s" % (k, v))
-            else:
-                pragmas.append(k)
-        h["Pragma"] = ",".join(pragmas)
-
-        return h
-
-#-------------------------------------------------------------------------------
-# MMSHTTPBufferedClient
-#-------------------------------------------------------------------------------
-
-class MMSHTTPBufferedClient(MMSHTTPClient):
-    u"""
-    MMS-HTTP プロトコルによって動画ストリーミングを受信するクラス.
-    受信した最近の動画データパケットをリングバッファに保存する.
-    """
-
-    def __init__(self, bufsize = 16, *args, **kwargs):
-        self.buffer   = { }
-        self.bufsize  = bufsize
-        self.seq      = -1
-
-        MMSHTTPClient.__init__(self, *args, **kwargs)
-
-    def process_packet(self, packet):
-        u"""
-        動画のデータパケットを1つ処理する.
-        受信したパケットをリングバッファに保存する.
-        """
-        MMSHTTPClient.process_packet(self, packet)
-        newseq = self.seq + 1
-        self.buffer[ newseq % self.bufsize ] = packet
-        self.seq = newseq
-
-    def get_packet(self, sequence):
-        u"""
-        指定したシーケンス番号に対応するパケットを返す.
-        リングバッファによる実装なので一定以上古いパケットを取得しようとすると
-        それよりも新しいパケットが返ってくる.
-        """
-        return self.buffer[sequence % self.bufsize]
-
-    def iter_streaming(self):
-        u"""
-        バッファされた動画ストリーミングのパケットを順番に処理する為の
-        イテレーターを返す.
-        ただし動画を受信している間はブロッキングされているので
-        データを逐一処理したい場合はスレッドを利用する.
-        """
-        return self.StreamingIterator(self)
-
-    def __iter__(self):
-        return self.iter_streaming()
-
-
-    class StreamingIterator(object):
-        u"""
-        MMSHTTPBufferedClient でバッファされた動画のデータパケットを
-        順番に処理するためのイテレーター.
-        ストリーミングを全て処理するまでイテレートが中断しないので注意.
-        また、クライアントでの受信に追いついた時は処理をブロッキングする.
-        """
-
-        def __init__(self, client):
-            self.client = client
-            self.seq    = client.seq + 1
-
-        def __iter__(self):
-            return self
-
-        def next(self):
-            u"""
-            次のパケットを返す.
-            """
-            # 新たなパケットがバッファリングされるまで待機
-            while self.seq > self.client.seq:
-                if self.client.terminated: raise StopIteration()
-                time.sleep(0.01)
-
-            p = self.client.get_packet(self.seq)
-
-            self.seq += 1
-            return p
-
-#-------------------------------------------------------------------------------
-
-#
-# テスト用
-#
-if __name__ == "__main__":
-    logging.basicConfig(level  = logging.DEBUG,
-                        format = '%(asctime)s %(levelname)s %(message)s')
-    logging.debug("MMSHTTPClient test starts.")
-
-    client = MMSHTTPBufferedClient()
-    client.start()
-
-    logging.debug("MMSHTTPClient has started.")
-
-    time.sleep(1)
-
-    logging.debug("Buffering Test starts.")
-
-    for p in client.iter_streaming():
-        logging.debug("%r" % p)
-
-    logging.debug("MMSHTTPClient has been closed.")
-    logging.debug("MMSHTTPClient test finished.")
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Client Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+HTTP のヘッダーと、ストリーミング中に含まれるヘッダーパケットを区別するため
+ヘッダーパケットの事を "情報パケット" (info_packets) と呼びます.
+"""
+
+import sys
+import logging
+import httplib
+from StringIO import StringIO
+import socket
+import threading
+import random
+import time
+import struct
+
+from packet import *
+from asf import ASFDataPacket
+from ring import PacketRing
+from jitter import MMSHTTPJitterBuffer
+from utils.event import EventHolder
+
+__all__ = ["RequestNotSucceeded", "ReceivingInterrupted", "HTTPClient",
+           "MMSHTTPClient", "MMSHTTPBufferedClient"]
+
+#-------------------------------------------------------------------------------
+# HTTPClient
+#-------------------------------------------------------------------------------
+
+class RequestNotSucceeded(Exception): pass
+
+class ReceivingInterrupted(socket.error): pass
+
+class HTTPClient(EventHolder):
+    u"""
+    HTTP プロトコルによる受信を行うクライアントを表すクラス.
+    """
+
+    # リクエストのメソッド
+    request_method = "GET"
+
+    # デフォルトのリクエストヘッダー
+    default_header = {
+        "Accept":     "*/*",
+        "User-Agent": "HTTPClient/1.0",
+    }
+
+    # デーモンスレッドにする
+    daemon_thread = False
+
+    # リトライまでの秒数を乱数で短くする割合
+    # 同時に切断された複数のクライアントが一斉に接続し直さないようにする
+    retry_jitter = 0.5
+
+    def __init__(self, host = 'localhost', port = 8080, path = '/',
+                 addheader = {}, timeout = 30, retry = 5, retrysec = 10,
+                 retrymax = 60, stalltimeout = 0, retrytime = 0):
+        EventHolder.__init__(self,
+            "start", "terminate", "processing", "processed",
+            "connecting", "connected", "request", "response", "stall",
+        )
+
+        self.host           = host
+        self.port           = port
+        self.path           = path
+        self.peer_info      = (host, port, path)
+        self.url            = "http://%s:%d%s" % self.peer_info
+        self.timeout        = timeout
+        self.retry          = retry
+        self.retrysec       = retrysec
+        self.retrymax       = retrymax
+        self.retrytime      = retrytime
+        self.stalltimeout   = stalltimeout
+        self.status_line    = None
+        self.header         = None
+        self.body           = None
+        self.request_header = self.default_header.copy()
+        self.request_header.update(addheader)
+        self.sock           = None
+        self.terminating    = False
+        self.terminated     = False
+        self.client_thread  = None
+        self.retry_event    = threading.Event()     # リトライの待機を中断する
+        self.attempts       = 0     # 続けて失敗した回数
+        self.failing_since  = 0     # 続けて失敗し始めた時刻
+        self.reconnects     = 0     # 失敗して接続し直した回数
+        self.stalls         = 0     # 受信が止まって接続し直した回数
+
+        logging.debug("%s is initialized successfully." % self)
+
+    def __str__(self):
+        return "Client[%s:%d%s]" % self.peer_info
+
+    def start(self):
+        u"""別スレッドで受信を開始する."""
+        if self.client_thread: return
+        t = threading.Thread(target = self.client_thread_proc)
+        t.setName( str(self) )
+        if self.daemon_thread: t.setDaemon(1)
+        self.terminating = False
+        self.terminated = False
+        self.client_thread = t
+        self.retry_event.clear()
+        t.start()
+
+    def client_thread_proc(self):
+        u"""クライアントスレッド用プロシージャ"""
+        logging.debug("%s thread started." % self)
+        self.notify_event("start")
+
+        try:
+            try:
+                self.setup()
+                self.notify_event("processing")
+                self._process()
+                self.notify_event("processed")
+                self.finish()
+            except RequestNotSucceeded, e:
+                logging.error("%s failed request: %r" % (self, e))
+            except socket.error, e:
+                if self.terminating:
+                    logging.info("%s closed for termination." % self)
+                else:
+                    logging.error("%s closed: %s" % (self, e))
+        finally:
+            self.terminated = True
+
+        self.notify_event("terminate")
+        logging.debug("%s thread finished." % self)
+
+    def setup(self):
+        u"""受信を開始する前の準備."""
+        pass
+
+    def _process(self):
+        u"""
+        受信処理を行い, 失敗したらリトライする.
+        続けて失敗した回数 attempts が retry を超えるまでリトライする.
+        ただし続けて失敗し始めてから retrytime 秒経つまでは, retry を
+        超えてもリトライする.
+        受信できるようになったらサブクラスで attempts を 0 に戻すと,
+        次に失敗した時はまた retry 回リトライできる.
+        """
+        self.attempts = 0
+        first = True
+        while True:
+            try:
+                if first:
+                    first = False
+                    self.process()
+                else:
+                    self.retry_process()
+                break
+            except (socket.error, RequestNotSucceeded), e:
+                if not self.attempts: self.failing_since = time.time()
+                if not self.is_retryable(e) or self.terminating or \
+                   not self.can_retry() or self.retrysec <= 0:
+                    raise
+                self.attempts += 1
+                delay = self.retry_delay(self.attempts)
+                logging.error("%s closed: %s. Retrying %d/%d after %.1f sec."
+                        % (self, e, self.attempts, self.retry, delay))
+                self.retry_event.wait(delay)
+                if self.terminating: raise
+                self.reconnects += 1
+
+    def is_retryable(self, e):
+        u"""
+        例外 e で失敗した受信をリトライするかどうかを返す.
+        サーバーのエラーのうち, 一時的なものである 5xx だけはリトライする.
+        """
+        if isinstance(e, RequestNotSucceeded):
+            return e.args and e.args[0] >= 500
+        return True
+
+    def can_retry(self):
+        u"""
+        続けて失敗した回数が retry 回未満か, 続けて失敗し始めてから
+        retrytime 秒経っていない場合は真を返す.
+        """
+        return self.attempts < self.retry or \
+               time.time() - self.failing_since < self.retrytime
+
+    def retry_delay(self, attempt):
+        u"""
+        attempt 回目のリトライまで待つ秒数を返す.
+        retrysec 秒から倍々に増やして retrymax 秒までにし, 一斉に接続し直さ
+        ないように retry_jitter の割合までの乱数で短くする.
+        """
+        delay = min(max(self.retrysec, self.retrymax),
+                    self.retrysec * 2 ** min(attempt - 1, 30))
+        return delay * (1 - random.random() * self.retry_jitter)
+
+    def process(self):
+        u"""実際の受信を行う処理."""
+        self.send_request(self.receive_body)
+
+    def retry_process(self):
+        u"""リトライ時に行う処理."""
+        self.process()
+
+    def receive_body(self, fp):
+        u"""ボディ部の受信を行う処理."""
+        self.body = fp.read()
+
+    def finish(self):
+        u"""受信を終了する時の処理."""
+        pass
+
+    def join(self, timeout = None):
+        u"""受信が終了するかタイムアウトするまで待機する."""
+        self.client_thread.join(timeout)
+
+    def terminate(self):
+        u"""強制的に終了する."""
+        self.terminating = True
+        self.retry_event.set()
+        if self.sock:
+            self.sock.close()
+
+    def build_header(self, addheader = {}):
+        u"""リクエストヘッダーを作成する."""
+        h = self.request_header.copy()
+        h["Host"] = "%s:%d" % (self.host, self.port)  # Host は自動設定
+        h.update(addheader)
+        return h
+
+    def send_request(self, body_receiver, addheader = {}):
+        u"""
+        サーバーに接続してリクエストを送信する.
+        接続に成功したら body_receiver に
+        HTTPResponse オブジェクトを渡して呼び出す.
+        """
+        con = httplib.HTTPConnection(self.host, self.port)
+        res = None
+        try:
+            logging.info("%s is connecting to %s." % (self, self.url))
+            self.notify_event("connecting")
+
+            con.connect()
+            self.sock = con.sock
+            self.sock.settimeout(self.timeout)
+
+            self.notify_event("connected")
+            logging.info("%s connected successfully." % self)
+
+            header = self.build_header(addheader)
+
+            logging.debug("%s is sending the request:\n%s\n%s %s %s\n%s\n%s" %
+                          ( self,
+                            "-" * 40,
+                            self.request_method, self.path, "HTTP/1.1",
+                            "\n".join(["%s: %s" % (k.capitalize(), v)
+                                       for k, v in header.items()]),
+                            "-" * 40,
+                          ))
+
+            self.notify_event("request", header)
+            con.request(self.request_method, self.path, None, header)
+            res = con.getresponse()
+            self.notify_event("response", res)
+
+            version = "HTTP/1.0"
+            if   res.version < 10: version = "HTTP/0.9"
+            elif res.version > 10: version = "HTTP/1.1"
+
+            self.header      = res.msg
+            self.status_line = "%s %d %s" % (version, res.status, res.reason)
+
+            logging.debug("%s received the response from the server:\n" \
+                          "%s\n%s %d %s\n%s\n%s" %
+                          ( self,
+                            "-" * 40,
+                            version, res.status, res.reason,
+                            "".join(self.header.headers).strip(),
+                            "-" * 40,
+                          ))
+
+            if res.status >= 200 and res.status < 300:
+                # ボディの受信が stalltimeout 秒止まったら接続し直す
+                # 接続を閉じるレスポンスでは httplib が con.sock を閉じるので,
+                # レスポンスが読み込んでいるソケットに設定する
+                stalling = 0 < self.stalltimeout < (self.timeout or 1e9)
+                if stalling:
+                    sock = getattr(res.fp, "_sock", None) or self.sock
+                    sock.settimeout(self.stalltimeout)
+                try:
+                    body_receiver(res.fp)
+                except EOFError, e:
+                    logging.error("%s receiving failed. Reason: %s" % (self, e))
+                except socket.timeout, e:
+                    if not stalling or self.terminating: raise
+                    self.stalls += 1
+                    logging.warning("%s received nothing for %g sec." %
+                                    (self, self.stalltimeout))
+                    self.notify_event("stall")
+                    raise ReceivingInterrupted("receiving stalled")
+            else:
+                logging.warning("%s received error from the server: %d %s" %
+                                (self, res.status, res.reason))
+                raise RequestNotSucceeded(res.status, res.reason)
+        finally:
+            if self.sock:
+                self.sock = None
+            if res:
+                res.close()
+                res = None
+            if con:
+                con.close()
+                con = None
+
+        logging.info("%s disconnected successfully." % self)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPClient
+#-------------------------------------------------------------------------------
+
+class MMSHTTPClient(HTTPClient):
+    u"""
+    MMS-HTTP プロトコルによって動画ストリーミングを受信するクラス.
+    """
+
+    # デフォルトのリクエストヘッダー
+    default_header = {
+        "Accept":     "*/*",
+        "User-Agent": "NSPlayer/4.1.0.3928",
+    }
+
+    # 動画の情報のリクエスト(1回目)に利用する追加ヘッダー
+    addheader_for_info = {
+        "Pragma":     {
+            "no-cache":        "",
+            "rate":            "1.000000",
+            "stream-time":     "0",
+            "stream-offset":   "0:0",
+            "request-context": "1",
+            "max-duration":    "0",
+        }
+    }
+
+    # 動画のストリーミングのリクエスト(2回目)に利用する追加ヘッダー
+    addheader_for_streaming = {
+        "Pragma":      {
+            "no-cache":            "",
+            "rate":                "1.000000",
+            "stream-time":         "0",
+            "stream-offset":       "0:0",
+            "request-context":     "2",
+            "max-duration":        "0",
+            "xPlayStrm":           "1",
+            "stream-switch-count": "2",
+            "stream-switch-entry": "ffff:1:0 ffff:2:0",
+        }
+    }
+
+    # パケットを表すクラス
+    packet_class = MMSHTTPPacket
+
+    # 情報パケットを表すクラス
+    info_packet_class = MMSHTTPInfoPacket
+
+    # メタデータパケットを表すクラス
+    metadata_packet_class = MMSHTTPMetaDataPacket
+
+    # ストリーミングからパケットを切り出すクラス
+    packet_reader_class = MMSHTTPPacketReader
+
+    def __init__(self, *args, **kwargs):
+        HTTPClient.__init__(self, *args, **kwargs)
+
+        self.info_packet = None
+        self.info_cached = False    # info_packet が保存してあったものかどうか
+        self.started     = False
+        self.media_info  = { }
+        self.ext_info    = { }
+        self.metadata    = { }      # 最後に受信したメタデータパケットの内容
+        self.register_event("info_packet", "start_streaming",
+                            "finish_streaming", "interrupt_streaming",
+                            "resume_streaming", "change_media", "metadata")
+
+    def _process(self):
+        u"""
+        受信処理を行い, 失敗したらリトライする.
+        リトライで再開した場合は finish_streaming イベントを通知せず,
+        最後に受信を終了した時に1回だけ通知する.
+        """
+        try:
+            HTTPClient._process(self)
+        finally:
+            if self.started:
+                self.notify_event("finish_streaming")
+                logging.info("%s has finished receiving media streaming." % self)
+
+    def process(self):
+        u"""実際の受信を行う処理."""
+        logging.info("%s first connect to the server for media info." % self)
+        self.request_for_info()
+        logging.info("%s second connect to the server for streaming." % self)
+        self.request_for_streaming()
+
+    def retry_process(self):
+        u"""リトライ時に行う処理."""
+        if not self.info_packet:
+            self.process()
+        else:
+            logging.info("%s skipped first connect." % self)
+            logging.info("%s second connect to the server for streaming." % self)
+            self.request_for_streaming()
+
+    def request_for_info(self):
+        u"""動画の情報をリクエストする."""
+        self.send_request(self.receive_info,
+                          self.addheader_for_info)
+
+    def receive_info(self, fp):
+        u"""動画の情報を受信する."""
+        self.info_packet = self.info_packet_class(fp)
+        self.info_cached = False
+        self.media_info.update(self.info_packet.media_info)
+        self.ext_info.update(self.info_packet.ext_info)
+        self.notify_event("info_packet")
+
+        logging.info("%s received the media info successfully." % self)
+
+        def format_info(info):
+            s = ""
+            enc = sys.getfilesystemencoding()
+            for k, v in info.items():
+                if isinstance(k, unicode): k = k.encode(enc)
+                if isinstance(v, unicode): v = v.encode(enc)
+                s += "%-20s : %s\n" % (k, v)
+            return s.rstrip()
+
+        if self.media_info:
+            logging.info("%s Media Info:\n%s\n%s\n%s" %
+                ( self, "-" * 40, format_info(self.media_info), "-" * 40 ))
+
+        if self.info_packet.ext_info:
+            logging.debug("%s Extended Info:\n%s\n%s\n%s" %
+                ( self, "-" * 40, format_info(self.ext_info), "-" * 40 ))
+
+    def restore_info(self, status_line, header, info_packet):
+        u"""
+        前回受信して保存してあったレスポンスと動画の情報を使う.
+        サーバーから受信するまでの間, ヘッダーのリクエストに応答できる.
+        """
+        self.status_line = status_line
+        self.header      = header
+        self.info_packet = info_packet
+        self.info_cached = True
+        self.media_info.update(info_packet.media_info)
+        self.ext_info.update(info_packet.ext_info)
+        self.notify_event("info_packet")
+
+        logging.info("%s restored the media info from the cache." % self)
+
+    def request_for_streaming(self):
+        u"""動画のストリーミングをリクエストする."""
+        self.send_request(self.receive_streaming,
+                          self.addheader_for_streaming)
+
+    def receive_streaming(self, fp):
+        u"""
+        動画のストリーミングを受信する.
+
+        終了パケットを受信するか接続が切れて受信が途中で終わった場合は,
+        ReceivingInterrupted 例外を発生させてリトライさせる.
+        終了パケットは配信先に送らないので, 配信先は受信が再開するまで
+        そのまま待機できる.
+
+        配信中にメディアが変わって送られてくる情報パケットと,
+        メタデータパケットは解析して差し替える. どちらも配信先にそのまま送る.
+        """
+        resuming   = self.started
+        packet_num = 0
+        try:
+            reader = self.packet_reader_class(fp, self.packet_class)
+            for packet in reader:
+                if self.terminating: return
+
+                # WME はストリーミング配信を停止した後でも接続を受け付け
+                # ヘッダーパケットを送信するので, パケットを3つほど受信したら
+                # ストリーミングの開始と判断する.
+                packet_num += 1
+                if packet_num == 3:
+                    self.attempts = 0
+                    if resuming:
+                        logging.info("%s has resumed receiving media streaming." % self)
+                        self.notify_event("resume_streaming")
+                    else:
+                        logging.info("%s has started receiving media streaming." % self)
+                        self.notify_event("start_streaming")
+                        self.started = True
+
+                if packet.is_last(): break
+
+                # 接続し直した時の情報パケットは, 前と同じであれば送らない.
+                # 配信中の情報パケットと, 変わっていた場合は差し替える
+                if packet.is_info() and (resuming or packet_num > 1):
+                    if str(packet) != str(self.info_packet):
+                        self.change_info(packet)
+                    elif packet_num == 1:
+                        continue
+                elif packet.marker == packet.MARKER_META_DATA:
+                    self.receive_metadata(packet)
+
+                self.process_packet(packet)
+        except EOFError, e:
+            if self.terminating: return
+            self.interrupt_streaming()
+            raise ReceivingInterrupted("receiving failed: %s" % e)
+        except socket.error, e:
+            if not self.terminating: self.interrupt_streaming()
+            raise
+
+        if not self.terminating:
+            self.interrupt_streaming()
+            raise ReceivingInterrupted("the stream has ended")
+
+    def change_info(self, packet):
+        u"""
+        配信中に変わった動画の情報パケット packet に差し替えて,
+        info_packet と change_media イベントを通知する.
+
+        配信するスレッドが同時に参照しても古いものと新しいものが
+        混ざらないように, 情報パケットと media_info, ext_info は
+        新しいオブジェクトを作ってから参照を置き換える.
+        """
+        old  = self.info_packet
+        info = self.info_packet_class()
+        info.parse(str(packet))
+
+        media_info = self.media_info.copy()
+        media_info.update(info.media_info)
+        ext_info   = self.ext_info.copy()
+        ext_info.update(info.ext_info)
+
+        self.media_info  = media_info
+        self.ext_info    = ext_info
+        self.info_packet = info
+        self.info_cached = False
+
+        logging.info("%s received the changed media info." % self)
+        self.notify_event("info_packet")
+        self.notify_event("change_media", old, info)
+
+    def receive_metadata(self, packet):
+        u"""
+        メタデータパケット packet を解析して metadata を差し替え,
+        metadata イベントを通知する.
+        """
+        meta = self.metadata_packet_class()
+        meta.parse(str(packet))
+        self.metadata = meta.metadata
+
+        logging.debug("%s received the metadata %r." % (self, meta.metadata))
+        self.notify_event("metadata", meta.metadata)
+
+    def interrupt_streaming(self):
+        u"""受信が途中で終わったことを通知する."""
+        if self.started:
+            logging.warning("%s was interrupted receiving media streaming." %
+                            self)
+            self.notify_event("interrupt_streaming")
+
+    def process_packet(self, packet):
+        u"""動画のデータパケットを1つ処理する."""
+        pass
+
+    def build_header(self, addheader = {}):
+        u"""リクエストヘッダーを作成する."""
+        h = HTTPClient.build_header(self, addheader)
+
+        # Pragma ヘッダーを「名前=値,名前=値,名前=値...」形式に変換
+        pragmas = []
+        for k, v in h["Pragma"].items():
+            if v:
+                pragmas.append("%s=%s" % (k, v))
+            else:
+                pragmas.append(k)
+        h["Pragma"] = ",".join(pragmas)
+
+        return h
+
+#-------------------------------------------------------------------------------
+# MMSHTTPBufferedClient
+#-------------------------------------------------------------------------------
+
+class MMSHTTPBufferedClient(MMSHTTPClient):
+    u"""
+    MMS-HTTP プロトコルによって動画ストリーミングを受信するクラス.
+    受信した最近の動画データパケットをリングバッファに保存する.
+
+    リングバッファは PacketRing で, bufsize 個のパケットを最大 bufbytes
+    バイトまで保存する. bufbytes が 0 の場合は bufsize 個の最大長の
+    パケットが入る大きさになる. 最大長のパケットが入らない bufbytes は
+    警告してその大きさにする.
+
+    bufsecs を指定した場合は, 情報パケットのビットレートから bufsecs 秒分の
+    ストリーミングが入るように, 情報パケットを受信する度に大きさを変える.
+
+    キーフレームの先頭を含むパケットはリングバッファに記録しておく.
+    faststart を指定した場合は, 新しいイテレーターは最も新しいキーフレームから
+    読み込みを始める. ただしキーフレームから最新のパケットまでが faststart
+    バイトを超える場合は, 次のパケットから読み込みを始める.
+
+    イテレーターの最新のパケットからの遅れが laglimit 個か lagsecs 秒を
+    超えた場合や, 読み込む前にパケットが上書きされた (オーバーラン) 場合は
+    lagpolicy に従って, 遅れを取り戻せる最も新しいキーフレームに読み飛ばすか
+    ("resync"), イテレートを終了して接続を切らせる ("disconnect").
+    発生した回数は overruns, resyncs, lag_disconnects に数える.
+
+    jittersecs を指定した場合は, まとまって届いたパケットを最大 jittersecs 秒
+    ジッターバッファ (MMSHTTPJitterBuffer) に保持して, 送信時刻の間隔で
+    リングバッファに保存する. 保持しているパケット数, 保持する時間 (ミリ秒),
+    間に合わなかった回数は jitter_packets, jitter_delay, jitter_underruns になる.
+
+    パケットを待っているイテレーターは condition で待機し,
+    新たなパケットがバッファリングされると全て同時に起こされる.
+    add_waker() で登録した関数もその度に呼ばれる.
+    イテレーターはリングバッファのパケットをコピーせずに memoryview で
+    返し, 使い終わった後に上書きされていないかを調べる.
+    """
+
+    # リングバッファのクラス
+    ring_class = PacketRing
+
+    # ジッターバッファのクラス
+    jitter_class = MMSHTTPJitterBuffer
+
+    # 遅れたイテレーターの扱い
+    LAG_RESYNC     = "resync"
+    LAG_DISCONNECT = "disconnect"
+
+    def __init__(self, bufsize = 16, bufbytes = 0, bufsecs = 0, faststart = 0,
+                 laglimit = 0, lagsecs = 0, lagpolicy = LAG_RESYNC,
+                 jittersecs = 0, *args, **kwargs):
+        if lagpolicy not in (self.LAG_RESYNC, self.LAG_DISCONNECT):
+            raise ValueError("unknown lag policy: %r" % lagpolicy)
+
+        packet_max = self.ring_class.packet_max
+        if 0 < bufbytes < packet_max:
+            logging.warning("bufbytes %d is too small for the largest packet "
+                            "and has been raised to %d." %
+                            (bufbytes, packet_max))
+            bufbytes = packet_max
+
+        self.buffer    = self.ring_class(bufsize, bufbytes)
+        self.bufsize   = bufsize
+        self.bufbytes  = bufbytes
+        self.bufsecs   = bufsecs
+        self.faststart = faststart
+        self.laglimit  = laglimit
+        self.lagsecs   = lagsecs
+        self.lagpolicy = lagpolicy
+        self.seq       = -1
+
+        self.overruns        = 0    # 読み込む前にパケットが上書きされた回数
+        self.resyncs         = 0    # キーフレームに読み飛ばした回数
+        self.lag_disconnects = 0    # 遅れによってイテレートを終了した回数
+        self.bytes_received  = 0    # リングバッファに保存したパケットのバイト数
+        self.change_seq      = -1   # 最後のメディアの変更 ($C) のシーケンス番号
+        self.jitter_packets   = 0   # ジッターバッファに保持しているパケット数
+        self.jitter_delay     = 0   # ジッターバッファに保持するミリ秒数
+        self.jitter_underruns = 0   # ジッターバッファが間に合わなかった回数
+        self.wakers    = [ ]
+        self.jitter    = None
+        if jittersecs > 0:
+            self.jitter = self.jitter_class(self, jittersecs)
+        self.condition = threading.Condition()
+
+        MMSHTTPClient.__init__(self, *args, **kwargs)
+
+    def client_thread_proc(self):
+        u"""クライアントスレッド用プロシージャ"""
+        if self.jitter: self.jitter.start()
+        try:
+            MMSHTTPClient.client_thread_proc(self)
+        finally:
+            if self.jitter: self.jitter.close()
+            # 受信の終了を待機しているイテレーターに知らせる
+            self.wakeup()
+
+    def receive_info(self, fp):
+        u"""動画の情報を受信する."""
+        MMSHTTPClient.receive_info(self, fp)
+        self.resize_buffer()
+
+    def restore_info(self, status_line, header, info_packet):
+        u"""前回受信して保存してあったレスポンスと動画の情報を使う."""
+        MMSHTTPClient.restore_info(self, status_line, header, info_packet)
+        self.resize_buffer()
+
+    def change_info(self, packet):
+        u"""
+        配信中に変わった動画の情報パケットに差し替える.
+        ジッターバッファがある場合は, 先に受信した古いメディアのパケットを
+        全てリングバッファに保存してから差し替えるように, マーカーとして
+        入れておいて apply_info() を呼ぶ.
+        """
+        if self.jitter:
+            packet.detach()
+            self.jitter.put_marker(lambda: self.apply_info(packet))
+        else:
+            self.apply_info(packet)
+
+    def apply_info(self, packet):
+        u"""
+        変わった動画の情報パケット packet に差し替えて,
+        リングバッファの大きさを合わせる.
+        """
+        MMSHTTPClient.change_info(self, packet)
+        self.resize_buffer()
+
+    def buffer_size(self):
+        u"""
+        リングバッファのパケット数とバイト数を返す.
+
+        バイト数は bufbytes と, ビットレートが分かる場合は bufsecs 秒分の
+        バイト数の大きい方になる. パケットサイズが分かる場合は
+        パケット数をバイト数から決める. ただし最大長のパケットが
+        入る大きさより小さくはしない.
+        """
+        size = self.bufbytes
+        info = self.info_packet
+        if info and info.bitrate and self.bufsecs:
+            size = max(size, int(info.bitrate * self.bufsecs / 8))
+
+        if not size:
+            return (self.bufsize, self.bufsize * self.ring_class.packet_max)
+
+        props = info and info.file_properties or { }
+        min_size = props.get("min_packet_size", 0)
+        max_size = props.get("max_packet_size", 0)
+        if not min_size or not max_size:
+            return (self.bufsize, max(size, self.ring_class.packet_max))
+
+        # $D のマーカーとサイズ (4byte) と MMS Pre-Header (8byte) の分
+        min_size += 12
+        max_size += 12
+
+        # 先頭に戻る時に末尾に空きができる分だけ大きくしておく
+        return (size // min_size + 1,
+                max(size + max_size, self.ring_class.packet_max))
+
+    def resize_buffer(self):
+        u"""
+        リングバッファの大きさを buffer_size() に合わせる.
+        入りきる新しいパケットは新しいリングバッファに引き継ぐ.
+        """
+        slots, capacity = self.buffer_size()
+        if slots == self.buffer.slots and capacity == self.buffer.capacity:
+            return
+
+        self.condition.acquire()
+        try:
+            self.buffer = self.buffer.resized(slots, capacity)
+        finally:
+            self.condition.release()
+
+        logging.info("%s resized the buffer to %d packets, %d bytes." %
+                     (self, slots, capacity))
+
+    def process_packet(self, packet):
+        u"""
+        動画のデータパケットを1つ処理する.
+        受信したパケットをリングバッファに保存して, 待機しているイテレーターを
+        全て起こす.
+        """
+        MMSHTTPClient.process_packet(self, packet)
+        self.store_packet(packet, self.is_keyframe(packet))
+
+    def store_packet(self, packet, key = False):
+        u"""
+        パケットをリングバッファに保存する. key が真の場合はキーフレームの
+        先頭を含むパケットとする. ジッターバッファがある場合は, そこから
+        送信時刻の間隔で保存される.
+        """
+        if self.jitter:
+            self.jitter.put(packet, key)
+        else:
+            self.put_packet(packet, key)
+
+    def put_packet(self, packet, key = False):
+        u"""
+        パケットをすぐにリングバッファに保存して, 待機しているイテレーターを
+        全て起こす.
+        """
+        self.condition.acquire()
+        try:
+            self.seq = self.buffer.put(packet.raw_packet, key)
+            if packet.marker == packet.MARKER_CHANGING_MEDIA:
+                self.change_seq = self.seq
+            self.condition.notify_all()
+        finally:
+            self.condition.release()
+        self.bytes_received += len(packet.raw_packet)
+        self.call_wakers()
+
+    def is_keyframe(self, packet):
+        u"""
+        パケットがキーフレームの先頭を含むデータパケットかどうかを返す.
+        映像のストリームがある場合は映像のキーフレームだけを対象にする.
+
+        メディアの変更 ($C) もキーフレームとして扱い, 新しく読み込む
+        イテレーターが変更前のデータから始めないようにする.
+        """
+        if packet.marker == packet.MARKER_CHANGING_MEDIA: return True
+        if packet.marker != packet.MARKER_MEDIA_DATA: return False
+
+        streams = self.info_packet and self.info_packet.video_streams
+        try:
+            # $D のマーカーとサイズ (4byte) と MMS Pre-Header (8byte) をとばす
+            asf_packet = ASFDataPacket(packet.raw_packet, 12)
+        except struct.error:
+            return False
+        return asf_packet.has_keyframe(streams)
+
+    def start_sequence(self):
+        u"""
+        新しいイテレーターが最初に読み込むパケットのシーケンス番号を返す.
+        """
+        self.condition.acquire()
+        try:
+            if self.faststart:
+                key = self.buffer.last_keyframe()
+                if key >= 0 and \
+                   self.buffer.size(key, self.seq) <= self.faststart:
+                    return key
+            return self.seq + 1
+        finally:
+            self.condition.release()
+
+    def lag(self, seq):
+        u"""
+        シーケンス番号 seq のパケットの, 最新のパケットからの遅れを
+        パケット数と秒数のタプルで返す.
+        """
+        count = self.seq - seq + 1
+        if count <= 0: return (0, 0.0)
+
+        latest   = self.buffer.received(self.seq)
+        received = self.buffer.received(max(seq, self.buffer.first))
+        if latest is None or received is None: return (count, 0.0)
+        return (count, max(0.0, latest - received))
+
+    def is_lagging(self, seq):
+        u"""
+        シーケンス番号 seq のパケットが laglimit, lagsecs より遅れているか
+        どうかを返す.
+        """
+        count, secs = self.lag(seq)
+        return (self.laglimit and count > self.laglimit) or \
+               (self.lagsecs and secs > self.lagsecs)
+
+    def resync_sequence(self, seq = None):
+        u"""
+        遅れたイテレーターが読み飛ばす先のシーケンス番号を返す.
+        遅れていない最も新しいキーフレームか, ない場合は最新のパケットになる.
+
+        seq を指定した場合, seq から読み飛ばす先までにメディアの変更 ($C)
+        があれば, 新しい情報パケットを読み飛ばさないように変更の位置にする.
+        """
+        key = self.buffer.last_keyframe()
+        if key < 0 or self.is_lagging(key):
+            key = self.seq
+
+        change = self.change_seq
+        if seq is not None and max(seq, self.buffer.first) <= change < key:
+            return change
+        return key
+
+    def wakeup(self):
+        u"""パケットを待機している全てのイテレーターを起こす."""
+        self.condition.acquire()
+        try:
+            self.condition.notify_all()
+        finally:
+            self.condition.release()
+        self.call_wakers()
+
+    def add_waker(self, func):
+        u"""
+        新たなパケットをバッファリングした時とイテレーターを起こす時に,
+        引数なしで呼ばれる関数 func を登録する. 受信スレッドから呼ばれるので,
+        すぐに返すこと. 登録できた場合は真を返す.
+        """
+        self.condition.acquire()
+        try:
+            self.wakers = self.wakers + [func]
+        finally:
+            self.condition.release()
+        return True
+
+    def remove_waker(self, func):
+        u"""add_waker() で登録した関数を外す."""
+        self.condition.acquire()
+        try:
+            self.wakers = [f for f in self.wakers if f != func]
+        finally:
+            self.condition.release()
+
+    def call_wakers(self):
+        u"""add_waker() で登録した関数を全て呼ぶ."""
+        for func in self.wakers:
+            func()
+
+    def get_packet(self, sequence):
+        u"""
+        指定したシーケンス番号に対応するパケットのデータを memoryview で返す.
+        リングバッファによる実装なので一定以上古いパケットを取得しようとすると
+        None が返ってくる. 使っている間に受信で上書きされる事があるので,
+        使い終わった後に buffer.first がそのシーケンス番号を超えていないか
+        調べること.
+        """
+        return self.buffer.get(sequence)
+
+    def iter_streaming(self):
+        u"""
+        バッファされた動画ストリーミングのパケットを順番に処理する為の
+        イテレーターを返す.
+        ただし動画を受信している間はブロッキングされているので
+        データを逐一処理したい場合はスレッドを利用する.
+        """
+        return self.StreamingIterator(self)
+
+    def __iter__(self):
+        return self.iter_streaming()
+
+
+    class StreamingIterator(object):
+        u"""
+        MMSHTTPBufferedClient でバッファされた動画のデータパケットを
+        順番に処理するためのイテレーター.
+        ストリーミングを全て処理するまでイテレートが中断しないので注意.
+        また、クライアントでの受信に追いついた時は処理をブロッキングする.
+        """
+
+        def __init__(self, client):
+            self.client  = client
+            self.seq     = client.start_sequence()
+            self.stopped = False
+            self.pending = None     # 前回返した (リングバッファ, 先頭の番号)
+
+        def stop(self):
+            u"""
+            イテレートを終了させる. パケットを待機している場合は起こす.
+            他のスレッドから呼んでもよい.
+            """
+            self.stopped = True
+            self.client.wakeup()
+
+        def __iter__(self):
+            return self
+
+        def next(self):
+            u"""
+            次のパケットを文字列にコピーして返す.
+            """
+            while True:
+                packet = self.next_packets(1)[0].tobytes()
+                if self.is_intact(): return packet
+
+        def next_packets(self, limit = None, timeout = None):
+            u"""
+            前回読み込んだ後にバッファリングされたパケットを全てリストで返す.
+            limit を指定した場合は最大 limit 個まで返す.
+            新たなパケットがない場合はバッファリングされるまでブロッキングする.
+            timeout を指定した場合は最大 timeout 秒まで待ち, 新たなパケットが
+            なければ空のリストを返す.
+
+            パケットはコピーせずにリングバッファを参照する memoryview で返す.
+            リングバッファが一周すると使っている間に上書きされる事があるので,
+            送信するか送信バッファに積んだ後に is_intact() で調べること.
+            """
+            if timeout is not None:
+                deadline = time.time() + timeout
+
+            client    = self.client
+            condition = client.condition
+            condition.acquire()
+            try:
+                while True:
+                    if self.stopped: raise StopIteration()
+                    while self.seq > client.seq:
+                        if client.terminated or self.stopped:
+                            raise StopIteration()
+                        if timeout is None:
+                            condition.wait()
+                            continue
+                        remaining = deadline - time.time()
+                        if remaining <= 0: return [ ]
+                        condition.wait(remaining)
+
+                    self.check_lag()
+
+                    last = client.seq
+                    if limit: last = min(last, self.seq + limit - 1)
+
+                    # 取り出す間に上書きされた場合は, オーバーランとして扱う
+                    ring    = client.buffer
+                    packets = [ ]
+                    for seq in xrange(self.seq, last + 1):
+                        packet = ring.get(seq)
+                        if packet is None: break
+                        packets.append(packet)
+                    if packets: break
+            finally:
+                condition.release()
+
+            self.pending = (ring, self.seq)
+            self.seq    += len(packets)
+            return packets
+
+        def is_intact(self):
+            u"""
+            前回 next_packets() で返したパケットが, 受信で上書きされずに
+            残っているかどうかを返す. 上書きされていた場合は, 次の
+            next_packets() でオーバーランとして扱うように読み込む位置を戻す.
+            """
+            if not self.pending: return True
+            ring, first = self.pending
+            if ring.first <= first: return True
+            self.seq = first
+            return False
+
+        def lag(self):
+            u"""
+            最新のパケットからの遅れをパケット数と秒数のタプルで返す.
+            """
+            return self.client.lag(self.seq)
+
+        def check_lag(self):
+            u"""
+            オーバーランしたか遅れすぎている場合に lagpolicy に従って,
+            読み飛ばすか StopIteration 例外を生成する.
+            client.condition を獲得した状態で呼ぶこと.
+            """
+            client  = self.client
+            overrun = self.seq < client.buffer.first
+            if not overrun and not client.is_lagging(self.seq):
+                return
+
+            count, secs = client.lag(self.seq)
+            if overrun: client.overruns += 1
+
+            if client.lagpolicy == client.LAG_DISCONNECT:
+                client.lag_disconnects += 1
+                logging.warning("%s is disconnecting a listener lagging "
+                                "%d packets, %.1f secs." % (client, count, secs))
+                raise StopIteration()
+
+            client.resyncs += 1
+            self.seq = client.resync_sequence(self.seq)
+            logging.info("%s resynced a listener lagging %d packets, "
+                         "%.1f secs." % (client, count, secs))
+
+        def available(self):
+            u"""
+            next() がブロッキングせずに返るかどうかを返す.
+            """
+            return self.seq <= self.client.seq or self.client.terminated or \
+                   self.stopped
+
+#-------------------------------------------------------------------------------
+
+#
+# テスト用
+#
+if __name__ == "__main__":
+    logging.basicConfig(level  = logging.DEBUG,
+                        format = '%(asctime)s %(levelname)s %(message)s')
+    logging.debug("MMSHTTPClient test starts.")
+
+    client = MMSHTTPBufferedClient()
+    client.start()
+
+    logging.debug("MMSHTTPClient has started.")
+
+    time.sleep(1)
+
+    logging.debug("Buffering Test starts.")
+
+    for p in client.iter_streaming():
+        logging.debug("%r" % p)
+
+    logging.debug("MMSHTTPClient has been closed.")
+    logging.debug("MMSHTTPClient test finished.")
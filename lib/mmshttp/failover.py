@@ -0,0 +1,431 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Failover Client Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+同じストリーミングを配信している複数のサーバー (プライマリとバックアップ)
+に同時に接続しておき, 受信が止まったサーバーから別のサーバーに
+配信先が気付かないように切り替えるクライアント.
+"""
+
+from collections import deque
+import threading
+import logging
+import struct
+import time
+import re
+
+from asf import ASFDataPacket
+from client import MMSHTTPClient, MMSHTTPBufferedClient
+
+__all__ = ["MMSHTTPFailoverFeed", "MMSHTTPFailoverClient", "parse_address"]
+
+#-------------------------------------------------------------------------------
+
+def parse_address(spec, port = 8080, path = "/"):
+    u"""
+    "[mms://]ホスト[:ポート][/パス]" 形式のアドレスを (ホスト, ポート, パス)
+    のタプルにする. ポートとパスがない場合は port と path になる.
+    解析できない場合は ValueError 例外を発生させる.
+    """
+    r = re.match(r"^(?:[^:]+://)?([^/:]+)(?::(\d+))?(.*)", spec.strip())
+    if not r:
+        raise ValueError("invalid address: %r" % spec)
+    return (r.group(1), int(r.group(2) or port), r.group(3) or path)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPFailoverFeed
+#-------------------------------------------------------------------------------
+
+class MMSHTTPFailoverFeed(MMSHTTPClient):
+    u"""
+    MMSHTTPFailoverClient の為に1つのサーバーから受信するクライアント.
+    受信したパケットはリングバッファに保存せずに owner に渡す.
+    接続が切れた場合はこのクライアントだけでリトライする.
+
+    パケットの位置は ASF データパケットの (送信時刻, シーケンス,
+    同じ送信時刻とシーケンスのパケットの中での順番) で表し,
+    他のサーバーから受信した同じパケットと突き合わせる.
+    """
+
+    daemon_thread = True
+
+    def __init__(self, owner, priority, *args, **kwargs):
+        MMSHTTPClient.__init__(self, *args, **kwargs)
+        self.owner    = owner
+        self.priority = priority    # 小さいほど優先する. プライマリは 0
+        self.last_key = None        # 前のパケットの (送信時刻, シーケンス)
+        self.dup      = 0           # 前のパケットの, 同じ位置の中での順番
+        self.changing = False       # 前のパケットがメディアの変更 ($C) か
+        self.healthy_since = 0      # 途切れずに受信し始めた時刻
+        self.received_at   = 0      # 最後にデータパケットを受信した時刻
+
+        # 切り替えに備えて保持している
+        # (位置, パケット, キーフレームかどうか, 受信時刻) のキュー
+        self.pending  = deque()
+
+    def __str__(self):
+        return "Feed[%s:%d%s]" % self.peer_info
+
+    def request_for_streaming(self):
+        u"""動画のストリーミングをリクエストする."""
+        self.last_key = None
+        self.changing = False
+        self.healthy_since = 0
+        MMSHTTPClient.request_for_streaming(self)
+
+    def receive_info(self, fp):
+        u"""動画の情報を受信して owner に知らせる."""
+        MMSHTTPClient.receive_info(self, fp)
+        self.owner.feed_info(self)
+
+    def change_info(self, packet):
+        u"""配信中に変わった動画の情報を owner に知らせる."""
+        MMSHTTPClient.change_info(self, packet)
+        self.owner.feed_info(self)
+
+    def receive_metadata(self, packet):
+        u"""アクティブなサーバーのメタデータを owner に知らせる."""
+        MMSHTTPClient.receive_metadata(self, packet)
+        if self is self.owner.active:
+            self.owner.receive_metadata(packet)
+
+    def process_packet(self, packet):
+        u"""
+        パケットを owner に渡す. 情報パケットはメディアの変更 ($C) に
+        続くものだけを渡す.
+        """
+        if packet.is_info() and not self.changing: return
+        self.changing = packet.marker == packet.MARKER_CHANGING_MEDIA
+        self.owner.offer(self, packet)
+
+    def interrupt_streaming(self):
+        u"""受信が途中で終わったことを owner に知らせる."""
+        MMSHTTPClient.interrupt_streaming(self)
+        self.owner.feed_interrupted(self)
+
+    def packet_key(self, asf):
+        u"""ASF データパケット asf の位置を返す."""
+        key = (asf.send_time, asf.sequence)
+        if key == self.last_key:
+            self.dup += 1
+        else:
+            self.last_key = key
+            self.dup = 0
+        return key + (self.dup,)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPFailoverClient
+#-------------------------------------------------------------------------------
+
+class MMSHTTPFailoverClient(MMSHTTPBufferedClient):
+    u"""
+    プライマリ (host, port, path) と backup のサーバーに同時に接続して,
+    1つ分のパケットだけをリングバッファに保存するクライアント.
+    backup には "[mms://]ホスト[:ポート][/パス]" の文字列か
+    (ホスト, ポート, パス) のタプルのリストを指定する.
+
+    リングバッファに保存するのはアクティブなサーバーのパケットで,
+    他のサーバーのパケットは切り替えに備えて少しの間だけ保持しておく.
+    アクティブなサーバーから新しいパケットが switch_delay() 秒届かない間に
+    他のサーバーがまだ保存していないパケットを受信すると, アクティブな
+    サーバーの受信が止まったとみなして切り替え, まだ保存していないパケット
+    から続ける. アクティブなサーバーの受信が途中で終わった場合はすぐに
+    切り替える.
+    優先するサーバーがまだ保存していないパケットを受信した場合は,
+    そのサーバーが dwell_secs 秒以上途切れずに受信していれば切り戻す.
+    パケットの届き方のばらつきで切り替えを繰り返さないようにする為.
+
+    サーバーを切り替えると failover イベントを通知する.
+    """
+
+    feed_class = MMSHTTPFailoverFeed
+
+    # アクティブなサーバーの受信が止まったとみなすまでの最小の秒数
+    switch_secs = 3.0
+
+    # 優先するサーバーに切り戻すまでに, そのサーバーが途切れずに
+    # 受信していなければならない秒数
+    dwell_secs = 10.0
+
+    # 送信時刻がこのミリ秒数以上戻った場合は, エンコーダーが再起動したとみなす
+    rewind_ms = 10000
+
+    def _sum_feeds(name, doc):
+        u"""全てのサーバーのクライアントの name を合計するプロパティを返す."""
+        def fget(self):
+            return sum([getattr(f, name) for f in self.feeds])
+        def fset(self, value):
+            pass
+        return property(fget, fset, doc = doc)
+
+    reconnects = _sum_feeds("reconnects", u"失敗して接続し直した回数")
+    stalls     = _sum_feeds("stalls", u"受信が止まって接続し直した回数")
+    del _sum_feeds
+
+    def __init__(self, backup = (), *args, **kwargs):
+        self.feeds     = [ ]
+        self.active    = None   # リングバッファに保存しているサーバーのクライアント
+        self.last_key  = None   # 最後に保存したパケットの位置
+        self.accepted_at = 0    # 最後にパケットを保存した時刻
+        self.failovers = 0      # サーバーを切り替えた回数
+        self.feed_lock = threading.Lock()
+
+        MMSHTTPBufferedClient.__init__(self, *args, **kwargs)
+        self.register_event("failover")
+
+        addresses = [self.peer_info]
+        for spec in backup:
+            if isinstance(spec, basestring):
+                spec = parse_address(spec, self.port, self.path)
+            addresses.append(spec)
+
+        for priority, (host, port, path) in enumerate(addresses):
+            self.feeds.append(self.feed_class(self, priority,
+                host, port, path, self.request_header, self.timeout,
+                self.retry, self.retrysec, self.retrymax, self.stalltimeout,
+                self.retrytime))
+
+    def __str__(self):
+        return "FailoverClient[%s:%d%s]" % self.peer_info
+
+    def terminate(self):
+        u"""強制的に終了する."""
+        MMSHTTPBufferedClient.terminate(self)
+        for feed in self.feeds:
+            feed.terminate()
+
+    def process(self):
+        u"""
+        全てのサーバーからの受信を開始して, 全て終了するまで待機する.
+        リトライはそれぞれのサーバーのクライアントで行う.
+        """
+        for feed in self.feeds:
+            feed.start()
+        for feed in self.feeds:
+            feed.join()
+
+    def feed_info(self, feed):
+        u"""
+        サーバーのクライアント feed が受信したレスポンスヘッダーと
+        情報パケットを, まだないか保存してあったものを使っているか
+        アクティブなサーバーの情報パケットが変わった場合に使う.
+        変わった場合にジッターバッファがあれば, 先に受信した古いメディアの
+        パケットを全てリングバッファに保存してから差し替える.
+        """
+        old, info = self.info_packet, feed.info_packet
+        if old is not None and not self.info_cached and \
+           (feed is not self.active or str(info) == str(old)):
+            return
+        changed = old is not None and not self.info_cached
+
+        if not changed:
+            self.adopt_info(feed.status_line, feed.header, info)
+            return
+
+        status_line, header = feed.status_line, feed.header
+        if self.jitter:
+            self.jitter.put_marker(lambda: self.adopt_info(
+                status_line, header, info, old))
+        else:
+            self.adopt_info(status_line, header, info, old)
+
+    def adopt_info(self, status_line, header, info, old = None):
+        u"""
+        サーバーから受信したレスポンスヘッダーと情報パケットに差し替える.
+        old が与えられた場合は, その情報パケットから変わったことを知らせる.
+        """
+        media_info = self.media_info.copy()
+        media_info.update(info.media_info)
+        ext_info   = self.ext_info.copy()
+        ext_info.update(info.ext_info)
+
+        self.status_line = status_line
+        self.header      = header
+        self.media_info  = media_info
+        self.ext_info    = ext_info
+        self.info_packet = info
+        self.info_cached = False
+        self.resize_buffer()
+        self.notify_event("info_packet")
+        if old is not None: self.notify_event("change_media", old, info)
+
+    def offer(self, feed, packet):
+        u"""
+        サーバーのクライアント feed が受信したパケットを処理する.
+        アクティブなサーバーのものであればリングバッファに保存して,
+        そうでなければ切り替えに備えて保持する.
+        """
+        if not feed.started: return
+
+        # データパケット以外はアクティブなサーバーのものだけを保存する
+        if packet.marker != packet.MARKER_MEDIA_DATA:
+            if feed is self.active:
+                self.store_packet(packet, self.is_keyframe(packet))
+            return
+
+        streams = self.info_packet and self.info_packet.video_streams
+        try:
+            # $D のマーカーとサイズ (4byte) と MMS Pre-Header (8byte) をとばす
+            asf = ASFDataPacket(packet.raw_packet, 12)
+        except struct.error:
+            asf = None
+
+        # 位置が分からないパケットは突き合わせられない
+        if asf is None:
+            if feed is self.active: self.store_packet(packet)
+            return
+
+        key      = feed.packet_key(asf)
+        keyframe = asf.has_keyframe(streams)
+        switched = None
+
+        self.feed_lock.acquire()
+        try:
+            self.check_health(feed)
+            if feed is self.active:
+                if self.is_newer(key): self.accept(key, packet, keyframe)
+                return
+
+            feed.pending.append((key, packet.detach(), keyframe, time.time()))
+            self.trim_pending(feed)
+            if self.should_switch(feed):
+                switched = (self.active, feed)
+                self.switch(feed)
+        finally:
+            self.feed_lock.release()
+
+        if switched: self.notify_switch(*switched)
+
+    def feed_interrupted(self, feed):
+        u"""
+        サーバーのクライアント feed の受信が途中で終わった場合に呼ばれる.
+        アクティブなサーバーであれば, 受信しているサーバーに切り替える.
+        """
+        switched = None
+        self.feed_lock.acquire()
+        try:
+            if feed is not self.active: return
+            candidates = [f for f in self.feeds
+                          if f is not feed and f.started and not f.terminated]
+            candidates.sort(key = lambda f: f.priority)
+            switched = (feed, candidates and candidates[0] or None)
+            self.switch(switched[1])
+        finally:
+            self.feed_lock.release()
+
+        self.notify_switch(*switched)
+
+    def is_newer(self, key):
+        u"""位置 key のパケットがまだリングバッファに保存されていないかどうか."""
+        last = self.last_key
+        return last is None or key > last or last[0] - key[0] >= self.rewind_ms
+
+    def accept(self, key, packet, keyframe):
+        u"""パケットをリングバッファに保存する. feed_lock を獲得して呼ぶこと."""
+        self.last_key    = key
+        self.accepted_at = time.time()
+        self.store_packet(packet, keyframe)
+
+    def check_health(self, feed):
+        u"""
+        サーバーのクライアント feed がデータパケットを受信した時刻を記録する.
+        前のパケットから switch_delay() 秒以上空いた場合は, 途切れずに
+        受信し始めた時刻をやり直す. feed_lock を獲得して呼ぶこと.
+        """
+        now = time.time()
+        if not feed.healthy_since or \
+           now - feed.received_at > self.switch_delay():
+            feed.healthy_since = now
+        feed.received_at = now
+
+    def trim_pending(self, feed):
+        u"""
+        保持しているパケットのうち, 既に保存したものと, リングバッファに
+        入りきらないほど古いものを捨てる. feed_lock を獲得して呼ぶこと.
+        """
+        pending = feed.pending
+        while pending and not self.is_newer(pending[0][0]):
+            pending.popleft()
+        while len(pending) > self.buffer.slots:
+            pending.popleft()
+
+    def should_switch(self, feed):
+        u"""
+        アクティブなサーバーから feed に切り替えるかどうかを返す.
+        feed_lock を獲得して呼ぶこと.
+        """
+        if not feed.pending: return False
+        active = self.active
+        if active is None or active.terminated:
+            return True
+
+        now = time.time()
+
+        # 優先するサーバーの方が先に受信していて, 十分な間途切れていない
+        if feed.priority < active.priority and \
+           now - feed.healthy_since >= self.dwell_secs:
+            return True
+
+        # アクティブなサーバーの受信が止まっている
+        return now - self.accepted_at > self.switch_delay()
+
+    def switch(self, feed):
+        u"""
+        アクティブなサーバーを feed に切り替えて, feed で保持していた
+        まだ保存していないパケットを保存する. feed_lock を獲得して呼ぶこと.
+        """
+        # 最初に受信を始めた時は数えない
+        if feed is not None and self.last_key is not None:
+            self.failovers += 1
+
+        self.active      = feed
+        self.accepted_at = time.time()
+        if feed is None: return
+
+        pending = feed.pending
+        while pending:
+            key, packet, keyframe, received = pending.popleft()
+            if self.is_newer(key): self.accept(key, packet, keyframe)
+
+    def notify_switch(self, old, new):
+        u"""
+        アクティブなサーバーが old から new に変わったことをログに記録して,
+        イベントを通知する. 受信しているサーバーがなくなった場合は new が
+        None になる.
+        """
+        if new is None:
+            logging.warning("%s lost %s and has no other server." %
+                            (self, old))
+            self.interrupt_streaming()
+            return
+
+        if not self.started:
+            logging.info("%s has started receiving media streaming from %s." %
+                         (self, new))
+            self.notify_event("start_streaming")
+            self.started = True
+            return
+
+        if old is None:
+            logging.info("%s has resumed receiving media streaming from %s." %
+                         (self, new))
+            self.notify_event("resume_streaming")
+        else:
+            logging.warning("%s switched from %s to %s." % (self, old, new))
+        self.notify_event("failover", old, new)
+
+    def switch_delay(self):
+        u"""
+        アクティブなサーバーの受信が止まったとみなすまでの秒数を返す.
+        switch_secs 秒か, 情報パケットのパケットサイズとビットレートから
+        分かるパケット1つ分の時間の長い方にする.
+        """
+        info  = self.info_packet
+        props = info and info.file_properties or { }
+        size  = props.get("max_packet_size", 0)
+        rate  = info and info.bitrate
+        if not size or not rate: return self.switch_secs
+        return max(self.switch_secs, size * 8.0 / rate)
@@ -0,0 +1,190 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Info Cache Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+受信したレスポンスヘッダーと情報パケット ($H) をディレクトリに保存しておき,
+再起動した時にサーバーへ接続する前から使えるようにする.
+"""
+
+from StringIO import StringIO
+import tempfile
+import logging
+import hashlib
+import httplib
+import struct
+import os
+import os.path
+
+__all__ = ["MMSHTTPInfoCache"]
+
+#-------------------------------------------------------------------------------
+# MMSHTTPInfoCache
+#-------------------------------------------------------------------------------
+
+class MMSHTTPInfoCache(object):
+    u"""
+    クライアントのステータス行, レスポンスヘッダー, 情報パケットを
+    受信するサーバーの URL 毎にファイルに保存するクラス.
+
+    attach() したクライアントには保存してあるものを読み込んで, 受信を
+    開始する前からヘッダーとプレイリストのリクエストに応答できるようにする.
+    サーバーから受信したものは info_packet イベントで保存してあるものと
+    比べて, 変わっていればファイルを置き換える.
+
+    ファイルは一時ファイルに書き込んでから名前を変えるので,
+    書き込み中に終了しても壊れたファイルが残ることはない.
+    """
+
+    # ファイルの先頭につける識別子
+    magic = "MMSHTTP-INFO\x01"
+
+    # ファイルの拡張子
+    suffix = ".info"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+        # URL -> 最後に読み書きした (ファイルの内容, 情報パケットの文字列)
+        self.saved     = { }
+
+    def __str__(self):
+        return "InfoCache[%s]" % self.directory
+
+    def path(self, url):
+        u"""URL url のレスポンスを保存するファイルのパスを返す."""
+        name = hashlib.md5(url).hexdigest() + self.suffix
+        return os.path.join(self.directory, name)
+
+    def attach(self, client):
+        u"""
+        クライアント client に保存してあるレスポンスを読み込んで,
+        受信したレスポンスを保存するようにする.
+        """
+        client.add_event_handler("info_packet", self)
+
+        cached = self.load(client.url)
+        if cached:
+            status, header, data = cached
+            info = client.info_packet_class()
+            info.parse(data)
+            client.restore_info(status, header, info)
+
+    def load(self, url):
+        u"""
+        URL url の保存してあるレスポンスを読み込んで
+        (status_line, header, 情報パケットの文字列) のタプルで返す.
+        ないか読み込めない場合は None を返す.
+        """
+        path = self.path(url)
+        try:
+            f = open(path, "rb")
+            try:
+                data = f.read()
+            finally:
+                f.close()
+        except IOError:
+            return None
+
+        try:
+            cached = self.unpack(url, data)
+        except (ValueError, struct.error), e:
+            logging.warning("%s ignored the broken cache %s: %s" %
+                            (self, path, e))
+            return None
+
+        self.saved[url] = (data, cached[2])
+        logging.info("%s loaded the media info of %s." % (self, url))
+        return cached
+
+    def save(self, client):
+        u"""
+        クライアント client が受信したレスポンスを保存する.
+        前回読み書きしたものと同じ場合は書き込まない.
+        """
+        url  = client.url
+        data = self.pack(client)
+        if self.saved.get(url, (None,))[0] == data: return
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        path = self.path(url)
+        fd, temp = tempfile.mkstemp(self.suffix, ".", self.directory)
+        try:
+            f = os.fdopen(fd, "wb")
+            try:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                f.close()
+
+            # Windows では置き換え先があると名前を変えられない
+            try:
+                os.rename(temp, path)
+            except OSError:
+                os.remove(path)
+                os.rename(temp, path)
+        except:
+            if os.path.exists(temp): os.remove(temp)
+            raise
+
+        self.saved[url] = (data, str(client.info_packet))
+        logging.debug("%s saved the media info of %s." % (self, url))
+
+    def pack(self, client):
+        u"""クライアントのレスポンスをファイルの内容にする."""
+        url    = client.url
+        status = client.status_line or ""
+        header = client.header and "".join(client.header.headers) or ""
+        info   = client.info_packet and str(client.info_packet) or ""
+        return self.magic + \
+               struct.pack("<IIII", len(url), len(status), len(header),
+                           len(info)) + \
+               url + status + header + info
+
+    def unpack(self, url, data):
+        u"""
+        ファイルの内容を (status_line, header, 情報パケットの文字列) の
+        タプルにする.
+        URL が url と違う場合や内容が足りない場合は ValueError 例外を発生させる.
+        """
+        if not data.startswith(self.magic):
+            raise ValueError("unknown format")
+        pos   = len(self.magic)
+        sizes = struct.unpack_from("<IIII", data, pos)
+        pos  += struct.calcsize("<IIII")
+        if pos + sum(sizes) != len(data):
+            raise ValueError("unexpected size")
+
+        fields = [ ]
+        for size in sizes:
+            fields.append(data[pos:pos + size])
+            pos += size
+        if fields[0] != url:
+            raise ValueError("different url %r" % fields[0])
+        if not fields[3]:
+            raise ValueError("no media info")
+
+        return (fields[1], httplib.HTTPMessage(StringIO(fields[2]), 0),
+                fields[3])
+
+    def on_info_packet(self, client):
+        u"""
+        受信したレスポンスを保存してあるものと比べて, 変わっていれば
+        保存し直す. 保存してあるものを読み込んだ時は何もしない.
+        """
+        if client.info_cached: return
+
+        saved = self.saved.get(client.url)
+        if saved and saved[1] != str(client.info_packet):
+            logging.warning("%s found the media info of %s has changed." %
+                            (self, client.url))
+        try:
+            self.save(client)
+        except (IOError, OSError), e:
+            logging.warning("%s failed saving the media info of %s: %s" %
+                            (self, client.url, e))
@@ -0,0 +1,233 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Jitter Buffer Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+まとまって届いたパケットを少しの間だけ保持して, ASF データパケットの
+送信時刻の間隔に合わせてリングバッファに保存する.
+"""
+
+from collections import deque
+import threading
+import logging
+import struct
+import time
+
+from asf import ASFDataPacket
+
+__all__ = ["MMSHTTPJitterBuffer"]
+
+#-------------------------------------------------------------------------------
+# MMSHTTPJitterBuffer
+#-------------------------------------------------------------------------------
+
+class MMSHTTPJitterBuffer(object):
+    u"""
+    クライアント client が受信したパケットを保持して, 送信時刻の間隔で
+    client.put_packet() に渡すクラス.
+
+    最近 window 個のデータパケットの (受信時刻 - 送信時刻) のうち最小の
+    ものを遅れのないパケットとみなし, 送信時刻にその差と保持する秒数
+    delay を足した時刻に渡す. delay は最近の遅れのばらつきの headroom 倍で,
+    mindelay 秒から maxdelay 秒の間で変わり, 増やす時はすぐに,
+    減らす時は少しずつ変える.
+
+    保持しているパケットが全て渡された後に, 渡す時刻を過ぎて届いた
+    パケットはアンダーランとして数える. その遅れも次からの delay に含まれる.
+    送信時刻が分からないパケットは前のパケットと一緒に渡す.
+
+    保持しているパケット数, delay (ミリ秒), アンダーランの回数は
+    client の jitter_packets, jitter_delay, jitter_underruns に書き込む.
+
+    put_marker() で入れた関数は, それより前に保持したパケットを全て渡した後,
+    後のパケットを渡す前に呼ばれる. 情報パケットの差し替えなどを,
+    古いメディアのパケットがリングバッファに保存されるまで遅らせる為に使う.
+    """
+
+    # 遅れのばらつきを調べるデータパケットの数
+    window = 256
+
+    # delay を遅れのばらつきの何倍にするか
+    headroom = 1.25
+
+    # delay を減らす時に, 1パケットごとに目標に近づける割合
+    decay = 1.0 / 64
+
+    # 送信時刻がこのミリ秒数以上戻った場合は, エンコーダーが再起動したとみなす
+    rewind_ms = 10000
+
+    def __init__(self, client, maxdelay, mindelay = 0.0):
+        self.client   = client
+        self.maxdelay = maxdelay
+        self.mindelay = min(mindelay, maxdelay)
+        self.delay    = self.mindelay
+        self.transits = deque(maxlen = self.window)
+        # (渡す時刻, パケット, キーフレームか) か,
+        # マーカーの (渡す時刻, None, 呼ぶ関数)
+        self.queue    = deque()
+        self.last     = 0.0         # 最後に保持したパケットを渡す時刻
+        self.last_ms  = None        # 最後のデータパケットの送信時刻
+        self.thread   = None
+        self.stopped  = False
+        self.condition = threading.Condition()
+
+    def __str__(self):
+        return "Jitter[%s]" % self.client
+
+    def start(self):
+        u"""別スレッドでパケットを渡し始める."""
+        if self.thread: return
+        self.stopped = False
+
+        t = threading.Thread(target = self.release_thread_proc)
+        t.setName(str(self))
+        t.setDaemon(1)
+        t.start()
+        self.thread = t
+
+    def close(self):
+        u"""
+        パケットを渡すのを終了して, 保持しているパケットを捨てる.
+        マーカーの関数は呼んでおく.
+        """
+        self.condition.acquire()
+        try:
+            self.stopped = True
+            markers = [e[2] for e in self.queue if e[1] is None]
+            self.queue.clear()
+            self.condition.notify_all()
+        finally:
+            self.condition.release()
+        self.thread = None
+        self.client.jitter_packets = 0
+
+        for func in markers:
+            func()
+
+    def reset(self):
+        u"""
+        送信時刻が続かなくなった場合に, 遅れのばらつきを調べ直す.
+        condition を獲得して呼ぶこと.
+        """
+        self.transits.clear()
+        self.last_ms = None
+
+    def put(self, packet, key = False):
+        u"""
+        パケットを保持する. key が真の場合はキーフレームの先頭を含む
+        パケットとする. 受信バッファを参照しているパケットは文字列にする.
+        """
+        packet.detach()
+        now = time.time()
+        send_ms = self.send_time(packet)
+
+        self.condition.acquire()
+        try:
+            if packet.marker == packet.MARKER_CHANGING_MEDIA:
+                self.reset()
+
+            release = max(self.last, now)
+            if send_ms is not None:
+                release = self.schedule(send_ms, now)
+
+            # 全て渡した後に, 渡す時刻を過ぎて届いた
+            if not self.queue and release < now:
+                self.underrun(now - release)
+                release = now
+
+            self.last = max(self.last, release)
+            self.queue.append((self.last, packet, key))
+            self.client.jitter_packets = len(self.queue)
+            self.condition.notify_all()
+        finally:
+            self.condition.release()
+
+    def put_marker(self, func):
+        u"""
+        保持しているパケットを全て渡した後に, 引数なしで呼ぶ関数 func を入れる.
+        """
+        self.condition.acquire()
+        try:
+            self.last = max(self.last, time.time())
+            self.queue.append((self.last, None, func))
+            self.condition.notify_all()
+        finally:
+            self.condition.release()
+
+    def schedule(self, send_ms, now):
+        u"""
+        送信時刻 send_ms (ミリ秒) のデータパケットを渡す時刻を返す.
+        condition を獲得して呼ぶこと.
+        """
+        last_ms = self.last_ms
+        if last_ms is not None and last_ms - send_ms >= self.rewind_ms:
+            logging.info("%s found the send time rewound." % self)
+            self.reset()
+        self.last_ms = send_ms
+
+        sent = send_ms / 1000.0
+        self.transits.append(now - sent)
+        base    = min(self.transits)
+        spread  = max(self.transits) - base
+        release = sent + base + self.delay
+
+        # 次のパケットからの delay を, ばらつきが大きくなった場合はすぐに,
+        # 小さくなった場合は少しずつ変える
+        target = max(self.mindelay, min(self.maxdelay, spread * self.headroom))
+        if target > self.delay:
+            self.delay = target
+        else:
+            self.delay -= (self.delay - target) * self.decay
+        self.client.jitter_delay = int(self.delay * 1000)
+
+        return release
+
+    def underrun(self, late):
+        u"""
+        パケットが渡す時刻を late 秒過ぎて届いた場合に呼ばれる.
+        condition を獲得して呼ぶこと.
+        """
+        self.client.jitter_underruns += 1
+        logging.debug("%s ran out of packets for %.3f secs." % (self, late))
+
+    def send_time(self, packet):
+        u"""
+        データパケットの送信時刻 (ミリ秒) を返す. 分からない場合は None.
+        """
+        if packet.marker != packet.MARKER_MEDIA_DATA: return None
+        try:
+            # $D のマーカーとサイズ (4byte) と MMS Pre-Header (8byte) をとばす
+            return ASFDataPacket(packet.raw_packet, 12).send_time
+        except struct.error:
+            return None
+
+    def release_thread_proc(self):
+        u"""スレッド用プロシージャ"""
+        condition = self.condition
+        while True:
+            condition.acquire()
+            try:
+                while not self.stopped:
+                    if self.queue:
+                        wait = self.queue[0][0] - time.time()
+                        if wait <= 0: break
+                        condition.wait(wait)
+                    else:
+                        condition.wait()
+                if self.stopped: return
+
+                now = time.time()
+                packets = [ ]
+                while self.queue and self.queue[0][0] <= now:
+                    packets.append(self.queue.popleft()[1:])
+                self.client.jitter_packets = len(self.queue)
+            finally:
+                condition.release()
+
+            for packet, key in packets:
+                if packet is None:
+                    key()
+                else:
+                    self.client.put_packet(packet, key)
@@ -1,134 +1,316 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-MMS-HTTP Packet Classes
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-from StringIO import StringIO
-
-import asf
-
-__all__ = ["MMSHTTPPacket", "MMSHTTPInfoPacket"]
-
-#-------------------------------------------------------------------------------
-# MMSHTTPPacket
-#-------------------------------------------------------------------------------
-
-class MMSHTTPPacket(object):
-    u"""
-    MMS-HTTP プロトコルで配信されるパケット1つを表すクラス.
-    """
-
-    MARKER_MEDIA_INFO     = "$H"
-    MARKER_MEDIA_DATA     = "$D"
-    MARKER_MEDIA_DATA2    = "?D"
-    MARKER_END_OF_STREAM  = "$E"
-    MARKER_CHANGING_MEDIA = "$C"
-    MARKER_META_DATA      = "$M"
-    MARKER_PAIR_DATA      = "$P"
-
-    def __init__(self, fp = None):
-        self.raw_packet = ""
-        self.marker     = ""
-        self.data_size  = 0
-        self.data       = ""
-
-        if fp: self.receive(fp)
-
-    def __repr__(self):
-        return "<Packet %s Length: %d>" % (self.marker, self.data_size)
-
-    def __str__(self):
-        return self.raw_packet
-
-    def receive(self, fp):
-        u"""
-        渡されたファイルポインタからパケットを読み込む.
-        読み込みに失敗した場合は EOFError 例外を発生させる.
-        """
-        if not fp or fp.closed: return False
-
-        # マーカー（パケットの種類を表す文字列）を受信
-        marker = fp.read(2)
-        if not marker: raise EOFError("can't receive a marker.")
-        self.raw_packet += marker
-        self.marker      = marker
-
-        # パケットの残りデータサイズを受信
-        sizebin = fp.read(2)
-        if not sizebin: raise EOFError("can't receive a packet size.")
-        self.raw_packet += sizebin
-        self.data_size   = ord(sizebin[1]) << 8 | ord(sizebin[0])
-
-        # パケットのデータを全て読み込む
-        data = fp.read(self.data_size)
-        if not data: raise EOFError("can't receive a data.")
-        self.raw_packet += data
-        self.data        = data
-
-        return True
-
-    def is_info(self):
-        u"""パケットが情報パケットである場合は真を返す."""
-        return self.marker == self.MARKER_MEDIA_INFO
-
-    def is_last(self):
-        u"""パケットが最後のパケットである場合は真を返す."""
-        return self.marker == self.MARKER_END_OF_STREAM
-
-
-    class StreamingIterator(object):
-        u"""
-        MMSHTTPPacket のストリーミングを受信する為のイテレーター.
-        """
-
-        def __init__(self, fp):
-            self.fp = fp
-
-        def __iter__(self):
-            return self
-
-        def next(self):
-            if not self.fp:
-                raise StopIteration()
-
-            p = MMSHTTPPacket(self.fp)
-            if p.is_last(): self.fp = None
-            return p
-
-#-------------------------------------------------------------------------------
-# MMSHTTPInfoPacket
-#-------------------------------------------------------------------------------
-
-class MMSHTTPInfoPacket(MMSHTTPPacket):
-    u"""
-    MMS-HTTP プロトコルで配信されるパケットのうち
-    ストリーミングのメタ情報などが含まれる情報パケット($H)を表すクラス.
-    """
-
-    def __init__(self, fp = None):
-        self.media_info = { }
-        self.ext_info = { }
-        MMSHTTPPacket.__init__(self, fp)
-
-    def receive(self, fp):
-        u"""
-        渡されたファイルポインタからパケットを読み込む.
-        読み込みに失敗した場合は EOFError 例外を発生させる.
-        """
-        r = MMSHTTPPacket.receive(self, fp)
-        if not r: return r
-
-        # パケットの先頭についている MMS Pre-Header (8バイト) をとばす
-        data = StringIO( self.data[8:] )
-        try:
-            reader = asf.ASFReader(data)
-            self.media_info = reader.media_info
-            self.ext_info   = reader.ext_info
-            reader.close()
-        except EOFError:
-            pass
-
-        return r
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Packet Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+from StringIO import StringIO
+import struct
+
+import asf
+
+__all__ = ["MMSHTTPPacket", "MMSHTTPPacketReader", "MMSHTTPInfoPacket",
+           "MMSHTTPMetaDataPacket"]
+
+def _bytes(data):
+    u"""文字列か memoryview のデータを文字列で返す."""
+    if isinstance(data, str): return data
+    return data.tobytes()
+
+#-------------------------------------------------------------------------------
+# MMSHTTPPacket
+#-------------------------------------------------------------------------------
+
+class MMSHTTPPacket(object):
+    u"""
+    MMS-HTTP プロトコルで配信されるパケット1つを表すクラス.
+
+    MMSHTTPPacketReader が返すパケットの raw_packet は, 受信バッファを
+    参照する memoryview で, 次のパケットを読み込むと上書きされる事がある.
+    それより後まで保持する場合は detach() で文字列にすること.
+    data と str() はその度に文字列にコピーして返す.
+    """
+
+    MARKER_MEDIA_INFO     = "$H"
+    MARKER_MEDIA_DATA     = "$D"
+    MARKER_MEDIA_DATA2    = "?D"
+    MARKER_END_OF_STREAM  = "$E"
+    MARKER_CHANGING_MEDIA = "$C"
+    MARKER_META_DATA      = "$M"
+    MARKER_PAIR_DATA      = "$P"
+
+    def __init__(self, fp = None):
+        self.raw_packet = ""
+        self.marker     = ""
+        self.data_size  = 0
+
+        if fp: self.receive(fp)
+
+    def __repr__(self):
+        return "<Packet %s Length: %d>" % (self.marker, self.data_size)
+
+    def create(cls, marker, data = ""):
+        u"""マーカーとデータからパケットを作成する."""
+        packet = cls()
+        packet.parse(marker + struct.pack("<H", len(data)) + data)
+        return packet
+    create = classmethod(create)
+
+    def __str__(self):
+        return _bytes(self.raw_packet)
+
+    def _get_data(self):
+        return _bytes(self.raw_packet[4:])
+
+    data = property(_get_data, doc = u"パケットのデータ部の文字列")
+
+    def detach(self):
+        u"""
+        受信バッファを参照している raw_packet を文字列にコピーして,
+        次のパケットを読み込んだ後も使えるようにする. 自身を返す.
+        """
+        self.raw_packet = _bytes(self.raw_packet)
+        return self
+
+    def receive(self, fp):
+        u"""
+        渡されたファイルポインタからパケットを読み込む.
+        読み込みに失敗した場合は EOFError 例外を発生させる.
+        """
+        if not fp or fp.closed: return False
+
+        # マーカー（パケットの種類を表す文字列）を受信
+        marker = fp.read(2)
+        if not marker: raise EOFError("can't receive a marker.")
+
+        # パケットの残りデータサイズを受信
+        sizebin = fp.read(2)
+        if not sizebin: raise EOFError("can't receive a packet size.")
+        data_size = ord(sizebin[1]) << 8 | ord(sizebin[0])
+
+        # パケットのデータを全て読み込む
+        data = fp.read(data_size)
+        if not data: raise EOFError("can't receive a data.")
+
+        self.parse(marker + sizebin + data)
+        return True
+
+    def parse(self, raw_packet):
+        u"""
+        マーカーからデータまでを含むパケット全体を解析する.
+        raw_packet は文字列か memoryview で, コピーせずにそのまま参照する.
+        """
+        self.raw_packet = raw_packet
+        self.marker     = _bytes(raw_packet[:2])
+        self.data_size  = ord(raw_packet[3]) << 8 | ord(raw_packet[2])
+
+    def is_info(self):
+        u"""パケットが情報パケットである場合は真を返す."""
+        return self.marker == self.MARKER_MEDIA_INFO
+
+    def is_last(self):
+        u"""パケットが最後のパケットである場合は真を返す."""
+        return self.marker == self.MARKER_END_OF_STREAM
+
+
+    class StreamingIterator(object):
+        u"""
+        MMSHTTPPacket のストリーミングを受信する為のイテレーター.
+        """
+
+        def __init__(self, fp):
+            self.fp = fp
+
+        def __iter__(self):
+            return self
+
+        def next(self):
+            if not self.fp:
+                raise StopIteration()
+
+            p = MMSHTTPPacket(self.fp)
+            if p.is_last(): self.fp = None
+            return p
+
+#-------------------------------------------------------------------------------
+# MMSHTTPPacketReader
+#-------------------------------------------------------------------------------
+
+class MMSHTTPPacketReader(object):
+    u"""
+    ファイルポインタから MMS-HTTP のパケットを受信して順番に返すイテレーター.
+
+    recv_into で再利用する大きなバッファにまとめて受信し, その中から
+    パケットを切り出す. パケットはコピーせずに受信バッファを参照する
+    memoryview になり, リングバッファに保存する時に1回だけコピーされる.
+    受信バッファは次のパケットを読み込む時に上書きされる事があるので,
+    それより後まで使うパケットは detach() しておくこと.
+
+    httplib のレスポンスはバッファリングせずに読み込まれるので,
+    ファイルポインタがソケットのものであれば, レスポンスヘッダーを受信した
+    後のデータはソケットから直接読み込める.
+    """
+
+    # 受信バッファのバイト数 (パケットの最大長 4 + 65535 より大きくする)
+    bufsize = 262144
+
+    def __init__(self, fp, packet_class = MMSHTTPPacket):
+        # socket._fileobject の場合は元のソケットから直接受信する
+        sock = getattr(fp, "_sock", fp)
+        self.recv_into    = getattr(sock, "recv_into", None) or sock.readinto
+        self.packet_class = packet_class
+        self.buffer       = bytearray(self.bufsize)
+        self.view         = memoryview(self.buffer)
+        self.start        = 0       # 未処理データの先頭
+        self.end          = 0       # 受信済みデータの末尾
+        self.finished     = False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        u"""
+        次のパケットを返す.
+        受信に失敗した場合は EOFError 例外を発生させる.
+        """
+        if self.finished:
+            raise StopIteration()
+
+        p = self.packet_class()
+        p.parse(self.read_frame())
+        if p.is_last(): self.finished = True
+        return p
+
+    def read_frame(self):
+        u"""
+        パケット1つ分のデータを受信バッファを参照する memoryview で返す.
+        """
+        while True:
+            size = self.end - self.start
+            if size >= 4:
+                b = self.buffer
+                length = 4 + (b[self.start + 3] << 8 | b[self.start + 2])
+                if size >= length:
+                    frame = self.view[self.start:self.start + length]
+                    self.start += length
+                    return frame
+            self.fill()
+
+    def fill(self):
+        u"""
+        バッファの空いている所に受信する.
+        接続が閉じられた場合は EOFError 例外を発生させる.
+        """
+        size = self.end - self.start
+        if size == 0:
+            self.start = self.end = 0
+        elif self.bufsize - self.end < 65539:
+            # 途中までのパケットをバッファの先頭に移動
+            self.buffer[0:size] = self.view[self.start:self.end].tobytes()
+            self.start, self.end = 0, size
+
+        n = self.recv_into(self.view[self.end:])
+        if not n:
+            if   size == 0: raise EOFError("can't receive a marker.")
+            elif size <  4: raise EOFError("can't receive a packet size.")
+            else:           raise EOFError("can't receive a data.")
+        self.end += n
+
+#-------------------------------------------------------------------------------
+# MMSHTTPInfoPacket
+#-------------------------------------------------------------------------------
+
+class MMSHTTPInfoPacket(MMSHTTPPacket):
+    u"""
+    MMS-HTTP プロトコルで配信されるパケットのうち
+    ストリーミングのメタ情報などが含まれる情報パケット($H)を表すクラス.
+    """
+
+    def __init__(self, fp = None):
+        self.media_info      = { }
+        self.ext_info        = { }
+        self.file_properties = { }
+        self.stream_bitrates = { }
+        self.streams         = { }
+        self.video_streams   = [ ]
+        self.bitrate         = 0
+        MMSHTTPPacket.__init__(self, fp)
+
+    def parse(self, raw_packet):
+        u"""
+        マーカーからデータまでを含むパケット全体の文字列を解析する.
+        データ部に含まれる ASF ヘッダーからメタ情報を読み込む.
+        """
+        MMSHTTPPacket.parse(self, raw_packet)
+
+        # パケットの先頭についている MMS Pre-Header (8バイト) をとばす
+        reader = asf.ASFReader()
+        try:
+            try:
+                reader.read( StringIO(self.data[8:]) )
+            except EOFError:
+                pass
+        finally:
+            reader.close()
+
+        self.media_info      = reader.media_info
+        self.ext_info        = reader.ext_info
+        self.file_properties = reader.file_properties
+        self.stream_bitrates = reader.stream_bitrates
+        self.streams         = reader.streams
+        self.video_streams   = reader.video_streams()
+        self.bitrate         = reader.bitrate()
+
+#-------------------------------------------------------------------------------
+# MMSHTTPMetaDataPacket
+#-------------------------------------------------------------------------------
+
+class MMSHTTPMetaDataPacket(MMSHTTPPacket):
+    u"""
+    MMS-HTTP プロトコルで配信されるパケットのうち
+    ',' で区切られた 名前=値 リストのメタデータが含まれる
+    メタデータパケット($M)を表すクラス.
+    """
+
+    def __init__(self, fp = None):
+        self.metadata = { }
+        MMSHTTPPacket.__init__(self, fp)
+
+    def parse(self, raw_packet):
+        u"""
+        マーカーからデータまでを含むパケット全体の文字列を解析する.
+        データ部のメタデータを名前を小文字にした辞書に読み込む.
+        """
+        MMSHTTPPacket.parse(self, raw_packet)
+        self.metadata = self.parse_metadata(self.data)
+
+    def parse_metadata(data):
+        u"""
+        メタデータの文字列を辞書にする. 値は '"' で囲まれていてもよく,
+        その中の ',' は区切りとみなさない. UTF-16 の場合もある.
+        """
+        if len(data) >= 2 and data[1::2].strip("\0") == "":
+            text = data.decode("utf_16_le", "replace")
+        else:
+            text = data.decode("utf_8", "replace")
+        text = text.rstrip(u"\0")
+
+        metadata = { }
+        quoted = False
+        start  = 0
+        for i, c in enumerate(text + u","):
+            if c == u'"':
+                quoted = not quoted
+            elif c == u"," and not quoted:
+                pair = text[start:i].split(u"=", 1)
+                start = i + 1
+                name = pair[0].strip().lower()
+                if not name: continue
+                value = len(pair) >= 2 and pair[1].strip() or u""
+                if len(value) >= 2 and value[0] == value[-1] == u'"':
+                    value = value[1:-1]
+                metadata[name] = value
+        return metadata
+    parse_metadata = staticmethod(parse_metadata)
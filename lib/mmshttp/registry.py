@@ -0,0 +1,169 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Connection Registry
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+import threading
+import socket
+import time
+
+__all__ = ["ConnectionRecord", "ConnectionRegistry"]
+
+#-------------------------------------------------------------------------------
+# ConnectionRecord
+#-------------------------------------------------------------------------------
+
+class ConnectionRecord(object):
+    u"""
+    サーバーに接続しているクライアント1つの情報を表すクラス.
+
+    送信量や遅れは接続を処理しているスレッドだけが更新するので,
+    更新にロックは必要ない.
+    """
+
+    __slots__ = ("id", "address", "started", "user_agent", "requests",
+                 "bytes_sent", "packets_sent", "lag_packets", "lag_secs",
+                 "request", "waiting", "stream", "admitted", "bitrate")
+
+    def __init__(self, id, address, request = None):
+        self.id           = id
+        self.address      = address     # (IP アドレス, ポート)
+        self.request      = request     # 接続のソケット
+        self.started      = time.time()
+        self.waiting      = self.started    # クライアントを待ち始めた時刻
+        self.stream       = None        # 配信しているストリーミングのイテレーター
+        self.admitted     = False       # ポリシーが受け付けた接続かどうか
+        self.bitrate      = 0           # 配信しているストリーミングのビットレート
+        self.user_agent   = ""
+        self.requests     = 0           # この接続で処理したリクエストの数
+        self.bytes_sent   = 0
+        self.packets_sent = 0
+        self.lag_packets  = 0
+        self.lag_secs     = 0.0
+
+    def __repr__(self):
+        return "<Connection #%d %s:%d Sent: %d bytes>" % \
+               (self.id, self.address[0], self.address[1], self.bytes_sent)
+
+    def sent(self, size, packets = 0):
+        u"""size バイト, packets 個のパケットを送信したことを記録する."""
+        self.bytes_sent   += size
+        self.packets_sent += packets
+
+    def set_lag(self, lag):
+        u"""(パケット数, 秒数) のタプルで最新のパケットからの遅れを記録する."""
+        self.lag_packets, self.lag_secs = lag
+
+    def elapsed(self):
+        u"""接続してからの秒数を返す."""
+        return time.time() - self.started
+
+    def set_waiting(self, waiting):
+        u"""
+        リクエストの受信や送信の完了など, クライアントを待っているか
+        どうかを記録する. 接続した時はリクエストを待っている.
+        """
+        if not waiting:
+            self.waiting = 0
+        elif not self.waiting:
+            self.waiting = time.time()
+
+    def idle(self):
+        u"""クライアントを待っている秒数を返す. 待っていない場合は 0."""
+        return self.waiting and time.time() - self.waiting
+
+    def shutdown(self):
+        u"""
+        接続のソケットを shutdown して, 処理中のスレッドや
+        イベントループに接続を閉じさせる.
+        """
+        if self.request is None: return
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+#-------------------------------------------------------------------------------
+# ConnectionRegistry
+#-------------------------------------------------------------------------------
+
+class ConnectionRegistry(object):
+    u"""
+    サーバーに接続しているクライアントの ConnectionRecord を
+    接続 ID をキーにして保持するクラス.
+    """
+
+    record_class = ConnectionRecord
+
+    def __init__(self):
+        self.records = { }
+        self.counts  = { }      # IP アドレス -> 接続数
+        self.last_id = 0
+        self.closed  = (0, 0)   # 取り除いた接続の (送信バイト数, パケット数)
+        self.lockobj = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def add(self, address, request = None):
+        u"""接続を追加して, その ConnectionRecord を返す."""
+        self.lockobj.acquire()
+        try:
+            self.last_id += 1
+            record = self.record_class(self.last_id, address, request)
+            self.records[record.id] = record
+            self.counts[address[0]] = self.counts.get(address[0], 0) + 1
+        finally:
+            self.lockobj.release()
+        return record
+
+    def remove(self, record):
+        u"""接続を取り除く."""
+        self.lockobj.acquire()
+        try:
+            if self.records.pop(record.id, None) is None: return
+            ip = record.address[0]
+            self.counts[ip] -= 1
+            if not self.counts[ip]: del self.counts[ip]
+            self.closed = (self.closed[0] + record.bytes_sent,
+                           self.closed[1] + record.packets_sent)
+        finally:
+            self.lockobj.release()
+
+    def get(self, id):
+        u"""接続 ID の ConnectionRecord を返す. ない場合は None を返す."""
+        return self.records.get(id)
+
+    def count(self, ip):
+        u"""IP アドレス ip からの接続数を返す."""
+        return self.counts.get(ip, 0)
+
+    def total_sent(self):
+        u"""
+        取り除いた接続も含めた, 全ての接続の
+        (送信バイト数, 送信パケット数) のタプルを返す.
+        """
+        self.lockobj.acquire()
+        try:
+            records = self.records.values()
+            closed  = self.closed
+        finally:
+            self.lockobj.release()
+        return (closed[0] + sum([r.bytes_sent for r in records]),
+                closed[1] + sum([r.packets_sent for r in records]))
+
+    def snapshot(self):
+        u"""全ての ConnectionRecord を接続 ID の順に並べたリストを返す."""
+        self.lockobj.acquire()
+        try:
+            records = self.records.values()
+        finally:
+            self.lockobj.release()
+        records.sort(key = lambda r: r.id)
+        return records
@@ -0,0 +1,179 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Packet Ring Buffer
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+from array import array
+import time
+
+__all__ = ["PacketRing"]
+
+#-------------------------------------------------------------------------------
+# PacketRing
+#-------------------------------------------------------------------------------
+
+class PacketRing(object):
+    u"""
+    パケットを1つの bytearray (アリーナ) に連続して保存するリングバッファ.
+
+    アリーナとインデックス (オフセット, 長さ, シーケンス番号, キーフレーム,
+    受信時刻) は最初に確保されるので, 使用するメモリの量は一定になる.
+    パケットはアリーナの先頭から順番に書き込まれ, 末尾に収まらない場合は
+    先頭に戻る. 書き込む領域にあった古いパケットは無効になる.
+
+    get() はアリーナを参照する memoryview を返すので, コピーは発生しない.
+    ただし, 取得したパケットもリングが一周すると上書きされる.
+    put() は書き込む前に first を進めるので, 使い終わった後に first が
+    そのシーケンス番号を超えていなければ, 使っている間に上書きされていない.
+    """
+
+    # 1パケットの最大バイト数 (マーカーとサイズの 4byte + データ 65535byte)
+    packet_max = 65539
+
+    def __init__(self, slots = 16, capacity = 0):
+        if not capacity:
+            capacity = slots * self.packet_max
+
+        self.slots    = slots
+        self.capacity = capacity
+        self.arena    = self.new_arena(capacity)
+        self.view     = memoryview(self.arena)
+        self.offsets  = self.new_array("l", slots, 0)
+        self.lengths  = self.new_array("l", slots, 0)
+        self.seqs     = self.new_array("l", slots, -1)
+        self.keys     = self.new_array("b", slots, 0)
+        self.times    = self.new_array("d", slots, 0)
+        self.seq      = -1      # 最も新しいパケットのシーケンス番号
+        self.first    = 0       # 取得できる最も古いパケットのシーケンス番号
+        self.keyframe = -1      # 最も新しいキーフレームのシーケンス番号
+        self.wpos     = 0       # 次に書き込むアリーナの位置
+
+    def __len__(self):
+        return self.seq - self.first + 1
+
+    def __repr__(self):
+        return "<PacketRing %d-%d Slots: %d Capacity: %d>" % \
+               (self.first, self.seq, self.slots, self.capacity)
+
+    def new_arena(self, capacity):
+        u"""capacity バイトのアリーナを作成して返す."""
+        return bytearray(capacity)
+
+    def new_array(self, typecode, size, value):
+        u"""インデックスに使う, value で初期化された配列を作成して返す."""
+        return array(typecode, [value] * size)
+
+    def put(self, data, key = False, received = None):
+        u"""
+        パケットのデータを追加して, そのシーケンス番号を返す.
+        key が真の場合はキーフレームの先頭を含むパケットとして記録する.
+        received には受信時刻を指定する. 省略した場合は現在時刻になる.
+        """
+        if received is None: received = time.time()
+
+        size = len(data)
+        if size > self.capacity:
+            raise ValueError("packet is larger than the ring capacity.")
+
+        pos = self.wpos
+        wrapped = pos + size > self.capacity
+        if wrapped: pos = 0
+
+        seq = self.seq + 1
+        self.evict(seq, pos, pos + size, wrapped)
+
+        self.view[pos:pos + size] = data
+
+        slot = seq % self.slots
+        self.offsets[slot] = pos
+        self.lengths[slot] = size
+        self.seqs[slot]    = seq
+        self.keys[slot]    = key
+        self.times[slot]   = received
+        self.wpos          = pos + size
+        self.seq           = seq
+        if key: self.keyframe = seq
+        return seq
+
+    def evict(self, seq, start, end, wrapped):
+        u"""
+        シーケンス番号 seq のパケットをアリーナの start から end に
+        書き込む為に, 上書きされる古いパケットを無効にする.
+        """
+        # 書き込むスロットに入っているパケット
+        first = max(self.first, seq - self.slots + 1)
+
+        # 先頭に戻った場合, 末尾に残っているのは最も古いパケット
+        tail = self.wpos
+        while first <= self.seq:
+            slot = first % self.slots
+            offset = self.offsets[slot]
+            if wrapped and offset >= tail:
+                first += 1
+            elif offset < end and start < offset + self.lengths[slot]:
+                first += 1
+            else:
+                break
+
+        self.first = first
+
+    def get(self, seq):
+        u"""
+        指定したシーケンス番号のパケットを memoryview で返す.
+        既に上書きされているか, まだ追加されていない場合は None を返す.
+        """
+        if seq < self.first or seq > self.seq:
+            return None
+
+        slot = seq % self.slots
+        if self.seqs[slot] != seq:
+            return None
+
+        offset = self.offsets[slot]
+        return self.view[offset:offset + self.lengths[slot]]
+
+    def is_key(self, seq):
+        u"""指定したパケットがキーフレームの先頭を含むかどうかを返す."""
+        return self.get(seq) is not None and bool(self.keys[seq % self.slots])
+
+    def received(self, seq):
+        u"""
+        指定したパケットの受信時刻を返す.
+        取得できないパケットの場合は None を返す.
+        """
+        if self.get(seq) is None:
+            return None
+        return self.times[seq % self.slots]
+
+    def last_keyframe(self):
+        u"""
+        取得できる最も新しいキーフレームのシーケンス番号を返す.
+        ない場合は -1 を返す.
+        """
+        if self.keyframe < self.first:
+            return -1
+        return self.keyframe
+
+    def size(self, first, last):
+        u"""指定した範囲のパケットの合計バイト数を返す."""
+        first = max(first, self.first)
+        last  = min(last, self.seq)
+        return sum([self.lengths[seq % self.slots]
+                    for seq in xrange(first, last + 1)])
+
+    def resized(self, slots, capacity = 0):
+        u"""
+        大きさを変えたリングバッファを作成して返す.
+        シーケンス番号は引き継ぎ, 入りきる新しいパケットはコピーする.
+        """
+        ring = self.__class__(slots, capacity)
+
+        first = max(self.first, self.seq - slots + 1)
+        ring.seq   = first - 1
+        ring.first = first
+        for seq in xrange(first, self.seq + 1):
+            ring.put(self.get(seq), self.is_key(seq), self.received(seq))
+        return ring
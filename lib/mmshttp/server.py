@@ -1,575 +1,1491 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-MMS-HTTP Server Classes
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
-from SocketServer import ThreadingMixIn
-import logging
-import threading
-import socket
-import time
-
-from utils.event import EventHolder
-
-__all__ = ["MMSHTTPBaseHandler", "MMSHTTPStreamingHandler",
-           "MMSHTTPClientMaxHandler", "MMSHTTPServer"]
-
-#-------------------------------------------------------------------------------
-# MMSHTTPBaseHandler
-#-------------------------------------------------------------------------------
-
-class MMSHTTPBaseHandler(BaseHTTPRequestHandler):
-    u"""
-    MMS-HTTP プロトコルによる接続を処理するハンドラの基底クラス.
-    """
-
-    loginfo_setup  = "%s connected successfully."
-    loginfo_finish = "%s disconnected successfully."
-
-    error_message_format = u"""\
-<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
-<html lang="en">
-<head>
-<meta http-equiv="Content-Type" content="text/html; charset=utf-8">
-<title>%(code)d %(message)s</title>
-</head>
-<body>
-<h1>%(code)d %(message)s</h1>
-<p>Sorry, the server could not handle your request.</p>
-<p>%(explain)s</p>
-</body>
-</html>
-"""
-
-    def __str__(self):
-        return "Handler[%s:%d]" % (self.host, self.client_address[1])
-
-    def setup(self):
-        u"""処理の前準備を行う."""
-        self.server.inc_client_num()
-
-        BaseHTTPRequestHandler.setup(self)
-
-        self.pragmas = {}
-        self.host    = self.address_string()
-
-        logging.info(self.loginfo_setup % self)
-
-    def parse_request(self):
-        u"""リクエストの解析を行う."""
-
-        # リクエストされているパスが
-        #     GET HTTP/1.0
-        # のように空白の場合は
-        #     GET / HTTP/1.0
-        # になるように修正する
-        words = self.raw_requestline.rstrip().split()
-        if len(words) == 2 and words[1].startswith("HTTP/"):
-            self.raw_requestline = "%s / %s\n" % tuple(words)
-
-        r = BaseHTTPRequestHandler.parse_request(self)
-        if not r:
-            logging.warning("%s can't parse the request." % self)
-            return
-
-        self.parse_pragma()
-
-        # リクエストヘッダーをログ出力
-        logging.debug("%s received the request:\n%s\n%s %s %s\n%s\n%s" %
-                      (self,
-                       "-" * 40,
-                       self.command, self.path, self.request_version,
-                       "".join(self.headers.headers).strip(),
-                       "-" * 40))
-        return r
-
-    def handle_one_request(self):
-        u"""1つのリクエストを処理する."""
-        try:
-            BaseHTTPRequestHandler.handle_one_request(self)
-        except socket.error, e:
-            logging.debug("%s stopped handling the request."\
-                          " Reason: %s" % (self, str(e)))
-
-    def finish(self):
-        u"""処理の後始末を行う."""
-        BaseHTTPRequestHandler.finish(self)
-        logging.info(self.loginfo_finish % self)
-
-        self.server.dec_client_num()
-
-    def parse_pragma(self):
-        u"""
-        Pragma ヘッダーを解析して ',' で区切られた 名前=値 リストを
-        辞書に変換する.
-        """
-        self.pragmas = {}
-
-        pragmas = self.headers.getheaders("Pragma")
-        if not pragmas: return
-
-        for lines in pragmas:
-            for line in lines.split("\n"):
-                lst = [v.split("=", 1) for v in line.split(",")]
-                for p in lst:
-                    k = p[0].strip().lower()
-                    if len(p) >= 2:
-                        v = p[1].strip()
-                    else:
-                        v = ""
-                    self.pragmas[k] = v
-
-    def log_error(self, format, *args):
-        u"""エラーメッセージを記録する."""
-        logging.error("%s %s" % (self, format % args))
-
-    def log_message(self, format, *args):
-        u"""ログメッセージを記録する."""
-        logging.info("%s %s" % (self, format % args))
-
-    def version_string(self):
-        u"""サーバーのバージョン文字列を返す."""
-        return "%s/%s" % self.server.version
-
-#-------------------------------------------------------------------------------
-# MMSHTTPStreamingHandler
-#-------------------------------------------------------------------------------
-
-class MMSHTTPStreamingHandler(MMSHTTPBaseHandler):
-    u"""
-    MMS-HTTP プロトコルによってメディアストリーミングを配信するハンドラ.
-    """
-
-    # ストリーミングのリクエストヘッダーに含まれる Pragma
-    pragmas_for_streaming = (
-        "xplaystrm",
-        "stream-switch-count",
-        "stream-switch-entry",
-    )
-
-    # 情報パケットのリクエストヘッダーに含まれる Pragma
-    pragmas_for_header = pragmas_for_streaming + (
-        "rate",
-        "stream-time",
-        "stream-offset",
-        "request-context",
-        "max-duration",
-        "xclientguid",
-    )
-
-    # ASX プレイリストのフォーマット
-    playlist_format = """\
-<asx version="3.0">
-	<entry>
-		<ref href="%s" />
-	</entry>
-</asx>
-"""
-
-    def setup(self):
-        u"""処理の前準備を行う."""
-        MMSHTTPBaseHandler.setup(self)
-
-        # 配信に利用するソース（MMSHTTPBaseSource）をサーバーから取得する
-        self.source = self.server.new_source()
-
-    def do_POST(self):
-        u"""
-        POST リクエストに対する処理を行う.
-        クライアントからのログ情報の送信を受け付ける.
-        レスポンスとして 204 No Content を返す.
-        """
-        if "log-line" in self.pragmas:
-            logging.info("%s has log-line: %s" %
-                         (self, self.pragmas["log-line"]))
-
-        self.send_response(204)
-        self.send_header("Cache-Control", "no-cache")
-        self.send_header("Pragma", "no-cache")
-        self.end_headers()
-
-    def do_GET(self):
-        u"""
-        GET リクエストに対する処理を行う.
-        リクエストにはヘッダ情報だけを取得するリクエストと
-        本体のストリーミングを取得するリクエストの2種類がある.
-        """
-
-        if not self.source:
-            logging.debug("%s doesn't have source." % self)
-            self.send_error(501)
-
-        elif not self.source.is_ready():
-            logging.debug("%s source is not ready." % self)
-            self.send_error(503, "Service is not ready.")
-
-        elif self.is_request_for_streaming():
-            logging.debug("%s requests for streaming." % self)
-            self.send_headers()
-            self.send_streaming()
-
-        elif self.is_request_for_header():
-            logging.debug("%s requests for headers only." % self)
-            self.send_headers()
-
-        else:
-            logging.debug("%s requests for play list." % self)
-            self.send_default_page()
-
-    def send_headers(self):
-        u"""
-        動画の情報パケットのリクエストに対するレスポンスヘッダーと
-        ストリーミングの情報パケットを送信する.
-        """
-        logging.debug("%s is sending a response header." % self)
-
-        self.wfile.write( self.source.headers() )
-
-        logging.debug("%s has sent the response to the client:\n%s\n%s\n%s" %
-            ( self,
-              "-" * 40,
-              self.source.headers().strip(),
-              "-" * 40
-            ))
-
-        self.wfile.write( str(self.source.info_packet()) )
-
-        logging.debug("%s has sent the media info %r." %
-                      (self, self.source.info_packet()))
-
-    def send_streaming(self):
-        u"""
-        ストリーミングが終了するまでパケットを順番に送信する.
-        送信はブロッキングするので注意.
-        """
-        logging.debug("%s starts sending streaming." % self)
-
-        for packet in self.source.iter_streaming():
-            self.wfile.write( str(packet) )
-
-    def send_default_page(self):
-        u"""
-        通常のウェブページのリクエストに対するレスポンスを返す.
-        リクエストが MMS-HTTP のものでない場合に呼び出される.
-
-        恐らくブラウザなどからただの HTTP としてアクセスされているので,
-        プレイリストを送信して動画の URL に誘導する.
-        """
-
-        # Shoutcast ではない
-        if self.headers.has_key("Icy-MetaData"):
-            self.send_error(400, "Shoutcast Not Supported. Try mms Protocol.")
-            return
-
-        self.send_playlist()
-
-    def send_playlist(self):
-        u"""
-        mms:// から始まる動画 URL が書かれた ASX プレイリストを送信する.
-        ただし, 処理の都合上, リクエストヘッダに Host が含まれている
-        必要がある.
-
-        Host が含まれていない場合は 400 Bad Request を返す.
-        """
-        host = self.headers.get("Host", "")
-        if host:
-            if host.find(":") < 0:
-                host += ":%d" % self.server.server_address[1]
-
-            url = "mms://%s%s" % (host, self.path)
-            playlist = self.playlist_format % url
-
-            self.send_response(200)
-            self.send_header("Content-Type",   "video/x-ms-asf")
-            self.send_header("Content-Length", len(playlist))
-            self.send_header("Connection",     "close")
-            self.end_headers()
-            self.wfile.write(playlist)
-        else:
-            self.send_error(400, "Unknown Headers. Try mms Protocol.")
-
-    def is_request_for_streaming(self):
-        u"""リクエストがストリーミングを要求しているかどうか."""
-
-        # ストリーミング要求時の Pragma があるかどうか調べる
-        for p in self.pragmas_for_streaming:
-            if p in self.pragmas:
-                return True
-
-        # request-context が 1 でない場合はストリーミングの要求
-        if self.pragmas.get("request-context", "1") != "1":
-            return True
-
-        return False
-
-    def is_request_for_header(self):
-        u"""リクエストがヘッダーと情報パケットを要求しているかどうか."""
-
-        # ヘッダー要求時の Pragma があるかどうか調べる
-        for p in self.pragmas_for_header:
-            if p in self.pragmas:
-                return True
-
-        return False
-
-#-------------------------------------------------------------------------------
-# MMSHTTPClientMaxHandler
-#-------------------------------------------------------------------------------
-
-class MMSHTTPClientMaxHandler(MMSHTTPBaseHandler):
-    u"""
-    MMS-HTTP プロトコルで接続数が最大数に達した事を伝えるハンドラ.
-    """
-
-    loginfo_setup  = "%s connected, but disconnecting due to ClientMax."
-
-    def do_GET(self):
-        u"""
-        GET リクエストに対する処理を行う.
-        最大人数に達しているので 503 Service Unavailable を返す.
-        """
-        self.send_error(503, "Too Many Clients")
-
-    def do_POST(self):
-        u"""POST リクエストも GET リクエストと同様."""
-        self.do_GET()
-
-    def do_HEAD(self):
-        u"""HEAD リクエストも GET リクエストと同様."""
-        self.do_GET()
-
-#-------------------------------------------------------------------------------
-# MMSHTTPServer
-#-------------------------------------------------------------------------------
-
-class ThreadingHTTPServer(ThreadingMixIn, HTTPServer): pass
-
-class MMSHTTPServer(ThreadingHTTPServer, EventHolder):
-    u"""
-    MMS-HTTP プロトコルによる接続を受け付ける為のクラス.
-    実際のクライアントに対する処理はハンドラに委譲する.
-    """
-
-    # サーバーのバージョン
-    version = ("MMSHTTPServer", "1.0")
-
-    # スレッドをデーモンスレッドにする
-    daemon_threads = True
-
-    def __init__( self,
-                  source_class,
-                  bindings       = ('', 8080),
-                  req_handler    = MMSHTTPStreamingHandler,
-                  max_handler    = MMSHTTPClientMaxHandler,
-                  client_max     = 100,
-                  timeout        = 180,
-                  countdown      = 10 ):
-
-        EventHolder.__init__(self,
-            "start", "terminating", "terminate", "request",
-            "processing", "processed", "client_num",
-        )
-
-        try:
-            if isinstance(bindings, basestring):
-                if bindings.find(':') >= 0:
-                    bindings    = bindings.split(':', 1)
-                    bindings    = (bindings[0], int(bindings[1]))
-                else:
-                    bindings    = ('', int(bindings))
-            elif isinstance(bindings, int):
-                bindings = ('', bindings)
-        except ValueError, e:
-            logging.error("Given binding port is not a number.")
-            bindings = ('', 8080)
-
-        ThreadingHTTPServer.__init__(self, bindings, req_handler)
-        self.socket.settimeout(None)
-
-        self.serving_thread = None
-        self.connections    = []
-        self.terminated     = False
-        self.source_class   = source_class
-        self.req_handler    = req_handler
-        self.max_handler    = max_handler
-        self.client_max     = client_max
-        self.client_num     = 0
-        self.timeout        = timeout
-        self.countdown      = countdown
-        self.lockobj        = threading.Lock()
-
-        logging.info("%s is initialized successfully." % self)
-
-    def __str__(self):
-        return "Server[%s:%d]" % self.server_address
-
-    def serve_forever(self):
-        u"""別スレッドでリクエストを処理し続ける."""
-        if self.serving_thread: return
-
-        t = threading.Thread(target = self.server_thread_proc)
-        t.setName( str(self) )
-        t.start()
-        self.serving_thread = t
-
-    def server_thread_proc(self):
-        u"""サーバースレッド用プロシージャ"""
-        self.notify_event("start")
-        while not self.terminated:
-            self.handle_request()
-
-    def server_close(self):
-        u"""サーバーを終了する."""
-        logging.info("%s terminating..." % self)
-        self.notify_event("terminating")
-
-        self.terminated = True
-        ThreadingHTTPServer.server_close(self)
-
-        logging.debug("%s waiting for threads terminate..." % self)
-
-        # スレッドが全て終了するまで待機
-        start_time   = time.time()
-        elapsed_time = 0
-        remains = self.client_num
-        lastdiv = 0
-        while elapsed_time < self.timeout:
-            self.lockobj.acquire()
-            try:
-                remains = self.client_num
-            finally:
-                self.lockobj.release()
-
-            if remains == 0: break
-
-            div = int( elapsed_time / self.countdown )
-            if div > lastdiv:
-                lastdiv = div
-                leftsec = self.timeout - elapsed_time
-                logging.info("%s has %d sec left (%d clients remain)" %
-                             (self, leftsec, remains))
-
-            time.sleep(1)
-            elapsed_time = time.time() - start_time
-
-        if remains == 0:
-            logging.info("%s terminated successfully." % self)
-        else:
-            logging.warning("%s terminated, but %d clients remained." %
-                            (self, remains))
-
-        self.notify_event("terminate")
-
-    def process_request_thread(self, request, client_address):
-        u"""リクエストをスレッドとして処理する."""
-
-        connection = "%s:%d" % (
-            socket.getfqdn(client_address[0]),
-            client_address[1])
-
-        # スレッドをリストに加えておく
-        self.lockobj.acquire()
-        try:
-            self.connections.append(connection)
-        finally:
-            self.lockobj.release()
-
-        self.notify_event("processing")
-
-        ThreadingHTTPServer.process_request_thread(self, request, client_address)
-
-        self.notify_event("processed")
-
-        # スレッドをリストから取り除く
-        self.lockobj.acquire()
-        try:
-            self.connections.remove(connection)
-        finally:
-            self.lockobj.release()
-
-    def process_request(self, request, client_address):
-        u"""
-        リクエストを処理する.
-        接続クライアント数が既に上限に達している場合は max_handler を
-        それ以外なら req_handler をハンドラとして利用する.
-        """
-        logging.info("%s is processing request from %r." %
-                     (self, client_address))
-
-        self.lockobj.acquire()
-        try:
-            if self.client_num < self.client_max:
-                self.RequestHandlerClass = self.req_handler
-            else:
-                self.RequestHandlerClass = self.max_handler
-        finally:
-            self.lockobj.release()
-
-        self.notify_event("request", client_address)
-        logging.debug("%s has selected %s for request handling." %
-                      (self, repr(self.RequestHandlerClass)))
-
-        ThreadingHTTPServer.process_request(self, request, client_address)
-
-    def new_source(self, *args, **kwargs):
-        u"""クライアントに配信するソースを返す"""
-        if self.source_class and callable(self.source_class):
-            return self.source_class(*args, **kwargs)
-        else:
-            logging.warn("%s can't create a new source." % self)
-
-    def log_connections(self):
-        u"""クライアント接続数をログに記録する."""
-        logging.info("%s Connections: %d/%d" %
-                     (self, self.client_num, self.client_max))
-
-    def inc_client_num(self):
-        u"""クライアント接続数を増やす."""
-        self.lockobj.acquire()
-        try:
-            self.client_num += 1
-        finally:
-            self.lockobj.release()
-
-        self.notify_event("client_num")
-        self.log_connections()
-
-    def dec_client_num(self):
-        u"""クライアント接続数を減らす."""
-        self.lockobj.acquire()
-        try:
-            self.client_num -= 1
-        finally:
-            self.lockobj.release()
-
-        self.notify_event("client_num")
-        self.log_connections()
-
-#-------------------------------------------------------------------------------
-
-#
-# テスト用
-#
-if __name__ == "__main__":
-    logging.basicConfig(level  = logging.DEBUG,
-                        format = '%(asctime)s %(levelname)s %(message)s')
-    logging.debug("MMSHTTPServer test starts.")
-    server = MMSHTTPServer()
-    server.timeout_on_termination = 60
-    server.serve_forever()
-
-    logging.debug("MMSHTTPServer started serving.")
-
-    import time
-    time.sleep(180)
-
-    logging.debug("MMSHTTPServer is beging closed...")
-
-    server.server_close()
-
-    logging.debug("MMSHTTPServer has been closed.")
-    logging.debug("MMSHTTPServer test finished.")
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Server Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from StringIO import StringIO
+import email.utils
+import logging
+import threading
+import select
+import socket
+import errno
+import time
+import cgi
+
+from utils.event import EventHolder
+from utils.resolver import HostResolver
+from utils.pool import ThreadPool
+from registry import ConnectionRegistry
+from stats import MMSHTTPStatsCollector
+from packet import MMSHTTPPacket
+from admission import ClientMaxPolicy
+
+__all__ = ["MMSHTTPBaseHandler", "MMSHTTPStreamingHandler",
+           "MMSHTTPClientMaxHandler", "MMSHTTPFastResponder", "MMSHTTPServer",
+           "parse_pragmas"]
+
+def parse_pragmas(values):
+    u"""
+    Pragma ヘッダーの値のリストを解析して, ',' で区切られた 名前=値 リストを
+    辞書に変換する.
+    """
+    pragmas = {}
+    for lines in values:
+        for line in lines.split("\n"):
+            lst = [v.split("=", 1) for v in line.split(",")]
+            for p in lst:
+                k = p[0].strip().lower()
+                if len(p) >= 2:
+                    v = p[1].strip()
+                else:
+                    v = ""
+                pragmas[k] = v
+    return pragmas
+
+#-------------------------------------------------------------------------------
+# MMSHTTPBaseHandler
+#-------------------------------------------------------------------------------
+
+class MMSHTTPBaseHandler(BaseHTTPRequestHandler):
+    u"""
+    MMS-HTTP プロトコルによる接続を処理するハンドラの基底クラス.
+    """
+
+    loginfo_setup  = "%s connected successfully."
+    loginfo_finish = "%s disconnected successfully."
+
+    error_message_format = u"""\
+<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
+<html lang="en">
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+<title>%(code)d %(message)s</title>
+</head>
+<body>
+<h1>%(code)d %(message)s</h1>
+<p>Sorry, the server could not handle your request.</p>
+<p>%(explain)s</p>
+</body>
+</html>
+"""
+
+    def __init__(self, request, client_address, server, record = None):
+        # サーバーの接続の一覧に登録されている ConnectionRecord
+        self.record = record
+        BaseHTTPRequestHandler.__init__(self, request, client_address, server)
+
+    def __str__(self):
+        return "Handler[%s:%d]" % (self.address_string(),
+                                   self.client_address[1])
+
+    def setup(self):
+        u"""処理の前準備を行う."""
+        self.server.inc_client_num()
+
+        # 送受信が進まないまま sendtimeout 秒経ったら接続を閉じる
+        self.timeout = self.server.sendtimeout or None
+
+        BaseHTTPRequestHandler.setup(self)
+
+        self.pragmas = {}
+        self.host    = self.address_string()
+
+        # 接続を維持する場合は HTTP/1.1 で応答する
+        if self.server.keepalive > 0:
+            self.protocol_version = "HTTP/1.1"
+
+        logging.info(self.loginfo_setup % self)
+
+    def handle(self):
+        u"""
+        リクエストを処理する.
+        クライアントが接続の維持を求めている場合は, 次のリクエストが
+        届くのを待って同じ接続で処理する.
+        """
+        self.close_connection = 1
+
+        self.handle_one_request()
+        while not self.close_connection and self.wait_for_request():
+            self.handle_one_request()
+
+    def wait_for_request(self):
+        u"""
+        次のリクエストが届くまで, 最大でサーバーの keepalive 秒待つ.
+        届いた場合は真を返す. サーバーが終了した場合は待つのをやめる.
+        """
+        server = self.server
+        if server.keepalive <= 0 or server.terminated: return False
+
+        # 先に届いていたリクエストが rfile に読み込まれている場合
+        rbuf = getattr(self.rfile, "_rbuf", None)
+        if rbuf is not None and rbuf.tell(): return True
+
+        deadline = time.time() + server.keepalive
+        while not server.terminated:
+            wait = deadline - time.time()
+            if wait <= 0: break
+            try:
+                r, w, e = select.select([self.connection], [], [],
+                                        min(wait, server.accept_interval))
+            except (select.error, socket.error):
+                return False
+            if r: return True
+
+        logging.debug("%s closes the idle connection." % self)
+        return False
+
+    def address_string(self):
+        u"""
+        クライアントのホスト名を返す.
+        逆引きはサーバーの resolver で非同期に行うので, 済むまでは
+        IP アドレスを返す.
+        """
+        return self.server.resolver.lookup(self.client_address[0])
+
+    def parse_request(self):
+        u"""リクエストの解析を行う."""
+
+        # リクエストされているパスが
+        #     GET HTTP/1.0
+        # のように空白の場合は
+        #     GET / HTTP/1.0
+        # になるように修正する
+        words = self.raw_requestline.rstrip().split()
+        if len(words) == 2 and words[1].startswith("HTTP/"):
+            self.raw_requestline = "%s / %s\n" % tuple(words)
+
+        r = BaseHTTPRequestHandler.parse_request(self)
+        if not r:
+            logging.warning("%s can't parse the request." % self)
+            return
+
+        self.parse_pragma()
+        if self.record:
+            self.record.set_waiting(False)
+            self.record.user_agent = self.headers.get("User-Agent", "")
+            self.record.requests  += 1
+            if self.record.requests > 1:
+                self.server.count_reuse(self.record)
+
+        # リクエストヘッダーをログ出力
+        logging.debug("%s received the request:\n%s\n%s %s %s\n%s\n%s" %
+                      (self,
+                       "-" * 40,
+                       self.command, self.path, self.request_version,
+                       "".join(self.headers.headers).strip(),
+                       "-" * 40))
+        return r
+
+    def handle_one_request(self):
+        u"""1つのリクエストを処理する."""
+        try:
+            BaseHTTPRequestHandler.handle_one_request(self)
+        except socket.error, e:
+            logging.debug("%s stopped handling the request."\
+                          " Reason: %s" % (self, str(e)))
+
+    def finish(self):
+        u"""処理の後始末を行う."""
+        BaseHTTPRequestHandler.finish(self)
+        logging.info(self.loginfo_finish % self)
+
+        self.server.dec_client_num()
+
+    def parse_pragma(self):
+        u"""
+        Pragma ヘッダーを解析して ',' で区切られた 名前=値 リストを
+        辞書に変換する.
+        """
+        self.pragmas = parse_pragmas(self.headers.getheaders("Pragma"))
+
+    def log_error(self, format, *args):
+        u"""エラーメッセージを記録する."""
+        logging.error("%s %s" % (self, format % args))
+
+    def log_message(self, format, *args):
+        u"""ログメッセージを記録する."""
+        logging.info("%s %s" % (self, format % args))
+
+    def version_string(self):
+        u"""サーバーのバージョン文字列を返す."""
+        return "%s/%s" % self.server.version
+
+#-------------------------------------------------------------------------------
+# MMSHTTPStreamingHandler
+#-------------------------------------------------------------------------------
+
+class MMSHTTPStreamingHandler(MMSHTTPBaseHandler):
+    u"""
+    MMS-HTTP プロトコルによってメディアストリーミングを配信するハンドラ.
+    """
+
+    # ストリーミングのリクエストヘッダーに含まれる Pragma
+    pragmas_for_streaming = (
+        "xplaystrm",
+        "stream-switch-count",
+        "stream-switch-entry",
+    )
+
+    # 情報パケットのリクエストヘッダーに含まれる Pragma
+    pragmas_for_header = pragmas_for_streaming + (
+        "rate",
+        "stream-time",
+        "stream-offset",
+        "request-context",
+        "max-duration",
+        "xclientguid",
+    )
+
+    # サーバーの終了時に送信する終了パケット
+    end_of_stream = str(MMSHTTPPacket.create(
+        MMSHTTPPacket.MARKER_END_OF_STREAM, "\0" * 4))
+
+    # ASX プレイリストのフォーマット
+    playlist_format = """\
+<asx version="3.0">
+	<entry>
+		<ref href="%s" />
+	</entry>
+</asx>
+"""
+
+    def setup(self):
+        u"""処理の前準備を行う."""
+        MMSHTTPBaseHandler.setup(self)
+
+        # 配信に利用するソース（MMSHTTPBaseSource）
+        # リクエストのパスで決まるので, リクエストを解析した後に取得する
+        self.source = None
+
+    def do_POST(self):
+        u"""
+        POST リクエストに対する処理を行う.
+        クライアントからのログ情報の送信を受け付ける.
+        レスポンスとして 204 No Content を返す.
+        """
+        if "log-line" in self.pragmas:
+            logging.info("%s has log-line: %s" %
+                         (self, self.pragmas["log-line"]))
+
+        # 接続を維持する場合は, 次のリクエストの為に本文を読み捨てる
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = 0
+            self.close_connection = 1
+        if length > 0 and not self.close_connection:
+            self.rfile.read(length)
+
+        self.send_response(204)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Pragma", "no-cache")
+        self.end_headers()
+
+    def do_GET(self):
+        u"""
+        GET リクエストに対する処理を行う.
+        リクエストにはヘッダ情報だけを取得するリクエストと
+        本体のストリーミングを取得するリクエストの2種類がある.
+
+        ソースはリクエストのパスに応じてサーバーから取得する.
+        統計情報のパスへのリクエストには統計情報を返す.
+        """
+        stats = self.server.stats
+        if stats and stats.handles(self.path):
+            logging.debug("%s requests for stats." % self)
+            self.send_stats(stats)
+            return
+
+        self.source = self.server.new_source(self.path)
+
+        if not self.source and self.server.source_class:
+            logging.debug("%s doesn't have source for %s." % (self, self.path))
+            self.send_error(404, "Channel Not Found")
+
+        elif not self.source:
+            logging.debug("%s doesn't have source." % self)
+            self.send_error(501)
+
+        elif not self.is_source_ready():
+            logging.debug("%s source is not ready." % self)
+            self.send_error(503, "Service is not ready.")
+
+        elif self.is_request_for_streaming():
+            logging.debug("%s requests for streaming." % self)
+            policy = self.record and \
+                     self.server.admit_stream(self.record, self.source)
+            if policy:
+                self.send_error(503, policy.reason)
+            else:
+                # ストリーミングは接続を閉じて終わりを伝える
+                self.close_connection = 1
+                self.send_headers()
+                self.send_streaming()
+
+        elif self.is_request_for_header():
+            logging.debug("%s requests for headers only." % self)
+            self.send_headers(not self.close_connection)
+
+        else:
+            logging.debug("%s requests for play list." % self)
+            self.send_default_page()
+
+    def send_headers(self, keepalive = False):
+        u"""
+        動画の情報パケットのリクエストに対するレスポンスヘッダーと
+        ストリーミングの情報パケットを送信する.
+        ソースがつなげてキャッシュしているものを1回で送信する.
+
+        keepalive が真の場合は Content-Length をつけて接続を維持する.
+        ソースが対応していない場合は接続を閉じる.
+        """
+        logging.debug("%s is sending a response header." % self)
+
+        preamble = keepalive and self.source.preamble(True)
+        if not preamble:
+            preamble = self.source.preamble()
+            self.close_connection = 1
+
+        self.wfile.write( preamble )
+
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("%s has sent the response to the client:\n%s\n%s\n%s" %
+                ( self,
+                  "-" * 40,
+                  self.source.headers().strip(),
+                  "-" * 40
+                ))
+            logging.debug("%s has sent the media info %r." %
+                          (self, self.source.info_packet()))
+
+    def send_streaming(self):
+        u"""
+        ストリーミングが終了するまでパケットを順番に送信する.
+        送信はブロッキングするので注意.
+
+        溜まっているパケットはまとめて1回で送信する. サーバーの senddelay が
+        指定されている場合は, 最初のパケットから senddelay 秒経つか
+        sendbytes バイトに達するまで次のパケットを待ってまとめる.
+
+        パケットはリングバッファを参照しているので, まとめた後か送信した後に
+        上書きされていないかを調べる. まとめる間に上書きされたものは捨てて
+        読み飛ばし, 送信中に上書きされた場合は壊れたデータを送ってしまったので
+        接続を切る.
+        """
+        logging.debug("%s starts sending streaming." % self)
+
+        iterator = self.start_stream()
+        maxbytes = self.server.sendbytes
+        delay    = self.server.senddelay
+        batch    = bytearray()
+        count    = 0
+        deadline = 0
+
+        while True:
+            timeout = None
+            if batch: timeout = max(0, deadline - time.time())
+            try:
+                packets = iterator.next_packets(timeout = timeout)
+            except StopIteration:
+                break
+
+            if not batch: deadline = time.time() + delay
+            if self.record and packets:
+                self.record.set_lag(iterator.lag())
+
+            # 1つだけならまとめずにそのまま送る
+            if not batch and len(packets) == 1 and \
+               (not delay or len(packets[0]) >= maxbytes):
+                self.send_packets(packets[0], 1)
+                if iterator.is_intact(): continue
+                logging.warning("%s sent a packet overwritten while sending." %
+                                self)
+                return
+
+            mark = len(batch)
+            for packet in packets:
+                batch += packet
+            if not iterator.is_intact():
+                del batch[mark:]
+                continue
+            count += len(packets)
+            if len(batch) >= maxbytes or time.time() >= deadline:
+                self.send_packets(batch, count)
+                del batch[:]
+                count = 0
+
+        if batch: self.send_packets(batch, count)
+        if self.is_end_of_stream(): self.send_packets(self.end_of_stream, 1)
+
+    def is_end_of_stream(self):
+        u"""
+        ストリーミングがサーバーの終了か, ソースの受信の終了で終わったか
+        どうかを返す. 遅れなどで接続を切る場合は偽になる.
+        """
+        return self.server.terminated or not self.source.is_ready()
+
+    def start_stream(self):
+        u"""
+        ソースのイテレーターを作成して, サーバーが終了する時に
+        止められるように接続の ConnectionRecord に記録する.
+        既に終了している場合はすぐに止める.
+        """
+        iterator = self.source.iter_streaming()
+        if self.record: self.record.stream = iterator
+        if self.server.terminated: iterator.stop()
+        return iterator
+
+    def send_packets(self, data, count):
+        u"""
+        count 個のパケットのデータをソケットに送信する.
+        まとめたパケットは bytearray なので, str() で変換してしまう
+        wfile を通さずにソケットに直接送信する.
+
+        送信中はクライアントを待っている事を記録して, サーバーの
+        idletimeout 秒経っても終わらない場合は接続を閉じさせる.
+        """
+        if not self.record:
+            self.connection.sendall(data)
+            return
+
+        self.record.set_waiting(True)
+        try:
+            self.connection.sendall(data)
+        except socket.timeout:
+            self.server.reap(self.record, "send timeout", False)
+            raise
+        self.record.set_waiting(False)
+        self.record.sent(len(data), count)
+
+    def send_stats(self, stats):
+        u"""統計情報を送信する."""
+        content_type, content = stats.report(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type",   content_type)
+        self.send_header("Content-Length", len(content))
+        self.send_header("Cache-Control",  "no-cache")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_default_page(self):
+        u"""
+        通常のウェブページのリクエストに対するレスポンスを返す.
+        リクエストが MMS-HTTP のものでない場合に呼び出される.
+
+        恐らくブラウザなどからただの HTTP としてアクセスされているので,
+        プレイリストを送信して動画の URL に誘導する.
+        """
+
+        # Shoutcast ではない
+        if self.headers.has_key("Icy-MetaData"):
+            self.send_error(400, "Shoutcast Not Supported. Try mms Protocol.")
+            return
+
+        self.send_playlist()
+
+    def send_playlist(self):
+        u"""
+        mms:// から始まる動画 URL が書かれた ASX プレイリストを送信する.
+        ただし, 処理の都合上, リクエストヘッダに Host が含まれている
+        必要がある.
+
+        Host が含まれていない場合は 400 Bad Request を返す.
+        """
+        host = self.headers.get("Host", "")
+        if host:
+            if host.find(":") < 0:
+                host += ":%d" % self.server.server_address[1]
+
+            url = "mms://%s%s" % (host, self.path)
+            playlist = self.playlist_format % url
+
+            self.send_response(200)
+            self.send_header("Content-Type",   "video/x-ms-asf")
+            self.send_header("Content-Length", len(playlist))
+            self.send_header("Connection",     "close")
+            self.end_headers()
+            self.wfile.write(playlist)
+        else:
+            self.send_error(400, "Unknown Headers. Try mms Protocol.")
+
+    def is_source_ready(self):
+        u"""
+        ソースがリクエストに応答できるかどうかを返す.
+        ストリーミング以外のリクエストには, ヘッダーと情報パケットがあれば
+        受信を開始する前でも応答できる.
+        """
+        if self.is_request_for_streaming():
+            return self.source.is_ready()
+        return self.source.has_info()
+
+    def is_request_for_streaming(self):
+        u"""リクエストがストリーミングを要求しているかどうか."""
+        return self.wants_streaming(self.pragmas)
+
+    def is_request_for_header(self):
+        u"""リクエストがヘッダーと情報パケットを要求しているかどうか."""
+        return self.wants_header(self.pragmas)
+
+    def wants_streaming(cls, pragmas):
+        u"""Pragma の辞書がストリーミングを要求しているかどうか."""
+
+        # ストリーミング要求時の Pragma があるかどうか調べる
+        for p in cls.pragmas_for_streaming:
+            if p in pragmas:
+                return True
+
+        # request-context が 1 でない場合はストリーミングの要求
+        if pragmas.get("request-context", "1") != "1":
+            return True
+
+        return False
+    wants_streaming = classmethod(wants_streaming)
+
+    def wants_header(cls, pragmas):
+        u"""Pragma の辞書がヘッダーと情報パケットを要求しているかどうか."""
+
+        # ヘッダー要求時の Pragma があるかどうか調べる
+        for p in cls.pragmas_for_header:
+            if p in pragmas:
+                return True
+
+        return False
+    wants_header = classmethod(wants_header)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPClientMaxHandler
+#-------------------------------------------------------------------------------
+
+class MMSHTTPClientMaxHandler(MMSHTTPBaseHandler):
+    u"""
+    MMS-HTTP プロトコルで接続数が最大数に達した事を伝えるハンドラ.
+    """
+
+    loginfo_setup  = "%s connected, but disconnecting due to ClientMax."
+
+    def do_GET(self):
+        u"""
+        GET リクエストに対する処理を行う.
+        最大人数に達しているので 503 Service Unavailable を返す.
+        """
+        self.send_error(503, "Too Many Clients")
+
+    def do_POST(self):
+        u"""POST リクエストも GET リクエストと同様."""
+        self.do_GET()
+
+    def do_HEAD(self):
+        u"""HEAD リクエストも GET リクエストと同様."""
+        self.do_GET()
+
+#-------------------------------------------------------------------------------
+# MMSHTTPFastResponder
+#-------------------------------------------------------------------------------
+
+class MMSHTTPFastResponder(object):
+    u"""
+    ストリーミング以外のすぐに終わるリクエストに, ハンドラのスレッドを
+    作らずにサーバーのスレッドで直接応答するクラス.
+
+    応答するのは
+      - ポリシーが受け付けない接続への 503 Service Unavailable
+      - POST で送信されるログ情報への 204 No Content
+      - ヘッダーと情報パケットだけのリクエスト
+      - プレイリストのリクエスト
+      - 統計情報のリクエスト
+    で, 送信後すぐに接続を閉じる.
+
+    リクエストは MSG_PEEK で覗き見るだけなので, まだ全て届いていない場合や
+    ストリーミングのリクエストの場合は何も読み込まずに偽を返す.
+    その接続は通常通りハンドラのスレッドで処理すればよい.
+
+    受け付けるスレッドを止めないように, 覗き見と送信はブロッキングせずに行う.
+    レスポンスを送信しきれない場合は, 残りをハンドラと同じくスレッドプールか
+    新しいスレッドで送信する.
+    """
+
+    # 覗き見るリクエストの最大バイト数
+    peek_max = 8192
+
+    def __init__(self, server):
+        self.server  = server
+        self.handler = server.req_handler
+
+        # 内容の変わらないレスポンスのキャッシュ
+        # (code, message) -> (作成した時刻 (秒), レスポンス)
+        self.cache   = { }
+
+    def __str__(self):
+        return "FastResponder[%s:%d]" % self.server.server_address
+
+    def respond(self, request, client_address, policy = None):
+        u"""
+        リクエストに応答して接続を閉じた場合は真を返す.
+        policy には接続を受け付けないポリシーを指定する.
+        """
+        code = 0
+        timeout = request.gettimeout()
+        request.setblocking(0)
+        try:
+            data = self.peek(request)
+            if policy:
+                size     = len(data)
+                code     = 503
+                response = self.render_error(503, policy.reason)
+            else:
+                r = self.parse_request(data)
+                if not r:
+                    request.settimeout(timeout)
+                    return False
+                size, command, path, version, headers = r
+                code, response = self.render(command, path, version, headers,
+                                             client_address) or (0, None)
+                if not response:
+                    request.settimeout(timeout)
+                    return False
+
+            # 覗き見たリクエストを読み捨ててから応答する
+            if size: request.recv(size)
+            sent = self.send(request, response)
+            if sent < len(response):
+                request.settimeout(self.server.sendtimeout or
+                                   self.server.timeout)
+                self.server.run_thread(self.send_rest, request,
+                                       response[sent:], client_address, code)
+                return True
+        except socket.error, e:
+            logging.debug("%s stopped responding to %r. Reason: %s" %
+                          (self, client_address, e))
+        else:
+            logging.info("%s responded %d to %r." %
+                         (self, code, client_address))
+
+        self.server.shutdown_request(request)
+        return True
+
+    def send_rest(self, request, data, client_address, code):
+        u"""
+        respond() で送信しきれなかったレスポンスの残り data を,
+        スレッドで送信して接続を閉じる.
+        """
+        try:
+            request.sendall(data)
+        except socket.error, e:
+            logging.debug("%s stopped responding to %r. Reason: %s" %
+                          (self, client_address, e))
+        else:
+            logging.info("%s responded %d to %r." %
+                         (self, code, client_address))
+        self.server.shutdown_request(request)
+
+    def peek(self, request):
+        u"""
+        届いているリクエストを読み込まずに返す.
+        まだ届いていない場合は待たずに空文字列を返す.
+        ブロッキングしないソケットで呼ぶこと.
+        """
+        try:
+            return request.recv(self.peek_max, socket.MSG_PEEK)
+        except socket.error, e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK): return ""
+            raise
+
+    def send(self, request, data):
+        u"""
+        data をブロッキングせずに送信できるだけ送信して, 送信したバイト数を
+        返す. ブロッキングしないソケットで呼ぶこと.
+        """
+        try:
+            return request.send(data)
+        except socket.error, e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK): return 0
+            raise
+
+    def parse_request(self, data):
+        u"""
+        リクエストを解析して (バイト数, コマンド, パス, バージョン, ヘッダー)
+        のタプルを返す. 全て届いていないか解析できない場合は None を返す.
+        """
+        end = data.find("\r\n\r\n")
+        if end < 0: return None
+
+        line, sep, rest = data[:end + 4].partition("\r\n")
+        words = line.split()
+        if len(words) == 2 and words[1].startswith("HTTP/"):
+            words.insert(1, "/")
+        if len(words) != 3 or not words[2].startswith("HTTP/"):
+            return None
+
+        headers = self.handler.MessageClass(StringIO(rest), 0)
+        try:
+            size = end + 4 + int(headers.get("Content-Length") or 0)
+        except ValueError:
+            return None
+        if size > len(data): return None
+
+        return (size, words[0], words[1], words[2], headers)
+
+    def wants_keepalive(self, version, headers):
+        u"""クライアントが接続の維持を求めているかどうかを返す."""
+        conntype = headers.get("Connection", "").lower()
+        if conntype == "close":
+            return False
+        return conntype == "keep-alive" or version >= "HTTP/1.1"
+
+    def render(self, command, path, version, headers, client_address):
+        u"""
+        リクエストに対する (ステータスコード, レスポンス) のタプルを返す.
+        スレッドで処理しなければならないリクエストの場合は None を返す.
+        """
+        pragmas = parse_pragmas(headers.getheaders("Pragma"))
+
+        if command == "POST":
+            if "log-line" in pragmas:
+                logging.info("%s has log-line from %r: %s" %
+                             (self, client_address, pragmas["log-line"]))
+            return (204, self.render_nocontent())
+
+        if command != "GET" or self.handler.wants_streaming(pragmas):
+            return None
+
+        stats = self.server.stats
+        if stats and stats.handles(path):
+            content_type, content = stats.report(path)
+            return (200, self.render_response(200, None, [
+                ("Content-Type",   content_type),
+                ("Content-Length", len(content)),
+                ("Cache-Control",  "no-cache"),
+                ("Connection",     "close"),
+            ]) + content)
+
+        # 接続を維持してストリーミングのリクエストを待つ場合
+        if self.server.keepalive > 0 and self.handler.wants_header(pragmas) \
+           and self.wants_keepalive(version, headers):
+            return None
+
+        source = self.server.new_source(path)
+        if not source:
+            return None
+
+        if not source.has_info():
+            return (503, self.render_error(503, "Service is not ready."))
+
+        if self.handler.wants_header(pragmas):
+            return (200, source.preamble())
+
+        if headers.has_key("Icy-MetaData"):
+            return (400, self.render_error(400,
+                "Shoutcast Not Supported. Try mms Protocol."))
+
+        host = headers.get("Host", "")
+        if not host:
+            return (400, self.render_error(400,
+                "Unknown Headers. Try mms Protocol."))
+
+        if host.find(":") < 0:
+            host += ":%d" % self.server.server_address[1]
+        playlist = self.handler.playlist_format % ("mms://%s%s" % (host, path))
+        return (200, self.render_response(200, None, [
+            ("Content-Type",   "video/x-ms-asf"),
+            ("Content-Length", len(playlist)),
+            ("Connection",     "close"),
+        ]) + playlist)
+
+    def render_response(self, code, message = None, headers = ()):
+        u"""
+        ステータス行とヘッダーを, ハンドラの send_response() と同じ形式で
+        空行まで含めて返す.
+        """
+        if message is None:
+            message = self.handler.responses.get(code, ("",))[0]
+
+        lines = ["%s %d %s" % (self.handler.protocol_version, code, message),
+                 "Server: %s/%s" % self.server.version,
+                 "Date: %s" % email.utils.formatdate(usegmt = True)]
+        for key, value in headers:
+            lines.append("%s: %s" % (key, value))
+        return "\r\n".join(lines) + "\r\n\r\n"
+
+    def render_error(self, code, message = None):
+        u"""
+        ハンドラの send_error() と同じエラーページのレスポンスを返す.
+        Date ヘッダーが変わらない間はキャッシュしたものを返す.
+        """
+        def render():
+            short, explain = self.handler.responses.get(code, ("", ""))
+            content = self.handler.error_message_format % {
+                "code":    code,
+                "message": cgi.escape(message or short),
+                "explain": explain,
+            }
+            return self.render_response(code, message, [
+                ("Content-Type", self.handler.error_content_type),
+                ("Connection",   "close"),
+            ]) + content.encode("utf_8")
+        return self.cached((code, message), render)
+
+    def render_nocontent(self):
+        u"""ログ情報の送信に対する 204 No Content のレスポンスを返す."""
+        def render():
+            return self.render_response(204, None, [
+                ("Cache-Control", "no-cache"),
+                ("Pragma",        "no-cache"),
+                ("Connection",    "close"),
+            ])
+        return self.cached((204, None), render)
+
+    def cached(self, key, render):
+        u"""
+        key のレスポンスのキャッシュを返す.
+        ないか, 作成してから秒が変わっている場合は render() で作成し直す.
+        """
+        now = int(time.time())
+        created, response = self.cache.get(key, (None, None))
+        if created != now:
+            response = render()
+            self.cache[key] = (now, response)
+        return response
+
+#-------------------------------------------------------------------------------
+# MMSHTTPServer
+#-------------------------------------------------------------------------------
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer): pass
+
+class MMSHTTPServer(ThreadingHTTPServer, EventHolder):
+    u"""
+    MMS-HTTP プロトコルによる接続を受け付ける為のクラス.
+    実際のクライアントに対する処理はハンドラに委譲する.
+    """
+
+    # サーバーのバージョン
+    version = ("MMSHTTPServer", "1.0")
+
+    # スレッドをデーモンスレッドにする
+    daemon_threads = True
+
+    # 接続を待たせている間にポリシーを調べ直す間隔 (秒)
+    admit_interval = 0.5
+
+    # 待ち続けている接続を調べる間隔 (秒)
+    reap_interval = 1
+
+    # 終了を調べながら接続を待ち受ける間隔 (秒)
+    accept_interval = 0.5
+
+    # スレッドプールに client_max より多く用意しておくスレッドの数
+    # 503 を返すハンドラやヘッダーだけのリクエストなどの為に使う
+    pool_spare = 16
+
+    # 終了時に終了パケットを送信し終えるのを待つ秒数
+    # 過ぎても閉じられていない接続は強制的に閉じる
+    drain_grace = 1.0
+
+    def __init__( self,
+                  source_class,
+                  bindings       = ('', 8080),
+                  req_handler    = MMSHTTPStreamingHandler,
+                  max_handler    = MMSHTTPClientMaxHandler,
+                  client_max     = 100,
+                  timeout        = 180,
+                  countdown      = 10,
+                  sendbytes      = 65536,
+                  senddelay      = 0,
+                  reuseport      = False,
+                  resolve        = True,
+                  resolvettl     = 3600,
+                  admitwait      = 0,
+                  fastpath       = True,
+                  keepalive      = 15,
+                  sendtimeout    = 60,
+                  idletimeout    = 120,
+                  pool           = True,
+                  stacksize      = 0,
+                  stats          = False ):
+
+        EventHolder.__init__(self,
+            "start", "terminating", "terminate", "request",
+            "processing", "processed", "client_num", "reap",
+        )
+
+        try:
+            if isinstance(bindings, basestring):
+                if bindings.find(':') >= 0:
+                    bindings    = bindings.split(':', 1)
+                    bindings    = (bindings[0], int(bindings[1]))
+                else:
+                    bindings    = ('', int(bindings))
+            elif isinstance(bindings, int):
+                bindings = ('', bindings)
+        except ValueError, e:
+            logging.error("Given binding port is not a number.")
+            bindings = ('', 8080)
+
+        self.reuseport = reuseport
+        ThreadingHTTPServer.__init__(self, bindings, req_handler)
+        self.socket.settimeout(None)
+
+        self.serving_thread = None
+        self.reaper_thread  = None
+        self.drained        = threading.Event()     # 接続が1つもない
+        self.drained.set()
+        self.connections    = ConnectionRegistry()
+        self.terminated     = False
+        self.source_class   = source_class
+        self.req_handler    = req_handler
+        self.max_handler    = max_handler
+        self.client_max     = client_max
+        self.client_num     = 0
+        self.shared_num     = None
+        self.synced_num     = 0
+        self.resolver       = HostResolver(resolve, resolvettl)
+        self.admitwait      = admitwait
+        self.policies       = [ClientMaxPolicy()]
+        self.fast_responder = fastpath and MMSHTTPFastResponder(self) or None
+        self.stats          = stats and MMSHTTPStatsCollector(self) or None
+        self.pool           = None
+        if pool:
+            self.pool = ThreadPool(client_max + self.pool_spare, stacksize,
+                                   "%s Pool" % self)
+        self.timeout        = timeout
+        self.countdown      = countdown
+        self.sendbytes      = sendbytes
+        self.senddelay      = senddelay
+        self.keepalive      = keepalive
+        self.sendtimeout    = sendtimeout
+        self.idletimeout    = idletimeout
+        self.reaped         = 0     # 待ち続けて閉じた接続の数
+        self.reused_conns   = 0     # 2つ目以降のリクエストを処理した接続の数
+        self.reused_reqs    = 0     # 2つ目以降のリクエストの数
+        self.lockobj        = threading.Lock()
+
+        logging.info("%s is initialized successfully." % self)
+
+    def __str__(self):
+        return "Server[%s:%d]" % self.server_address
+
+    def server_bind(self):
+        u"""
+        ソケットをバインドする.
+        reuseport が真の場合は, 同じポートに複数のプロセスからバインドできる
+        ように SO_REUSEPORT を設定する.
+        """
+        if self.reuseport:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        ThreadingHTTPServer.server_bind(self)
+
+    def rebind(self):
+        u"""
+        待ち受け用のソケットを作り直して同じアドレスにバインドする.
+        fork した子プロセスで, 親プロセスとは別のソケットで待ち受ける為に使う.
+        """
+        self.socket.close()
+        self.socket = socket.socket(self.address_family, self.socket_type)
+        self.server_bind()
+        self.server_activate()
+
+    def share_client_num(self, value, workers = 1):
+        u"""
+        multiprocessing.Value で作成した value で, 複数のプロセスのサーバーと
+        接続数を共有する. client_max は共有する接続数の合計に適用される.
+
+        workers には接続を分け合うプロセスの数を指定する. スレッドプールは
+        1つのプロセスが受け持つ分の接続数に合わせた大きさにする.
+        スレッドプールを開始する前に呼ぶこと.
+        """
+        self.shared_num = value
+        if self.pool and workers > 1:
+            share = (self.client_max + workers - 1) // workers
+            self.pool.size = share + self.pool_spare
+
+    def total_client_num(self):
+        u"""接続数を共有するサーバー全体の接続数を返す."""
+        if self.shared_num is None:
+            return self.client_num
+        return self.shared_num.value
+
+    def sync_shared_num(self):
+        u"""
+        ワーカープロセスで配信する場合に, 配信しない親プロセスから定期的に
+        呼んで, 共有する接続数が変わっていれば client_num イベントを通知する.
+        ワーカープロセスで通知されたイベントは親プロセスには届かないので,
+        プラグインなどは total_client_num() で合計を調べられる.
+        """
+        num = self.total_client_num()
+        if num == self.synced_num: return
+        self.synced_num = num
+        self.notify_event("client_num")
+
+    def serve_forever(self):
+        u"""別スレッドでリクエストを処理し続ける."""
+        if self.serving_thread: return
+
+        if self.pool: self.pool.start()
+        if self.stats: self.stats.start()
+
+        t = threading.Thread(target = self.server_thread_proc)
+        t.setName( str(self) )
+        t.start()
+        self.serving_thread = t
+
+        if self.idletimeout > 0:
+            t = threading.Thread(target = self.reaper_thread_proc)
+            t.setName( "%s Reaper" % self )
+            t.setDaemon(1)
+            t.start()
+            self.reaper_thread = t
+
+    def server_thread_proc(self):
+        u"""
+        サーバースレッド用プロシージャ.
+        待ち受けるソケットが閉じられるか, accept_interval 秒毎に
+        終了したかどうかを調べる.
+        """
+        self.notify_event("start")
+        while not self.terminated:
+            try:
+                r, w, e = select.select([self], [], [], self.accept_interval)
+            except (select.error, socket.error, ValueError):
+                # 終了時にソケットが閉じられた場合など
+                break
+            if r and not self.terminated:
+                self.handle_accept()
+
+    def handle_accept(self):
+        u"""接続を受け付けて処理する."""
+        try:
+            request, client_address = self.get_request()
+        except socket.error:
+            return
+
+        if not self.verify_request(request, client_address):
+            self.shutdown_request(request)
+            return
+
+        try:
+            self.process_request(request, client_address)
+        except:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+
+    def reaper_thread_proc(self):
+        u"""
+        クライアントを idletimeout 秒以上待っている接続を閉じ続ける
+        スレッド用プロシージャ.
+        """
+        while not self.terminated:
+            time.sleep(self.reap_interval)
+            self.reap_idle()
+
+    def reap_idle(self):
+        u"""クライアントを idletimeout 秒以上待っている接続を閉じる."""
+        for connection in self.connections:
+            if connection.idle() > self.idletimeout:
+                self.reap(connection, "idle")
+
+    def reap(self, connection, reason, shutdown = True):
+        u"""
+        待ち続けている接続を閉じたことを記録して reap イベントを通知する.
+        shutdown が真の場合は接続のソケットを shutdown して,
+        処理しているスレッドやイベントループに接続を閉じさせる.
+        """
+        logging.info("%s reaped %s (%s)." %
+                     (self, self.connection_name(connection), reason))
+
+        self.lockobj.acquire()
+        try:
+            self.reaped += 1
+        finally:
+            self.lockobj.release()
+
+        # 閉じるまでに何度も数えないようにする
+        connection.set_waiting(False)
+        if shutdown: connection.shutdown()
+
+        self.notify_event("reap", connection, reason)
+
+    def server_close(self):
+        u"""
+        サーバーを終了する.
+
+        すぐに待ち受けをやめて, 配信中の全ての接続にそれぞれのスレッドで
+        終了パケットを送信させる. drain_grace 秒経っても閉じられていない
+        接続は強制的に閉じて, 全ての接続が閉じられた時点で返る.
+        """
+        logging.info("%s terminating..." % self)
+        self.notify_event("terminating")
+
+        self.terminated = True
+
+        # 待ち受けているスレッドを起こす
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        ThreadingHTTPServer.server_close(self)
+
+        logging.debug("%s waiting for threads terminate..." % self)
+
+        self.drain()
+        if not self.wait_drained(self.drain_grace):
+            for connection in self.connections:
+                connection.shutdown()
+            self.wait_drained(self.timeout)
+
+        if self.pool: self.pool.close()
+        if self.stats: self.stats.close()
+
+        remains = self.client_num
+        if remains == 0:
+            logging.info("%s terminated successfully." % self)
+        else:
+            logging.warning("%s terminated, but %d clients remained." %
+                            (self, remains))
+
+        self.notify_event("terminate")
+
+    def drain(self):
+        u"""
+        配信中の全ての接続のストリーミングを止めて, 終了パケットを
+        送信させる.
+        """
+        for connection in self.connections:
+            if connection.stream: connection.stream.stop()
+
+    def wait_drained(self, timeout):
+        u"""
+        全ての接続が閉じられるまで最大 timeout 秒待機する.
+        閉じられた場合は真を返す. countdown 秒毎に残りをログに記録する.
+        """
+        deadline = time.time() + timeout
+        while not self.drained.isSet():
+            leftsec = deadline - time.time()
+            if leftsec <= 0: return False
+            if self.drained.wait(min(leftsec, self.countdown)): break
+            logging.info("%s has %d sec left (%d clients remain)" %
+                         (self, max(0, deadline - time.time()),
+                          self.client_num))
+        return True
+
+    def process_request_thread(self, request, client_address, policy = None):
+        u"""
+        リクエストをスレッドとして処理する.
+        policy には process_request() で調べた, 接続を受け付けないポリシーを
+        指定する.
+        """
+
+        # 受け付けた場合はポリシーが確保したものを接続を閉じた時に解放する
+        admitted = not policy
+
+        # 受け付けた場合も, スレッドが始まるまでに接続数が変わっている事が
+        # あるので, 待たせてもよいポリシーだけを調べ直す
+        if not policy:
+            policy = self.admit(client_address, self.queueable_policies())
+
+        # 受け付けられるまで待たせる場合があるので, ハンドラはスレッドで選ぶ
+        policy = self.wait_for_admission(client_address, policy,
+                                         self.admitwait)
+        handler_class = self.handler_for(client_address, policy)
+        logging.debug("%s has selected %s for request handling." %
+                      (self, repr(handler_class)))
+
+        # スレッドをリストに加えておく
+        connection = self.add_connection(client_address, request, admitted)
+
+        self.notify_event("processing")
+
+        try:
+            self.finish_request(request, client_address, connection,
+                                handler_class)
+        except:
+            self.handle_error(request, client_address)
+        self.shutdown_request(request)
+
+        self.notify_event("processed")
+
+        # スレッドをリストから取り除く
+        self.remove_connection(connection)
+
+    def process_request(self, request, client_address):
+        u"""
+        リクエストを処理する.
+        ハンドラの選択と処理は, pool がある場合はスレッドプールで,
+        ない場合はリクエスト毎に作成するスレッドで行う.
+        スレッドプールが全て使われている場合は空くまで待たせる.
+
+        fast_responder がある場合, 待たせずに断る接続と, すぐに終わる
+        リクエストにはスレッドを作らずにこのスレッドで応答する.
+        """
+        logging.info("%s is processing request from %r." %
+                     (self, client_address))
+
+        self.notify_event("request", client_address)
+
+        # ポリシーはここで1度だけ調べて, スレッドに渡す
+        policy = self.admit(client_address)
+        queued = policy and policy.queueable and self.admitwait > 0
+        if self.fast_responder and not queued and \
+           self.fast_responder.respond(request, client_address, policy):
+            if not policy: self.release(client_address)
+            return
+
+        self.run_thread(self.process_request_thread,
+                        request, client_address, policy)
+
+    def run_thread(self, func, *args):
+        u"""
+        func(*args) をスレッドプールがある場合はそのスレッドで,
+        ない場合は新しく作成するスレッドで実行する.
+        """
+        if self.pool:
+            self.pool.submit(func, *args)
+            return
+
+        t = threading.Thread(target = func, args = args)
+        t.setDaemon(self.daemon_threads)
+        t.start()
+
+    def add_policy(self, policy):
+        u"""新しい接続を受け付けるかどうかを判断するポリシーを追加する."""
+        self.policies.append(policy)
+
+    def admit(self, client_address, policies = None):
+        u"""
+        ポリシーを順番に調べて, 接続を受け付けないポリシーを返す.
+        全てのポリシーが受け付ける場合は None を返す.
+        受け付けない場合は, それまでのポリシーが確保したものを解放する.
+        受け付けた場合は, 接続を閉じた時に release() を呼ぶこと.
+        """
+        if policies is None: policies = self.policies
+        for i, policy in enumerate(policies):
+            if not policy.admit(self, client_address):
+                self.release(client_address, policies[:i])
+                return policy
+        return None
+
+    def release(self, client_address, policies = None):
+        u"""
+        admit() で受け付けた client_address からの接続について,
+        ポリシーが確保したものを解放する.
+        """
+        if policies is None: policies = self.policies
+        for policy in policies:
+            policy.release(self, client_address)
+
+    def admit_stream(self, connection, source):
+        u"""
+        接続 connection でソース source のストリーミングを配信してよいか
+        ポリシーを順番に調べて, 受け付けないポリシーを返す.
+        全てのポリシーが受け付ける場合は None を返す.
+        受け付けた場合, ポリシーが確保したものは接続を取り除く時に解放する.
+        """
+        connection.bitrate = source.bitrate() or 0
+        for i, policy in enumerate(self.policies):
+            if not policy.admit_stream(self, connection):
+                self.release_stream(connection, self.policies[:i])
+                connection.bitrate = 0
+                logging.info("%s refused streaming to %r by %s: %s" %
+                             (self, connection.address, policy, policy.reason))
+                return policy
+        return None
+
+    def release_stream(self, connection, policies = None):
+        u"""
+        admit_stream() で受け付けた, ビットレートが分かるストリーミングの
+        接続 connection について, ポリシーが確保したものを解放する.
+        """
+        if policies is None: policies = self.policies
+        for policy in policies:
+            policy.release_stream(self, connection)
+
+    def select_handler(self, client_address, wait = 0):
+        u"""
+        リクエストを処理するハンドラのクラスを返す.
+        ポリシーが接続を受け付けない場合は max_handler を,
+        それ以外なら req_handler を返す.
+
+        wait を指定した場合, 待たせてもよいポリシーだけが受け付けない間は
+        最大 wait 秒まで受け付けられるのを待つ.
+        req_handler を返した場合は, 接続を閉じた時に release() を呼ぶこと.
+        """
+        policy = self.admit(client_address)
+        policy = self.wait_for_admission(client_address, policy, wait)
+        return self.handler_for(client_address, policy)
+
+    def wait_for_admission(self, client_address, policy, wait):
+        u"""
+        policy が待たせてもよいポリシーの場合, 最大 wait 秒まで
+        待たせてもよいポリシーだけを調べ直して受け付けられるのを待つ.
+        待った後も受け付けないポリシーを返す.
+        """
+        if policy and policy.queueable and wait > 0:
+            queueable = self.queueable_policies()
+            deadline  = time.time() + wait
+            while policy and time.time() < deadline and not self.terminated:
+                time.sleep(self.admit_interval)
+                policy = self.admit(client_address, queueable)
+        return policy
+
+    def queueable_policies(self):
+        u"""
+        待たせてもよいポリシーのリストを返す.
+        これらのポリシーは何度調べても状態を変えない.
+        """
+        return [p for p in self.policies if p.queueable]
+
+    def handler_for(self, client_address, policy):
+        u"""
+        policy が接続を受け付けないポリシーなら max_handler を,
+        None なら req_handler を返す.
+        """
+        if policy:
+            logging.info("%s refused %r by %s: %s" %
+                         (self, client_address, policy, policy.reason))
+            return self.max_handler
+        return self.req_handler
+
+    def finish_request(self, request, client_address, connection = None,
+                       handler_class = None):
+        u"""
+        ハンドラを作成してリクエストを処理する.
+        ハンドラには接続の ConnectionRecord を渡す.
+        """
+        handler_class = handler_class or self.req_handler
+        handler_class(request, client_address, self, connection)
+
+    def add_connection(self, client_address, request = None, admitted = False):
+        u"""
+        接続を connections に登録して, その ConnectionRecord を返す.
+        接続を表す文字列は connection_name() で取得する.
+        request には接続のソケットを指定する.
+        admitted にはポリシーが受け付けた接続かどうかを指定する.
+        """
+        connection = self.connections.add(client_address, request)
+        connection.admitted = admitted
+        return connection
+
+    def remove_connection(self, connection):
+        u"""
+        接続を connections から取り除く.
+        ポリシーが受け付けた接続やストリーミングなら,
+        ポリシーが確保したものを解放する.
+        """
+        self.connections.remove(connection)
+        if connection.bitrate:
+            self.release_stream(connection)
+            connection.bitrate = 0
+        if connection.admitted:
+            connection.admitted = False
+            self.release(connection.address)
+
+    def connection_name(self, connection):
+        u"""
+        接続を表す "ホスト名:ポート" の文字列を返す.
+        逆引きが済んでいない場合はホスト名の代わりに IP アドレスになる.
+        """
+        address = connection.address
+        return "%s:%d" % (self.resolver.lookup(address[0]), address[1])
+
+    def connection_names(self):
+        u"""全ての接続を表す文字列のリストを返す."""
+        return [self.connection_name(c) for c in self.connections]
+
+    def new_source(self, path = None):
+        u"""
+        クライアントに配信するソースを返す.
+        path を指定した場合は, そのリクエストのパスに振り分けられるソースを
+        返す. 振り分け先がない場合は None を返す.
+        """
+        factory = self.source_class
+        if path is not None and hasattr(factory, "route"):
+            factory = factory.route(path)
+            if not factory: return None
+
+        if factory and callable(factory):
+            return factory()
+        else:
+            logging.warn("%s can't create a new source." % self)
+
+    def count_reuse(self, connection):
+        u"""
+        接続 connection を維持して次のリクエストを処理したことを数える.
+        """
+        self.lockobj.acquire()
+        try:
+            self.reused_reqs += 1
+            if connection.requests == 2:
+                self.reused_conns += 1
+        finally:
+            self.lockobj.release()
+
+    def log_connections(self):
+        u"""クライアント接続数をログに記録する."""
+        logging.info("%s Connections: %d/%d" %
+                     (self, self.total_client_num(), self.client_max))
+
+    def add_shared_num(self, n):
+        u"""共有している接続数に n を加える."""
+        if self.shared_num is None: return
+        lock = self.shared_num.get_lock()
+        lock.acquire()
+        try:
+            self.shared_num.value += n
+        finally:
+            lock.release()
+
+    def inc_client_num(self):
+        u"""クライアント接続数を増やす."""
+        self.lockobj.acquire()
+        try:
+            self.client_num += 1
+            self.drained.clear()
+        finally:
+            self.lockobj.release()
+        self.add_shared_num(1)
+
+        self.notify_event("client_num")
+        self.log_connections()
+
+    def dec_client_num(self):
+        u"""クライアント接続数を減らす."""
+        self.lockobj.acquire()
+        try:
+            self.client_num -= 1
+            if self.client_num == 0: self.drained.set()
+        finally:
+            self.lockobj.release()
+        self.add_shared_num(-1)
+
+        self.notify_event("client_num")
+        self.log_connections()
+
+#-------------------------------------------------------------------------------
+
+#
+# テスト用
+#
+if __name__ == "__main__":
+    logging.basicConfig(level  = logging.DEBUG,
+                        format = '%(asctime)s %(levelname)s %(message)s')
+    logging.debug("MMSHTTPServer test starts.")
+    server = MMSHTTPServer()
+    server.timeout_on_termination = 60
+    server.serve_forever()
+
+    logging.debug("MMSHTTPServer started serving.")
+
+    import time
+    time.sleep(180)
+
+    logging.debug("MMSHTTPServer is beging closed...")
+
+    server.server_close()
+
+    logging.debug("MMSHTTPServer has been closed.")
+    logging.debug("MMSHTTPServer test finished.")
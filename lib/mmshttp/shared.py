@@ -0,0 +1,335 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Shared Memory Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+1つのプロセスで受信したストリーミングを, fork した複数のワーカープロセスから
+配信する為のクラス.
+
+リングバッファやクライアントの状態は共有メモリ (multiprocessing.sharedctypes)
+に置かれるので, 共有するオブジェクトは fork する前に作成しておく必要がある.
+
+受信プロセスは共有メモリに書き込むだけで, ワーカープロセスを待つことはない.
+新しいパケットはワーカープロセス毎のパイプで知らせ, ワーカープロセスは
+パケットを使い終わった後に上書きされていないかを調べる.
+"""
+
+from multiprocessing.sharedctypes import RawArray
+from StringIO import StringIO
+import threading
+import logging
+import httplib
+import struct
+import errno
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from ring import PacketRing
+from client import MMSHTTPBufferedClient
+
+__all__ = ["SharedPacketRing", "MMSHTTPSharedClient"]
+
+#-------------------------------------------------------------------------------
+# SharedPacketRing
+#-------------------------------------------------------------------------------
+
+def _shared_property(index, doc):
+    u"""state 配列の index 番目の値を読み書きするプロパティを返す."""
+    def fget(self):
+        return self.state[index]
+    def fset(self, value):
+        self.state[index] = value
+    return property(fget, fset, doc = doc)
+
+class SharedPacketRing(PacketRing):
+    u"""
+    アリーナとインデックスを共有メモリに置いた PacketRing.
+    fork した子プロセスからも同じパケットを参照できる.
+
+    共有メモリは作成後に大きさを変えられないので, resized() で作成した
+    リングバッファは fork した後のプロセスとは共有されない.
+    """
+
+    def __init__(self, slots = 16, capacity = 0):
+        # seq, first, keyframe, wpos
+        self.state = RawArray("l", [-1, 0, -1, 0])
+        PacketRing.__init__(self, slots, capacity)
+
+    seq      = _shared_property(0, u"最も新しいパケットのシーケンス番号")
+    first    = _shared_property(1, u"取得できる最も古いパケットのシーケンス番号")
+    keyframe = _shared_property(2, u"最も新しいキーフレームのシーケンス番号")
+    wpos     = _shared_property(3, u"次に書き込むアリーナの位置")
+
+    def new_arena(self, capacity):
+        return RawArray("c", capacity)
+
+    def new_array(self, typecode, size, value):
+        return RawArray(typecode, [value] * size)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPSharedClient
+#-------------------------------------------------------------------------------
+
+class MMSHTTPSharedClient(MMSHTTPBufferedClient):
+    u"""
+    受信したストリーミングを共有メモリのリングバッファに保存するクライアント.
+
+    受信は作成したプロセス (受信プロセス) で行い, fork した workers 個の
+    子プロセス (ワーカープロセス) では attach_worker() した後に
+    iter_streaming() でリングバッファのパケットを読み込む.
+    status_line, header, info_packet は受信プロセスでストリーミングの受信を
+    開始した時 (保存してあったものを使う場合はその時も) に共有メモリに
+    書き込まれ, 子プロセスではそれを読み込んで返す.
+
+    受信プロセスはパケットを保存する度に, 知らせていないワーカープロセスの
+    パイプに1バイト書き込む. パイプは非ブロッキングなので, ワーカープロセスが
+    止まっていても受信は待たされない. ワーカープロセスではパイプを読む
+    スレッドが, そのプロセスの condition で待機しているイテレーターと
+    add_waker() で登録した関数を起こす.
+
+    リングバッファの大きさは変えられないので bufsecs は使えない.
+    bufsize と bufbytes で十分な大きさにしておくこと.
+    """
+
+    ring_class = SharedPacketRing
+
+    # 共有するレスポンスヘッダーと情報パケットの最大バイト数
+    session_max = 262144
+
+    def __init__(self, workers = 1, *args, **kwargs):
+        self.pid      = os.getpid()
+        # terminated, started, 版, 長さ, bytes_received, reconnects, stalls,
+        # change_seq, jitter_packets, jitter_delay, jitter_underruns
+        self.state    = RawArray("l", 11)
+        self.session  = RawArray("c", self.session_max)
+        self.loaded   = (0, None, None, None)
+
+        # ワーカープロセス毎の (読む側, 書く側) のパイプと, 知らせてから
+        # まだ読まれていないかどうか
+        self.pipes    = [self.create_pipe() for i in xrange(workers)]
+        self.signaled = RawArray("b", workers)
+        self.worker   = None
+        self.session_lock = threading.Lock()
+
+        MMSHTTPBufferedClient.__init__(self, *args, **kwargs)
+
+    def create_pipe(self):
+        u"""書く側を非ブロッキングにしたパイプを作成して返す."""
+        r, w = os.pipe()
+        if fcntl:
+            flags = fcntl.fcntl(w, fcntl.F_GETFL)
+            fcntl.fcntl(w, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        return (r, w)
+
+    def attach_worker(self, index):
+        u"""
+        fork した index 番目のワーカープロセスで呼んで, 受信プロセスからの
+        知らせを待つスレッドを開始する.
+        """
+        self.worker    = index
+        self.condition = threading.Condition()
+        self.wakers    = [ ]
+
+        t = threading.Thread(target = self.signal_thread_proc)
+        t.setName("%s Worker %d" % (self, index))
+        t.setDaemon(1)
+        t.start()
+
+    def signal_thread_proc(self):
+        u"""
+        ワーカープロセスで受信プロセスからの知らせを待つスレッド用
+        プロシージャ. 知らせを受けたら待っているイテレーターを起こす.
+        """
+        fd = self.pipes[self.worker][0]
+        while True:
+            try:
+                data = os.read(fd, 4096)
+            except OSError, e:
+                if e.errno == errno.EINTR: continue
+                logging.error("%s stopped waiting for packets: %s" % (self, e))
+                return
+            if not data: return
+
+            # 起こす前に戻すので, その後に保存されたパケットは必ず知らされる
+            self.signaled[self.worker] = 0
+            MMSHTTPBufferedClient.wakeup(self)
+
+    def signal_workers(self):
+        u"""
+        受信プロセスから, まだ知らせていないワーカープロセスに
+        新しいパケットを知らせる. パイプが一杯か閉じられている場合は諦める.
+        """
+        for i, (r, w) in enumerate(self.pipes):
+            if self.signaled[i]: continue
+            self.signaled[i] = 1
+            try:
+                os.write(w, "\0")
+            except OSError:
+                pass
+
+    def is_receiver(self):
+        u"""受信プロセスかどうかを返す."""
+        return os.getpid() == self.pid
+
+    def _get_terminated(self):
+        return bool(self.state[0])
+
+    def _set_terminated(self, value):
+        self.state[0] = bool(value)
+
+    def _get_started(self):
+        return bool(self.state[1])
+
+    def _set_started(self, value):
+        if value and self.is_receiver(): self.publish_session()
+        self.state[1] = bool(value)
+
+    def _get_seq(self):
+        return self.buffer.seq
+
+    def _set_seq(self, value):
+        self.buffer.seq = value
+
+    def _session_property(index, name):
+        u"""
+        受信プロセスでは通常の属性として, 子プロセスでは共有メモリから
+        読み込んだ値を返すプロパティを作成する.
+        """
+        def fget(self):
+            if self.is_receiver():
+                return self.__dict__.get(name)
+            return self.load_session()[index]
+        def fset(self, value):
+            self.__dict__[name] = value
+        return property(fget, fset)
+
+    terminated  = property(_get_terminated, _set_terminated)
+    started     = property(_get_started, _set_started)
+    seq         = property(_get_seq, _set_seq)
+    bytes_received = _shared_property(4,
+        u"リングバッファに保存したパケットのバイト数")
+    reconnects  = _shared_property(5, u"失敗して接続し直した回数")
+    stalls      = _shared_property(6, u"受信が止まって接続し直した回数")
+    change_seq  = _shared_property(7,
+        u"最後のメディアの変更 ($C) のシーケンス番号")
+    jitter_packets   = _shared_property(8,
+        u"ジッターバッファに保持しているパケット数")
+    jitter_delay     = _shared_property(9,
+        u"ジッターバッファに保持するミリ秒数")
+    jitter_underruns = _shared_property(10,
+        u"ジッターバッファが間に合わなかった回数")
+    status_line = _session_property(1, "_status_line")
+    header      = _session_property(2, "_header")
+    info_packet = _session_property(3, "_info_packet")
+    del _session_property
+
+    def add_waker(self, func):
+        u"""
+        ワーカープロセスで登録した関数は, 受信プロセスからの知らせを
+        待つスレッドから呼ばれる. attach_worker() していない子プロセスでは
+        呼べないので, 登録せずに偽を返す.
+        """
+        if not self.is_receiver() and self.worker is None: return False
+        return MMSHTTPBufferedClient.add_waker(self, func)
+
+    def put_packet(self, packet, key = False):
+        u"""
+        パケットを共有メモリのリングバッファに保存して,
+        ワーカープロセスにも知らせる.
+        """
+        MMSHTTPBufferedClient.put_packet(self, packet, key)
+        self.signal_workers()
+
+    def wakeup(self):
+        u"""
+        このプロセスでパケットを待機している全てのイテレーターを起こす.
+        受信プロセスではワーカープロセスのイテレーターも起こす.
+        """
+        MMSHTTPBufferedClient.wakeup(self)
+        if self.is_receiver(): self.signal_workers()
+
+    def resize_buffer(self):
+        u"""
+        共有メモリのリングバッファは子プロセスと共有できなくなるので
+        大きさを変えない.
+        """
+        if self.bufsecs:
+            logging.debug("%s doesn't resize the shared buffer." % self)
+
+    def restore_info(self, status_line, header, info_packet):
+        u"""
+        保存してあったレスポンスと動画の情報を使う.
+        受信を開始する前から子プロセスでも使えるように共有メモリに書き込む.
+        """
+        MMSHTTPBufferedClient.restore_info(self, status_line, header,
+                                           info_packet)
+        if self.is_receiver(): self.publish_session()
+
+    def apply_info(self, packet):
+        u"""
+        配信中に変わった動画の情報パケットに差し替えて,
+        子プロセスでも新しいものを使うように共有メモリに書き込む.
+        """
+        MMSHTTPBufferedClient.apply_info(self, packet)
+        if self.is_receiver() and self.started: self.publish_session()
+
+    def publish_session(self):
+        u"""
+        レスポンスヘッダーと情報パケットを共有メモリに書き込む.
+        書き込んでいる間は版を奇数にしておく.
+        """
+        status = self.status_line or ""
+        header = self.header and "".join(self.header.headers) or ""
+        info   = self.info_packet and str(self.info_packet) or ""
+        data   = struct.pack("<III", len(status), len(header), len(info)) + \
+                 status + header + info
+        if len(data) > self.session_max:
+            logging.error("%s can't share the media info of %d bytes." %
+                          (self, len(data)))
+            return
+
+        self.session_lock.acquire()
+        try:
+            self.state[2] += 1
+            self.session[:len(data)] = data
+            self.state[3]  = len(data)
+            self.state[2] += 1
+        finally:
+            self.session_lock.release()
+
+    def load_session(self):
+        u"""
+        共有メモリに書き込まれたレスポンスヘッダーと情報パケットを読み込んで
+        (版, status_line, header, info_packet) のタプルで返す.
+        前回読み込んだ後に書き込まれていない場合は前回の値を返す.
+        読み込んでいる間に書き込まれた場合は読み込み直す.
+        """
+        while True:
+            version = self.state[2]
+            if version == self.loaded[0]: return self.loaded
+            if version % 2 == 0:
+                data = self.session[:self.state[3]]
+                if self.state[2] == version: break
+            time.sleep(0.001)
+
+        sizes  = struct.unpack_from("<III", data)
+        pos    = struct.calcsize("<III")
+        status = data[pos:pos + sizes[0]]
+        pos   += sizes[0]
+        header = httplib.HTTPMessage(StringIO(data[pos:pos + sizes[1]]), 0)
+        pos   += sizes[1]
+
+        info = None
+        if sizes[2]:
+            info = self.info_packet_class()
+            info.parse(data[pos:pos + sizes[2]])
+
+        self.loaded = (version, status, header, info)
+        return self.loaded
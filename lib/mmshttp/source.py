@@ -1,135 +1,309 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-MMS-HTTP Streaming Source Classes
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-from client import MMSHTTPBufferedClient
-
-__all__ = ["MMSHTTPBaseSource", "MMSHTTPClientSource",
-           "MMSHTTPSourceFactory", "MMSHTTPClientSourceFactory"]
-
-#-------------------------------------------------------------------------------
-# MMSHTTPBaseSource
-#-------------------------------------------------------------------------------
-
-class MMSHTTPBaseSource(object):
-    u"""
-    MMSHTTP サーバーで配信するストリーミングソースの基底クラス.
-    メソッド定義だけなので, サブクラスで実装する必要がある.
-    """
-
-    def is_ready(self):
-        u"""
-        ソースの準備ができているかどうかを返す.
-        """
-        pass
-
-    def headers(self):
-        u"""
-        リクエストに対するレスポンスのヘッダー文字列を返す.
-        ヘッダーの終端を表す空行もついている.
-        """
-        pass
-
-    def info_packet(self):
-        u"""
-        ストリーミングの情報パケット ($D) を MMSHTTPPacket オブジェクトで返す.
-        """
-        pass
-
-    def iter_streaming(self):
-        u"""
-        ストリーミングのパケットオブジェクトを順番に処理するイテレータを返す.
-        """
-        pass
-
-    def __iter__(self):
-        return self.iter_streaming()
-
-#-------------------------------------------------------------------------------
-# MMSHTTPClientSource
-#-------------------------------------------------------------------------------
-
-class MMSHTTPClientSource(MMSHTTPBaseSource):
-    u"""
-    mmshttp.client.MMSHTTPBufferedClient によって受信しているストリーミングを
-    そのまま中継するソース.
-    """
-
-    def __init__(self, client):
-        self.client = client
-
-    def is_ready(self):
-        u"""
-        ソースの準備ができているかどうかを返す.
-        """
-        if self.client.started and not self.client.terminated:
-                return True
-        else:
-                return False
-
-    def headers(self):
-        u"""
-        リクエストに対するレスポンスのヘッダー文字列を返す.
-        ヘッダーの終端を表す空行もついている.
-        """
-        header =  self.client.status_line + "\r\n"
-        header += "".join(self.client.header.headers)
-        header += "\r\n"
-        return header
-
-    def info_packet(self):
-        u"""
-        ストリーミングの情報パケット ($D) を MMSHTTPPacket オブジェクトで返す.
-        """
-        return self.client.info_packet
-
-    def iter_streaming(self):
-        u"""
-        ストリーミングのパケットオブジェクトを順番に処理するイテレータを返す.
-        """
-        return self.client.iter_streaming()
-
-#-------------------------------------------------------------------------------
-# MMSHTTPSourceFactory
-#-------------------------------------------------------------------------------
-
-class MMSHTTPSourceFactory(object):
-    u"""
-    MMS-HTTP プロトコルの配信に使われるソースをリクエストに応じて作成するクラス.
-    """
-
-    def __init__(self, source_class, *args, **kwargs):
-        self.source_class  = source_class
-        self.source_args   = args
-        self.source_kwargs = kwargs
-
-    def __call__(self, *args, **kwargs):
-        return self.create(*args, **kwargs)
-
-    def create(self, *args, **kwargs):
-        u"""
-        ソースのインスタンスを作成する.
-        """
-
-        # 引数を合成
-        args = self.source_args + args
-        kw   = self.source_kwargs.copy()
-        kw.update(kwargs)
-
-        return self.source_class(*args, **kw)
-
-#-------------------------------------------------------------------------------
-# MMSHTTPClientSourceFactory
-#-------------------------------------------------------------------------------
-
-class MMSHTTPClientSourceFactory(MMSHTTPSourceFactory):
-    u"""
-    リクエストに応じて MMSHTTPClientSource を作成するクラス.
-    """
-
-    def __init__(self, client):
-        MMSHTTPSourceFactory.__init__(self, MMSHTTPClientSource, client)
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Streaming Source Classes
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+from client import MMSHTTPBufferedClient
+
+__all__ = ["MMSHTTPBaseSource", "MMSHTTPClientSource", "MMSHTTPPreambleCache",
+           "MMSHTTPSourceFactory", "MMSHTTPClientSourceFactory",
+           "MMSHTTPChannelSourceFactory"]
+
+#-------------------------------------------------------------------------------
+# MMSHTTPBaseSource
+#-------------------------------------------------------------------------------
+
+class MMSHTTPBaseSource(object):
+    u"""
+    MMSHTTP サーバーで配信するストリーミングソースの基底クラス.
+    メソッド定義だけなので, サブクラスで実装する必要がある.
+    """
+
+    def is_ready(self):
+        u"""
+        ソースの準備ができているかどうかを返す.
+        """
+        pass
+
+    def has_info(self):
+        u"""
+        ヘッダーと情報パケットのリクエストに応答できるかどうかを返す.
+        ストリーミングの準備ができていなくても応答できる場合がある.
+        """
+        return self.is_ready()
+
+    def headers(self):
+        u"""
+        リクエストに対するレスポンスのヘッダー文字列を返す.
+        ヘッダーの終端を表す空行もついている.
+        """
+        pass
+
+    def info_packet(self):
+        u"""
+        ストリーミングの情報パケット ($D) を MMSHTTPPacket オブジェクトで返す.
+        """
+        pass
+
+    def preamble(self, keepalive = False):
+        u"""
+        レスポンスヘッダーと情報パケットをつなげた, リクエストに対して
+        最初に送信する文字列を返す.
+        keepalive が真の場合は接続を維持する為のヘッダーをつけたものを返す.
+        作れない場合は None を返す.
+        """
+        if keepalive: return None
+        return self.headers() + str(self.info_packet())
+
+    def iter_streaming(self):
+        u"""
+        ストリーミングのパケットオブジェクトを順番に処理するイテレータを返す.
+        """
+        pass
+
+    def bitrate(self):
+        u"""
+        ストリーミングのビットレート (bps) を返す. 分からない場合は 0 を返す.
+        """
+        return 0
+
+    def __iter__(self):
+        return self.iter_streaming()
+
+#-------------------------------------------------------------------------------
+# MMSHTTPClientSource
+#-------------------------------------------------------------------------------
+
+class MMSHTTPClientSource(MMSHTTPBaseSource):
+    u"""
+    mmshttp.client.MMSHTTPBufferedClient によって受信しているストリーミングを
+    そのまま中継するソース.
+    """
+
+    def __init__(self, client, cache = None):
+        self.client = client
+        self.cache  = cache or MMSHTTPPreambleCache(client)
+
+    def is_ready(self):
+        u"""
+        ソースの準備ができているかどうかを返す.
+        """
+        if self.client.started and not self.client.terminated:
+                return True
+        else:
+                return False
+
+    def has_info(self):
+        u"""
+        ヘッダーと情報パケットのリクエストに応答できるかどうかを返す.
+        受信を開始する前でも, 情報パケットを受信したか保存してあったものを
+        読み込んでいれば応答できる.
+        """
+        client = self.client
+        return client.info_packet is not None and not client.terminated
+
+    def headers(self):
+        u"""
+        リクエストに対するレスポンスのヘッダー文字列を返す.
+        ヘッダーの終端を表す空行もついている.
+        """
+        preamble, size = self.cache.get()
+        return preamble[:size]
+
+    def info_packet(self):
+        u"""
+        ストリーミングの情報パケット ($D) を MMSHTTPPacket オブジェクトで返す.
+        """
+        return self.client.info_packet
+
+    def preamble(self, keepalive = False):
+        u"""
+        レスポンスヘッダーと情報パケットをつなげた, リクエストに対して
+        最初に送信する文字列を返す. 文字列はキャッシュされている.
+        keepalive が真の場合は接続を維持する為のヘッダーをつけたものを返す.
+        """
+        return self.cache.get(keepalive)[0]
+
+    def iter_streaming(self):
+        u"""
+        ストリーミングのパケットオブジェクトを順番に処理するイテレータを返す.
+        """
+        return self.client.iter_streaming()
+
+    def bitrate(self):
+        u"""
+        ストリーミングのビットレート (bps) を返す. 分からない場合は 0 を返す.
+        """
+        info = self.client.info_packet
+        return info and info.bitrate or 0
+
+#-------------------------------------------------------------------------------
+# MMSHTTPPreambleCache
+#-------------------------------------------------------------------------------
+
+class MMSHTTPPreambleCache(object):
+    u"""
+    クライアントのステータス行, レスポンスヘッダー, 情報パケットをつなげた
+    文字列をキャッシュするクラス.
+
+    クライアントのイベントハンドラとして登録すると, info_packet と
+    start_streaming イベントでキャッシュを捨てて次の get() で作り直す.
+    イベントが通知されないワーカープロセスの為に, クライアントの
+    status_line, header, info_packet が別のオブジェクトに変わった場合も
+    作り直す.
+    """
+
+    # 接続を維持する場合に取り除く, 受信したレスポンスのヘッダー
+    hop_headers = ("connection", "keep-alive", "proxy-connection",
+                   "content-length")
+
+    def __init__(self, client):
+        self.client = client
+
+        # (status_line, header, info_packet, 接続を閉じる場合, 維持する場合)
+        # 後ろの2つは (文字列, そのうちレスポンスヘッダーのバイト数)
+        self.cached = (None, None, None, None, None)
+
+    def get(self, keepalive = False):
+        u"""
+        (文字列, そのうちレスポンスヘッダーのバイト数) のタプルを返す.
+        keepalive が真の場合は, Content-Length と Connection: Keep-Alive を
+        つけた, 接続を維持する為のものを返す.
+        """
+        status = self.client.status_line
+        header = self.client.header
+        info   = self.client.info_packet
+
+        cached = self.cached
+        if cached[3] is None or cached[0] is not status or \
+           cached[1] is not header or cached[2] is not info:
+            cached = (status, header, info) + self.render(status, header, info)
+            self.cached = cached
+        return cached[4 if keepalive else 3]
+
+    def render(self, status, header, info):
+        u"""接続を閉じる場合と維持する場合の文字列を作成する."""
+        info = str(info)
+
+        head  = status + "\r\n" + "".join(header.headers) + "\r\n"
+        close = (head + info, len(head))
+
+        lines = [ ]
+        skip  = False
+        for line in header.headers:
+            # 継続行は直前のヘッダーに従う
+            if not line[:1].isspace():
+                name = line.split(":", 1)[0].strip().lower()
+                skip = name in self.hop_headers
+            if not skip: lines.append(line)
+
+        head  = status + "\r\n" + "".join(lines) + \
+                "Content-Length: %d\r\n" % len(info) + \
+                "Connection: Keep-Alive\r\n\r\n"
+        keep  = (head + info, len(head))
+
+        return (close, keep)
+
+    def clear(self):
+        u"""キャッシュを捨てる."""
+        self.cached = (None, None, None, None, None)
+
+    def on_info_packet(self, client):
+        self.clear()
+
+    def on_start_streaming(self, client):
+        self.clear()
+
+#-------------------------------------------------------------------------------
+# MMSHTTPSourceFactory
+#-------------------------------------------------------------------------------
+
+class MMSHTTPSourceFactory(object):
+    u"""
+    MMS-HTTP プロトコルの配信に使われるソースをリクエストに応じて作成するクラス.
+    """
+
+    def __init__(self, source_class, *args, **kwargs):
+        self.source_class  = source_class
+        self.source_args   = args
+        self.source_kwargs = kwargs
+
+    def __call__(self, *args, **kwargs):
+        return self.create(*args, **kwargs)
+
+    def route(self, path):
+        u"""
+        リクエストのパス path に配信するソースを作成するファクトリーを返す.
+        ない場合は None を返す. このクラスは全てのパスに同じソースを配信する.
+        """
+        return self
+
+    def create(self, *args, **kwargs):
+        u"""
+        ソースのインスタンスを作成する.
+        """
+
+        # 引数を合成
+        args = self.source_args + args
+        kw   = self.source_kwargs.copy()
+        kw.update(kwargs)
+
+        return self.source_class(*args, **kw)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPClientSourceFactory
+#-------------------------------------------------------------------------------
+
+class MMSHTTPClientSourceFactory(MMSHTTPSourceFactory):
+    u"""
+    リクエストに応じて MMSHTTPClientSource を作成するクラス.
+    作成する全てのソースで, レスポンスヘッダーと情報パケットの
+    キャッシュを共有する.
+    """
+
+    def __init__(self, client):
+        self.cache = MMSHTTPPreambleCache(client)
+        client.add_event_handler("info_packet", self.cache)
+        client.add_event_handler("start_streaming", self.cache)
+        MMSHTTPSourceFactory.__init__(self, MMSHTTPClientSource, client,
+                                      self.cache)
+
+#-------------------------------------------------------------------------------
+# MMSHTTPChannelSourceFactory
+#-------------------------------------------------------------------------------
+
+class MMSHTTPChannelSourceFactory(MMSHTTPSourceFactory):
+    u"""
+    リクエストのパスの最初の部分をチャンネル名として, チャンネル毎の
+    ファクトリーにソースの作成を振り分けるクラス.
+
+    例えば /news や /news/live へのリクエストは news チャンネルに
+    振り分けられる. どのチャンネルにも当てはまらないパスは default の
+    ファクトリーに振り分ける. default が None の場合はソースがない.
+    """
+
+    def __init__(self, default = None):
+        self.default  = default
+        self.channels = { }
+
+    def add_channel(self, name, factory):
+        u"""チャンネル name のソースを作成するファクトリーを追加する."""
+        self.channels[name] = factory
+
+    def channel_name(path):
+        u"""リクエストのパスからチャンネル名を取り出す."""
+        path = path.split("?", 1)[0].split("#", 1)[0]
+        return path.lstrip("/").split("/", 1)[0]
+    channel_name = staticmethod(channel_name)
+
+    def route(self, path):
+        factory = self.channels.get(self.channel_name(path), self.default)
+        return factory and factory.route(path)
+
+    def create(self, *args, **kwargs):
+        u"""default のファクトリーでソースを作成する. ない場合は None."""
+        if self.default:
+            return self.default.create(*args, **kwargs)
@@ -0,0 +1,326 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+MMS-HTTP Statistics Collector
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+サーバーとクライアントのカウンターを一定の間隔で読み取って,
+サーバーの予約されたパスで返す統計情報を作成する.
+"""
+
+from collections import deque
+import traceback
+import threading
+import logging
+import json
+import time
+
+__all__ = ["MMSHTTPStatsCollector"]
+
+def _text(value):
+    u"""
+    ヘッダーや設定から得た文字列を unicode にする.
+    UTF-8 として読めないバイトは置き換えて, JSON にできるようにする.
+    """
+    if isinstance(value, str): return value.decode("utf_8", "replace")
+    return value
+
+#-------------------------------------------------------------------------------
+# MMSHTTPStatsCollector
+#-------------------------------------------------------------------------------
+
+class MMSHTTPStatsCollector(object):
+    u"""
+    サーバーと受信しているクライアントのカウンターを interval 秒毎に
+    読み取って, 最近の window 回分の差から秒あたりの量を計算するクラス.
+
+    カウンターの値を読むだけで, 配信や受信のスレッドが使うロックは取らない.
+    統計情報は読み取った時に JSON と Prometheus のテキスト形式で作成して
+    おくので, リクエストには作成済みの文字列を返すだけでよい.
+
+    ワーカープロセスを使う場合, 接続の情報は応答したワーカーのものになる.
+    """
+
+    # 統計情報を返すリクエストのパス -> (Content-Type, 形式)
+    paths = {
+        "/_stats":   ("application/json", "json"),
+        "/_metrics": ("text/plain; version=0.0.4", "metrics"),
+    }
+
+    # Prometheus のメトリクス名の接頭辞
+    prefix = "mmshttp_"
+
+    # (メトリクス名, 種類, 説明, 統計情報のキー)
+    server_metrics = (
+        ("listeners", "gauge",
+         "Number of connected listeners.", "listeners"),
+        ("listeners_max", "gauge",
+         "Maximum number of listeners.", "client_max"),
+        ("sent_bytes_total", "counter",
+         "Bytes sent to listeners.", "bytes_sent"),
+        ("sent_packets_total", "counter",
+         "Packets sent to listeners.", "packets_sent"),
+        ("egress_bytes_per_second", "gauge",
+         "Bytes sent to listeners per second.", "egress_bytes_per_sec"),
+        ("reused_connections_total", "counter",
+         "Connections which made more than one request.", "reused_conns"),
+        ("reaped_connections_total", "counter",
+         "Connections closed for send or idle timeout.", "reaped"),
+    )
+
+    channel_metrics = (
+        ("ingest_bits_per_second", "gauge",
+         "Measured bitrate of the received stream.", "ingest_bps"),
+        ("stream_bitrate", "gauge",
+         "Bitrate announced by the stream header.", "bitrate"),
+        ("received_bytes_total", "counter",
+         "Bytes of packets stored in the ring buffer.", "bytes_received"),
+        ("received_packets_total", "counter",
+         "Packets stored in the ring buffer.", "packets_received"),
+        ("received_packets_per_second", "gauge",
+         "Packets stored in the ring buffer per second.", "packets_per_sec"),
+        ("ring_packets", "gauge",
+         "Packets held in the ring buffer.", "ring_packets"),
+        ("ring_slots", "gauge",
+         "Packet slots of the ring buffer.", "ring_slots"),
+        ("ring_bytes", "gauge",
+         "Bytes held in the ring buffer.", "ring_bytes"),
+        ("ring_capacity_bytes", "gauge",
+         "Capacity of the ring buffer in bytes.", "ring_capacity"),
+        ("reconnects_total", "counter",
+         "Reconnections to the upstream server.", "reconnects"),
+        ("stalls_total", "counter",
+         "Reconnections because nothing was received.", "stalls"),
+        ("failovers_total", "counter",
+         "Switches between the primary and backup servers.", "failovers"),
+        ("resyncs_total", "counter",
+         "Listeners skipped to the newest key frame.", "resyncs"),
+        ("overruns_total", "counter",
+         "Packets overwritten before listeners read them.", "overruns"),
+        ("lag_disconnects_total", "counter",
+         "Listeners disconnected for lagging behind.", "lag_disconnects"),
+        ("jitter_packets", "gauge",
+         "Packets held in the jitter buffer.", "jitter_packets"),
+        ("jitter_delay_seconds", "gauge",
+         "Seconds packets are held in the jitter buffer.", "jitter_delay"),
+        ("jitter_underruns_total", "counter",
+         "Packets which arrived after their release time.",
+         "jitter_underruns"),
+    )
+
+    listener_metrics = (
+        ("listener_lag_packets", "gauge",
+         "Packets the listener lags behind the newest one.", "lag_packets"),
+        ("listener_lag_seconds", "gauge",
+         "Seconds the listener lags behind the newest packet.", "lag_secs"),
+        ("listener_sent_bytes_total", "counter",
+         "Bytes sent to the listener.", "bytes_sent"),
+    )
+
+    def __init__(self, server, interval = 1.0, window = 10):
+        self.server   = server
+        self.interval = interval
+        self.clients  = [ ]     # (チャンネル名, クライアント)
+        self.samples  = deque(maxlen = window + 1)
+        self.reports  = { }     # 形式 -> 統計情報の文字列
+        self.thread   = None
+        self.stopped  = threading.Event()
+
+    def __str__(self):
+        return "Stats[%s:%d]" % self.server.server_address
+
+    def add_client(self, name, client):
+        u"""
+        チャンネル name のクライアント client の受信を統計情報に加える.
+        チャンネルがない場合は name を空文字列にする.
+        """
+        self.clients.append((name, client))
+
+    def handles(self, path):
+        u"""リクエストのパスが統計情報のパスかどうかを返す."""
+        return path.split("?", 1)[0] in self.paths
+
+    def report(self, path):
+        u"""
+        リクエストのパスに対する (Content-Type, 統計情報の文字列) を返す.
+        """
+        content_type, form = self.paths[path.split("?", 1)[0]]
+        reports = self.reports or self.collect()
+        return (content_type, reports[form])
+
+    def start(self):
+        u"""
+        別スレッドでカウンターを読み取り始める.
+        fork したプロセスにはスレッドが引き継がれないので,
+        fork した後のプロセスで呼ぶこと.
+        """
+        if self.thread: return
+        self.stopped.clear()
+        self.collect()
+
+        t = threading.Thread(target = self.collector_thread_proc)
+        t.setName("%s Collector" % self)
+        t.setDaemon(1)
+        t.start()
+        self.thread = t
+
+    def close(self):
+        u"""カウンターの読み取りを終了する."""
+        self.stopped.set()
+        self.thread = None
+
+    def collector_thread_proc(self):
+        u"""スレッド用プロシージャ"""
+        while not self.stopped.wait(self.interval):
+            try:
+                self.collect()
+            except:
+                logging.error("%s failed collecting:\n%s\n%s\n%s" %
+                    (self, "-"*40, traceback.format_exc().strip(), "-"*40))
+
+    def collect(self):
+        u"""
+        カウンターを読み取って統計情報を作り直し,
+        形式をキーにした統計情報の文字列の辞書を返す.
+        """
+        sample = self.sample()
+        self.samples.append(sample)
+        stats = self.build(self.samples[0], sample)
+
+        reports = {
+            "json":    json.dumps(stats, sort_keys = True),
+            "metrics": self.render_metrics(stats),
+        }
+        self.reports = reports
+        return reports
+
+    def sample(self):
+        u"""
+        秒あたりの量を計算する為のカウンターを
+        (時刻, 送信バイト数, 送信パケット数, {チャンネル名:
+        (受信バイト数, 受信パケット数)}) のタプルで返す.
+        """
+        bytes_sent, packets_sent = self.server.connections.total_sent()
+        received = { }
+        for name, client in self.clients:
+            received[name] = (client.bytes_received, client.seq + 1)
+        return (time.time(), bytes_sent, packets_sent, received)
+
+    def build(self, first, last):
+        u"""
+        最初と最後の標本から, 統計情報を表す辞書を作成する.
+        """
+        elapsed = last[0] - first[0]
+        def rate(key):
+            if elapsed <= 0: return 0.0
+            return (last[key] - first[key]) / elapsed
+
+        server = self.server
+        stats  = {
+            "time":                 last[0],
+            "listeners":            server.total_client_num(),
+            "client_max":           server.client_max,
+            "bytes_sent":           last[1],
+            "packets_sent":         last[2],
+            "egress_bytes_per_sec": rate(1),
+            "reused_conns":         server.reused_conns,
+            "reaped":               server.reaped,
+            "channels":             [ ],
+            "connections":          [ ],
+        }
+
+        for name, client in self.clients:
+            stats["channels"].append(
+                self.build_channel(name, client, first[3].get(name),
+                                   last[3][name], elapsed))
+
+        for c in server.connections:
+            stats["connections"].append({
+                "id":           c.id,
+                "address":      _text("%s:%d" % c.address),
+                "user_agent":   _text(c.user_agent),
+                "elapsed":      c.elapsed(),
+                "idle":         c.idle(),
+                "requests":     c.requests,
+                "bytes_sent":   c.bytes_sent,
+                "packets_sent": c.packets_sent,
+                "lag_packets":  c.lag_packets,
+                "lag_secs":     c.lag_secs,
+            })
+
+        return stats
+
+    def build_channel(self, name, client, first, last, elapsed):
+        u"""
+        チャンネル1つの統計情報を表す辞書を作成する.
+        first と last は標本の (受信バイト数, 受信パケット数) で,
+        first がない場合は秒あたりの量を 0 にする.
+        """
+        bytes_rate = packets_rate = 0.0
+        if first and elapsed > 0:
+            bytes_rate   = (last[0] - first[0]) / elapsed
+            packets_rate = (last[1] - first[1]) / elapsed
+
+        info   = client.info_packet
+        buffer = client.buffer
+        return {
+            "name":             _text(name),
+            "url":              _text(client.url),
+            "started":          bool(client.started),
+            "terminated":       bool(client.terminated),
+            "bitrate":          info and info.bitrate or 0,
+            "ingest_bps":       bytes_rate * 8,
+            "bytes_received":   last[0],
+            "packets_received": last[1],
+            "packets_per_sec":  packets_rate,
+            "ring_packets":     len(buffer),
+            "ring_slots":       buffer.slots,
+            "ring_bytes":       buffer.size(buffer.first, buffer.seq),
+            "ring_capacity":    buffer.capacity,
+            "reconnects":       client.reconnects,
+            "stalls":           client.stalls,
+            "failovers":        getattr(client, "failovers", 0),
+            "resyncs":          client.resyncs,
+            "overruns":         client.overruns,
+            "lag_disconnects":  client.lag_disconnects,
+            "jitter_packets":   client.jitter_packets,
+            "jitter_delay":     client.jitter_delay / 1000.0,
+            "jitter_underruns": client.jitter_underruns,
+        }
+
+    def render_metrics(self, stats):
+        u"""統計情報を Prometheus のテキスト形式にする."""
+        lines = [ ]
+        def render(metrics, items, labels):
+            for name, kind, help, key in metrics:
+                name = self.prefix + name
+                lines.append("# HELP %s %s" % (name, help))
+                lines.append("# TYPE %s %s" % (name, kind))
+                for item in items:
+                    lines.append("%s%s %s" % (name, labels(item),
+                                              self.render_value(item[key])))
+
+        render(self.server_metrics, [stats], lambda item: "")
+        render(self.channel_metrics, stats["channels"],
+               lambda item: self.render_labels([("channel", item["name"])]))
+        render(self.listener_metrics, stats["connections"],
+               lambda item: self.render_labels([("id", item["id"]),
+                                                ("address", item["address"])]))
+        return "\n".join(lines) + "\n"
+
+    def render_labels(self, labels):
+        u"""(ラベル名, 値) のリストを {name="value",...} の形式にする."""
+        values = [ ]
+        for name, value in labels:
+            if isinstance(value, unicode): value = value.encode("utf_8")
+            value = str(value).replace("\\", "\\\\").replace("\"", "\\\"") \
+                              .replace("\n", "\\n")
+            values.append("%s=\"%s\"" % (name, value))
+        return "{" + ",".join(values) + "}"
+
+    def render_value(self, value):
+        u"""メトリクスの値を文字列にする."""
+        if isinstance(value, float):
+            return repr(value)
+        return str(int(value))
@@ -1,128 +1,421 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-Reflec Application Class
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-import os
-import os.path
-import time
-import logging
-
-from appbase.app import PluginApplication
-from const import *
-from option import ReflecOption
-from plugin import ReflecPluginLoader
-from mmshttp.client import MMSHTTPBufferedClient
-from mmshttp.source import MMSHTTPClientSourceFactory
-from mmshttp.server import MMSHTTPServer
-
-__all__ = ["ReflecApplication"]
-
-#-------------------------------------------------------------------------------
-# ReflecApplication
-#-------------------------------------------------------------------------------
-
-class ReflecApplication(PluginApplication):
-    u"""
-    Reflec2 のアプリケーションを表すクラス.
-    """
-
-    option_class = ReflecOption
-    loader_class = ReflecPluginLoader
-    client_class = MMSHTTPBufferedClient
-    source_class = MMSHTTPClientSourceFactory
-    server_class = MMSHTTPServer
-
-    def __init__(self):
-        PluginApplication.__init__(self, CONFIG_FILE, PLUGIN_DIR)
-        self.client = None
-        self.server = None
-
-    def terminate(self):
-        u"""アプリケーションを終了する."""
-        PluginApplication.terminate(self)
-        self.client.terminate()
-
-    def setup(self):
-        u"""実行するためのオブジェクトなどを全て初期化."""
-        self.setup_client()
-        self.setup_server()
-        self.setup_plugin()
-        self.setup_prompt()
-        PluginApplication.setup(self)
-
-    def setup_client(self):
-        u"""クライアントを初期化."""
-        self.client = self.client_class(**self.option.client.dict())
-
-    def setup_server(self):
-        u"""サーバーを初期化."""
-        source = self.source_class(self.client)
-        self.server = self.server_class(source, **self.option.server.dict())
-
-    def setup_plugin(self):
-        u"""プラグインを初期化."""
-        logging.info("Loading plug-ins.")
-        self.plugin.add_event_holder(self.client, "client")
-        self.plugin.add_event_holder(self.server, "server")
-
-    def setup_prompt(self):
-        u"""コマンドプロンプトを初期化."""
-        self.prompt.add_command("L", "LIST", "List up server connections.",
-                                self.list_server)
-
-    def run(self):
-        u"""実行を開始する."""
-        self.client.start()
-        self.server.serve_forever()
-        PluginApplication.run(self)
-
-    def wait_for_termination(self):
-        u"""
-        アプリケーションが終了されるか,
-        クライアントの受信が終了するまでブロッキングして待機.
-        """
-        while not self.terminated and not self.client.terminated:
-            time.sleep(1)
-            self.notify_event("tick")
-
-    def finish(self):
-        u"""実行の後始末を行う."""
-        self.server.server_close()
-        PluginApplication.finish(self)
-
-    def replace_macro(self, text):
-        u"""マクロが含まれる文字列を解決する."""
-        b = self.option.server.bindings.split(':', 1)
-        if len(b) == 1:
-            if b[0]: b = ('', b[0])
-            else:    b = ('', 8080)
-
-        text = text.replace("%0", "reflec")
-        return text.replace("%a", b[0]).replace("%p", b[1])
-
-    def abspath(self, path):
-        u"""
-        ファイルパスを絶対パスにする.
-        もし相対パスの場合は APP_DIR をベースにして絶対パスにする.
-        """
-        if not os.path.isabs(path):
-            path = os.path.join(APP_DIR, path)
-        return os.path.abspath(path)
-
-    def list_server(self):
-        u"""
-        サーバーに接続しているクライアントをリストアップする.
-        """
-        s = [ ]
-        s.append("="*40)
-        s.append("Server Connections")
-        s.append("")
-        for addr in self.server.connections:
-            s.append(" - %s" % addr)
-        s.append("")
-        s.append("="*40)
-        print "\n".join(s)
+﻿# -*- coding: utf_8 -*-
+u"""
+Reflec Application Class
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+import os
+import os.path
+import time
+import socket
+import signal
+import logging
+import multiprocessing
+
+from appbase.app import PluginApplication
+from const import *
+from option import ReflecOption
+from plugin import ReflecPluginLoader
+from mmshttp.client import MMSHTTPBufferedClient
+from mmshttp.shared import MMSHTTPSharedClient
+from mmshttp.failover import MMSHTTPFailoverClient
+from mmshttp.infocache import MMSHTTPInfoCache
+from mmshttp.source import MMSHTTPClientSourceFactory
+from mmshttp.source import MMSHTTPChannelSourceFactory
+from mmshttp.server import MMSHTTPServer
+from mmshttp.asyncserver import MMSHTTPAsyncServer
+from mmshttp.admission import *
+from utils.affinity import parse_cpus, set_affinity
+
+__all__ = ["ReflecApplication"]
+
+#-------------------------------------------------------------------------------
+# ReflecApplication
+#-------------------------------------------------------------------------------
+
+class ReflecApplication(PluginApplication):
+    u"""
+    Reflec2 のアプリケーションを表すクラス.
+    """
+
+    option_class = ReflecOption
+    loader_class = ReflecPluginLoader
+    client_class = MMSHTTPBufferedClient
+    shared_client_class = MMSHTTPSharedClient
+    failover_client_class = MMSHTTPFailoverClient
+    info_cache_class = MMSHTTPInfoCache
+    source_class = MMSHTTPClientSourceFactory
+    channel_source_class = MMSHTTPChannelSourceFactory
+    server_class = MMSHTTPServer
+
+    # server.engine オプションで選択できるサーバーのクラス
+    # オプションが空の場合は server_class を利用する
+    server_engines = {
+        "thread": MMSHTTPServer,
+        "async":  MMSHTTPAsyncServer,
+    }
+
+    # サーバーのクラスには渡さない, アプリケーションで扱う server のオプション
+    server_app_options = ("engine", "workers", "cpus", "maxrate", "maxdelay",
+                          "connrate", "connburst", "iprate", "ipburst",
+                          "ipmax")
+
+    def __init__(self):
+        PluginApplication.__init__(self, CONFIG_FILE, PLUGIN_DIR)
+        self.client = None
+        self.server = None
+        self.channels = { }         # チャンネル名 -> クライアント
+        self.channel_bindings = { } # チャンネル名 -> 待ち受けるアドレス
+        self.channel_servers = { }  # チャンネル名 -> 配信するサーバー
+        self.servers = [ ]
+        self.worker_num = 0
+        self.workers = [ ]
+
+    def terminate(self):
+        u"""アプリケーションを終了する."""
+        PluginApplication.terminate(self)
+        for client in self.clients():
+            client.terminate()
+
+    def clients(self):
+        u"""メインのクライアントと, 全てのチャンネルのクライアントを返す."""
+        return [self.client] + [c for n, c in sorted(self.channels.items())]
+
+    def channel_name(self, client):
+        u"""
+        クライアント client のチャンネル名を返す.
+        メインのクライアントの場合は空文字列を返す.
+        """
+        for name, c in self.channels.items():
+            if c is client: return name
+        return ""
+
+    def channel_client(self, name):
+        u"""チャンネル name のクライアントを返す. 空文字列はメイン."""
+        return self.channels.get(name, self.client)
+
+    def channel_server(self, name):
+        u"""チャンネル name を配信するサーバーを返す. 空文字列はメイン."""
+        return self.channel_servers.get(name, self.server)
+
+    def channel_path(self, name):
+        u"""
+        チャンネル name を配信するサーバーでのパスを返す.
+        メインと, 待ち受けるアドレスが指定されたチャンネルは空文字列になる.
+        """
+        if not name or self.channel_bindings.get(name): return ""
+        return "/" + name
+
+    def terminated_all(self):
+        u"""全てのクライアントの受信が終了しているかどうかを返す."""
+        for client in self.clients():
+            if not client.terminated: return False
+        return True
+
+    def setup(self):
+        u"""実行するためのオブジェクトなどを全て初期化."""
+        self.setup_workers()
+        self.setup_client()
+        self.setup_server()
+        self.setup_plugin()
+        self.setup_prompt()
+        PluginApplication.setup(self)
+        self.check_worker_plugins()
+
+    def setup_workers(self):
+        u"""
+        配信するワーカープロセスの数を決める.
+        fork か SO_REUSEPORT が使えない環境では, ワーカープロセスを使わずに
+        このプロセスで配信する.
+        """
+        num = self.option.server.workers or 0
+        if num > 0 and not (hasattr(os, "fork") and
+                            hasattr(socket, "SO_REUSEPORT")):
+            logging.warning("Worker processes are not supported "
+                            "on this platform.")
+            num = 0
+        self.worker_num = num
+
+    def setup_client(self):
+        u"""
+        クライアントを初期化.
+        """
+        self.client = self.create_client(self.option.client.dict())
+
+        for name, spec in self.option.list_channels():
+            try:
+                options, bindings = self.option.parse_channel(spec)
+            except ValueError, e:
+                logging.warning("Channel %r is ignored: %s" % (name, e))
+                continue
+            self.channels[name] = self.create_client(options)
+            self.channel_bindings[name] = bindings
+
+    def create_client(self, options):
+        u"""
+        オプションの辞書 options からクライアントを作成する.
+        ワーカープロセスを使う場合は共有メモリに受信するクライアントにする.
+        backup が指定されている場合は, バックアップのサーバーにも接続して
+        切り替えられるクライアントにする.
+        infocache が指定されている場合は, そのディレクトリに保存してある
+        レスポンスと動画の情報を読み込んで, 受信したものを保存する.
+        """
+        options   = options.copy()
+        backup    = options.pop("backup", "").split()
+        infocache = options.pop("infocache", "")
+
+        if self.worker_num:
+            if backup:
+                logging.warning("Backup servers are not supported "
+                                "with worker processes.")
+            client = self.shared_client_class(self.worker_num, **options)
+        elif backup:
+            client = self.failover_client_class(backup, **options)
+        else:
+            client = self.client_class(**options)
+
+        if infocache:
+            directory = self.abspath(self.replace_macro(infocache))
+            self.info_cache_class(directory).attach(client)
+        return client
+
+    def setup_server(self):
+        u"""
+        サーバーを初期化.
+        ワーカープロセスを使う場合は, 各ワーカーが同じポートにバインドできる
+        ようにして, 接続数を全てのワーカーで共有する.
+
+        チャンネルがある場合は, 待ち受けるアドレスが指定されていない
+        チャンネルを /チャンネル名 のパスでメインのサーバーから配信する.
+        指定されているチャンネルはそのアドレスで別のサーバーから配信する.
+        """
+        options = self.option.server.dict().copy()
+        engine  = options.get("engine", "")
+        for name in self.server_app_options:
+            options.pop(name, None)
+        if engine and engine not in self.server_engines:
+            logging.warning("Unknown server engine %r is given." % engine)
+
+        if self.worker_num: options["reuseport"] = True
+
+        server_class = self.server_engines.get(engine, self.server_class)
+        source = self.source_class(self.client)
+        if self.channels:
+            source = self.channel_source_class(source)
+
+        self.server = server_class(source, **options)
+        self.servers = [self.server]
+        if self.server.stats: self.server.stats.add_client("", self.client)
+
+        for name, client in sorted(self.channels.items()):
+            server = self.server
+            bindings = self.channel_bindings[name]
+            if bindings:
+                opts = options.copy()
+                opts["bindings"] = bindings
+                server = server_class(self.source_class(client), **opts)
+                self.servers.append(server)
+            else:
+                source.add_channel(name, self.source_class(client))
+            self.channel_servers[name] = server
+            if server.stats: server.stats.add_client(name, client)
+
+        # 送信量の上限は全てのサーバーの合計に適用する
+        maxrate  = self.option.server.maxrate
+        policies = [ ]
+        shared   = maxrate and [BandwidthPolicy(maxrate)] or [ ]
+        for server in self.servers:
+            self.setup_admission(server, shared)
+            policies += [p for p in server.policies if p not in policies]
+
+        if self.worker_num:
+            for server in self.servers:
+                server.share_client_num(multiprocessing.Value("i", 0),
+                                        self.worker_num)
+            for policy in policies:
+                policy.share()
+
+    def setup_admission(self, server, shared = ()):
+        u"""
+        オプションに従って, 新しい接続を受け付けるかどうかを判断する
+        ポリシーをサーバー server に追加する. 0 のオプションは無効になる.
+        shared には全てのサーバーで共有するポリシーを指定する.
+        """
+        opt = self.option.server
+        for policy in shared:
+            server.add_policy(policy)
+        if opt.maxdelay:
+            server.add_policy(DelayPolicy(opt.maxdelay))
+        if opt.connrate:
+            server.add_policy(RatePolicy(opt.connrate, opt.connburst))
+        if opt.iprate:
+            server.add_policy(AddressRatePolicy(opt.iprate, opt.ipburst))
+        if opt.ipmax:
+            server.add_policy(AddressMaxPolicy(opt.ipmax))
+
+    def setup_plugin(self):
+        u"""
+        プラグインを初期化.
+        チャンネルのクライアントとサーバーも client と server として登録する.
+        プラグインはイベントを通知したものから channel_name() などで
+        チャンネルを調べられる.
+        """
+        logging.info("Loading plug-ins.")
+        for client in self.clients():
+            self.plugin.add_event_holder(client, "client")
+        for server in self.servers:
+            self.plugin.add_event_holder(server, "server")
+
+    def check_worker_plugins(self):
+        u"""
+        ワーカープロセスを使う場合は, このプロセスでは配信しないので
+        サーバーのイベントは client_num しか通知されない.
+        それ以外のサーバーのイベントを処理するプラグインについて警告する.
+        """
+        if not self.worker_num: return
+        for name, plugin in sorted(self.plugin.plugins.items()):
+            events = [m[len("server_"):] for m in dir(plugin)
+                      if m.startswith("server_") and m != "server_client_num"
+                      and callable(getattr(plugin, m))]
+            if events:
+                logging.warning("Plug-in %s won't receive server events (%s) "
+                                "with worker processes." %
+                                (name, ", ".join(events)))
+
+    def setup_prompt(self):
+        u"""コマンドプロンプトを初期化."""
+        self.prompt.add_command("L", "LIST", "List up server connections.",
+                                self.list_server)
+
+    def run(self):
+        u"""実行を開始する."""
+        if self.worker_num:
+            self.start_workers()
+        else:
+            for server in self.servers:
+                server.serve_forever()
+        for client in self.clients():
+            client.start()
+        PluginApplication.run(self)
+
+    def start_workers(self):
+        u"""
+        ワーカープロセスを fork して配信を任せる.
+        スレッドを開始する前に fork しなければならない.
+        """
+        logging.info("Starting %d worker processes." % self.worker_num)
+        for i in xrange(self.worker_num):
+            p = multiprocessing.Process(target = self.worker_proc, args = (i,))
+            p.daemon = True
+            p.start()
+            self.workers.append(p)
+
+        # 待ち受けはワーカープロセスのソケットで行う
+        for server in self.servers:
+            server.socket.close()
+
+    def worker_proc(self, index):
+        u"""
+        ワーカープロセス用プロシージャ.
+        同じポートに別のソケットでバインドし直して, 共有メモリの
+        リングバッファから配信する. 受信が終了するか, 親プロセスが
+        終了するまで配信を続ける.
+        """
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        cpus = parse_cpus(self.option.server.cpus or "")
+        if cpus:
+            cpu = cpus[index % len(cpus)]
+            if not set_affinity([cpu]):
+                logging.warning("Worker %d can't be pinned to CPU %d." %
+                                (index, cpu))
+
+        for client in self.clients():
+            client.attach_worker(index)
+        for server in self.servers:
+            server.rebind()
+            server.serve_forever()
+        logging.info("Worker %d (pid %d) started serving." %
+                     (index, os.getpid()))
+
+        parent = os.getppid()
+        while not self.terminated_all() and os.getppid() == parent:
+            time.sleep(1)
+
+        for server in self.servers:
+            server.server_close()
+
+    def wait_for_termination(self):
+        u"""
+        アプリケーションが終了されるか,
+        全てのクライアントの受信が終了するまでブロッキングして待機.
+        """
+        while not self.terminated and not self.terminated_all():
+            time.sleep(1)
+            if self.worker_num:
+                for server in self.servers:
+                    server.sync_shared_num()
+            self.notify_event("tick")
+
+    def finish(self):
+        u"""実行の後始末を行う."""
+        for server in self.servers:
+            server.server_close()
+        self.join_workers()
+        PluginApplication.finish(self)
+
+    def join_workers(self):
+        u"""ワーカープロセスが全て終了するまで待機する."""
+        for p in self.workers:
+            p.join(self.server.timeout)
+            if p.is_alive():
+                logging.warning("Worker (pid %d) is killed." % p.pid)
+                p.terminate()
+
+    def replace_macro(self, text):
+        u"""マクロが含まれる文字列を解決する."""
+        b = self.option.server.bindings.split(':', 1)
+        if len(b) == 1:
+            if b[0]: b = ('', b[0])
+            else:    b = ('', 8080)
+
+        text = text.replace("%0", "reflec")
+        return text.replace("%a", b[0]).replace("%p", b[1])
+
+    def abspath(self, path):
+        u"""
+        ファイルパスを絶対パスにする.
+        もし相対パスの場合は APP_DIR をベースにして絶対パスにする.
+        """
+        if not os.path.isabs(path):
+            path = os.path.join(APP_DIR, path)
+        return os.path.abspath(path)
+
+    def list_server(self):
+        u"""
+        サーバーに接続しているクライアントをリストアップする.
+        """
+        s = [ ]
+        s.append("="*40)
+        s.append("Server Connections")
+        s.append("")
+        for server in self.servers:
+            for c in server.connections:
+                s.append(" - #%d %s" % (c.id, server.connection_name(c)))
+                s.append("     %s" % (c.user_agent or "(unknown agent)"))
+                s.append("     %d sec, %d bytes, %d packets, lag %d packets, "
+                         "%d requests" %
+                         (c.elapsed(), c.bytes_sent, c.packets_sent,
+                          c.lag_packets, c.requests))
+        if self.worker_num:
+            s.append(" - %d clients in %d worker processes" %
+                     (sum([x.total_client_num() for x in self.servers]),
+                      self.worker_num))
+        s.append("")
+        s.append("Reused: %d connections, %d requests" %
+                 (sum([x.reused_conns for x in self.servers]),
+                  sum([x.reused_reqs for x in self.servers])))
+        s.append("="*40)
+        print "\n".join(s)
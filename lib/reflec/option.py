@@ -1,113 +1,204 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-Reflec Option Class
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-import re
-import sys
-
-from const import *
-from appbase.option import BaseOption
-
-__all__ = ["ReflecOption"]
-
-#-------------------------------------------------------------------------------
-
-# バージョン
-version = APP_VERSION_TEXT
-
-# 使い方
-usage = "Usage: %prog [options] ( host port [path] | host:port | url )"
-
-# 設定のデフォルト値
-config_defaults = {
-    "logging": {
-        "filename":   "%0_%a%p.log",
-    },
-    "server": {
-        "bindings":   ":8080",
-        "client_max": 100,
-        "timeout":    180,
-        "countdown":  10,
-    },
-    "client": {
-        "host":       "localhost",
-        "port":       8888,
-        "path":       "/",
-        "bufsize":    16,
-        "timeout":    30,
-        "retry":      5,
-        "retrysec":   10,
-    }
-}
-
-# 引数パーサー用
-parser_options = {
-    ("-p", "--bindings"): { "metavar": "ADDR:PORT",
-        "dest": "server-bindings",
-        "help": "to which address and port the server binds. "
-                "if only a number given, treated as a port number." },
-    ("-m", "--client-max"): { "metavar": "MAX",
-        "dest": "server-client_max", "type": "int",
-        "help": "how many clients can connect to the server "
-                "at the same time." },
-    ("-b", "--buffer-size"): { "metavar": "SIZE",
-        "dest": "client-bufsize", "type": "int",
-        "help": "the size of buffer for streaming. "
-                "big number gets more stable but uses more memory." },
-    ("-t", "--timeout"): { "metavar": "SECS",
-        "dest": "client-timeout", "type": "int",
-        "help": "timeout seconds of the client's receiving." },
-    ("-r", "--retry"): { "metavar": "NUM",
-        "dest": "client-retry", "type": "int",
-        "help": "the number of retries when the client failed." },
-}
-
-#-------------------------------------------------------------------------------
-# ReflecOption
-#-------------------------------------------------------------------------------
-
-class ReflecOption(BaseOption):
-    u"""
-    Reflec のオプションを表すクラス.
-
-    まず INI ファイルからデフォルト設定を読み込み, 次に実行時のパラメータとして
-    渡された設定で上書きする.
-    """
-
-    version = version
-    usage = usage
-
-    def __init__(self, config_file = None):
-        self.update_defaults()
-        BaseOption.__init__(self, config_file)
-
-    def update_defaults(self):
-        for section, value in config_defaults.items():
-            if section not in self.defaults:
-                self.defaults[section] = value
-            else:
-                self.defaults[section].update(value)
-        for key, value in parser_options.items():
-            if key not in self.parser_options:
-                self.parser_options[key] = value
-            else:
-                self.parser_options[key].update(value)
-
-    def parse_argv(self, args):
-        try:
-            if len(args) >= 1:
-                r = re.match(r"^(?:[^:]+://)?([^/:]+)(?::(\d+))?(.*)", args[0])
-                if r:
-                    self.set('client', 'host', r.group(1))
-                    if r.group(2): self.set('client', 'port', int(r.group(2)))
-                    if r.group(3): self.set('client', 'path', r.group(3))
-            if len(args) >= 2:
-                self.set('client', 'port', int(args[1]))
-            if len(args) >= 3:
-                self.set('client', 'path', args[2])
-        except ValueError, e:
-            sys.exit("Given client port is not a number.")
+﻿# -*- coding: utf_8 -*-
+u"""
+Reflec Option Class
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+import re
+import sys
+
+from const import *
+from appbase.option import BaseOption
+
+__all__ = ["ReflecOption"]
+
+#-------------------------------------------------------------------------------
+
+# バージョン
+version = APP_VERSION_TEXT
+
+# 使い方
+usage = "Usage: %prog [options] ( host port [path] | host:port | url )"
+
+# 設定のデフォルト値
+config_defaults = {
+    "logging": {
+        "filename":   "%0_%a%p.log",
+    },
+    "server": {
+        "bindings":   ":8080",
+        "client_max": 100,
+        "timeout":    180,
+        "countdown":  10,
+        "engine":     "",
+        "sendbytes":  65536,
+        "senddelay":  0.0,
+        "workers":    0,
+        "cpus":       "",
+        "resolve":    True,
+        "resolvettl": 3600,
+        "maxrate":    0,
+        "maxdelay":   0.0,
+        "connrate":   0.0,
+        "connburst":  0,
+        "iprate":     0.0,
+        "ipburst":    0,
+        "ipmax":      0,
+        "admitwait":  0.0,
+        "fastpath":   True,
+        "keepalive":  15,
+        "sendtimeout": 60,
+        "idletimeout": 120,
+        "pool":       True,
+        "stacksize":  0,
+        "stats":      False,
+    },
+    "client": {
+        "host":       "localhost",
+        "port":       8888,
+        "path":       "/",
+        "bufsize":    16,
+        "bufbytes":   0,
+        "bufsecs":    0.0,
+        "faststart":  0,
+        "laglimit":   0,
+        "lagsecs":    0.0,
+        "lagpolicy":  "resync",
+        "jittersecs": 0.0,
+        "timeout":    30,
+        "retry":      5,
+        "retrysec":   1,
+        "retrymax":   60,
+        "retrytime":  50,
+        "stalltimeout": 10,
+        "backup":     "",
+        "infocache":  "",
+    }
+}
+
+# 引数パーサー用
+parser_options = {
+    ("-p", "--bindings"): { "metavar": "ADDR:PORT",
+        "dest": "server-bindings",
+        "help": "to which address and port the server binds. "
+                "if only a number given, treated as a port number." },
+    ("-m", "--client-max"): { "metavar": "MAX",
+        "dest": "server-client_max", "type": "int",
+        "help": "how many clients can connect to the server "
+                "at the same time." },
+    ("-e", "--engine"): { "metavar": "ENGINE",
+        "dest": "server-engine",
+        "help": "the engine of the server. 'thread' serves each client "
+                "in its own thread, 'async' serves all clients in one "
+                "event loop." },
+    ("-w", "--workers"): { "metavar": "NUM",
+        "dest": "server-workers", "type": "int",
+        "help": "serve clients from NUM worker processes which share "
+                "the port and the buffer. 0 serves in this process." },
+    ("-n", "--no-resolve"): { "action": "store_false",
+        "dest": "server-resolve",
+        "help": "don't resolve host names of clients." },
+    ("-b", "--buffer-size"): { "metavar": "SIZE",
+        "dest": "client-bufsize", "type": "int",
+        "help": "the size of buffer for streaming. "
+                "big number gets more stable but uses more memory." },
+    ("-s", "--buffer-secs"): { "metavar": "SECS",
+        "dest": "client-bufsecs", "type": "float",
+        "help": "how many seconds of streaming the buffer keeps. "
+                "the size is calculated from the bitrate of the stream." },
+    ("-f", "--fast-start"): { "metavar": "BYTES",
+        "dest": "client-faststart", "type": "int",
+        "help": "send buffered streaming from the last key frame to "
+                "new clients at once, if it is not larger than BYTES." },
+    ("--lag-policy",): { "metavar": "POLICY",
+        "dest": "client-lagpolicy",
+        "help": "what to do with clients lagging behind the stream. "
+                "'resync' skips to the newest key frame, 'disconnect' "
+                "closes the connection." },
+    ("-t", "--timeout"): { "metavar": "SECS",
+        "dest": "client-timeout", "type": "int",
+        "help": "timeout seconds of the client's receiving." },
+    ("-r", "--retry"): { "metavar": "NUM",
+        "dest": "client-retry", "type": "int",
+        "help": "the number of retries when the client failed." },
+}
+
+#-------------------------------------------------------------------------------
+# ReflecOption
+#-------------------------------------------------------------------------------
+
+class ReflecOption(BaseOption):
+    u"""
+    Reflec のオプションを表すクラス.
+
+    まず INI ファイルからデフォルト設定を読み込み, 次に実行時のパラメータとして
+    渡された設定で上書きする.
+    """
+
+    version = version
+    usage = usage
+
+    def __init__(self, config_file = None):
+        self.update_defaults()
+        BaseOption.__init__(self, config_file)
+
+    def update_defaults(self):
+        for section, value in config_defaults.items():
+            if section not in self.defaults:
+                self.defaults[section] = value
+            else:
+                self.defaults[section].update(value)
+        for key, value in parser_options.items():
+            if key not in self.parser_options:
+                self.parser_options[key] = value
+            else:
+                self.parser_options[key].update(value)
+
+    def list_channels(self):
+        u"""
+        [channels] セクションに書かれた (チャンネル名, 設定) のリストを
+        チャンネル名の順に返す.
+        """
+        channels = self.get("channels")
+        if channels is None: return [ ]
+        return sorted(channels.dict().items())
+
+    def parse_channel(self, spec):
+        u"""
+        "[mms://]ホスト[:ポート][/パス] [待ち受けるアドレス:ポート]" 形式の
+        チャンネルの設定を解析して, (クライアントのオプションの辞書,
+        待ち受けるアドレス) のタプルを返す. 待ち受けるアドレスがない場合は
+        空文字列になる. 解析できない場合は ValueError 例外を発生させる.
+        """
+        words = spec.split()
+        r = words and re.match(r"^(?:[^:]+://)?([^/:]+)(?::(\d+))?(.*)",
+                               words[0])
+        if not r or len(words) > 2:
+            raise ValueError("invalid channel: %r" % spec)
+
+        options = self.client.dict().copy()
+        options["backup"] = ""
+        options["host"] = r.group(1)
+        if r.group(2): options["port"] = int(r.group(2))
+        options["path"] = r.group(3) or "/"
+
+        bindings = ""
+        if len(words) == 2: bindings = words[1]
+        return (options, bindings)
+
+    def parse_argv(self, args):
+        try:
+            if len(args) >= 1:
+                r = re.match(r"^(?:[^:]+://)?([^/:]+)(?::(\d+))?(.*)", args[0])
+                if r:
+                    self.set('client', 'host', r.group(1))
+                    if r.group(2): self.set('client', 'port', int(r.group(2)))
+                    if r.group(3): self.set('client', 'path', r.group(3))
+            if len(args) >= 2:
+                self.set('client', 'port', int(args[1]))
+            if len(args) >= 3:
+                self.set('client', 'path', args[2])
+        except ValueError, e:
+            sys.exit("Given client port is not a number.")
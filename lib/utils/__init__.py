@@ -1,9 +1,9 @@
-﻿# -*- coding: utf_8 -*-
-u"""
-Reflec Utility Package
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-"""
-
-__all__ = ["event", "plugin", "com"]
+﻿# -*- coding: utf_8 -*-
+u"""
+Reflec Utility Package
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+"""
+
+__all__ = ["event", "plugin", "com", "affinity", "resolver", "pool"]
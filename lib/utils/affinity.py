@@ -0,0 +1,57 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+CPU Affinity Utility Functions
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+プロセスを実行する CPU を固定する為の関数を提供する.
+Python 2 には os.sched_setaffinity がないので, Linux の場合は ctypes で
+libc の sched_setaffinity を直接呼び出す. それ以外の環境では何もしない.
+"""
+
+import ctypes
+import ctypes.util
+import sys
+
+__all__ = ["parse_cpus", "set_affinity"]
+
+# cpu_set_t の大きさ (CPU_SETSIZE = 1024 ビット)
+_cpu_setsize = 1024
+_ulong_bits  = ctypes.sizeof(ctypes.c_ulong) * 8
+
+def parse_cpus(text):
+    u"""
+    "0,2,4-7" のような CPU 番号のリストを表す文字列を解析して,
+    CPU 番号のリストを返す.
+    """
+    cpus = [ ]
+    for item in str(text).split(","):
+        item = item.strip()
+        if not item: continue
+        if "-" in item:
+            first, last = item.split("-", 1)
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(item))
+    return cpus
+
+def set_affinity(cpus, pid = 0):
+    u"""
+    プロセス pid (0 の場合は現在のプロセス) を実行する CPU を
+    cpus のリストに固定する. 固定できた場合は真を返す.
+    """
+    if not sys.platform.startswith("linux"): return False
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno = True)
+        setaffinity = libc.sched_setaffinity
+    except (OSError, AttributeError):
+        return False
+
+    mask = (ctypes.c_ulong * (_cpu_setsize // _ulong_bits))()
+    for cpu in cpus:
+        if 0 <= cpu < _cpu_setsize:
+            mask[cpu // _ulong_bits] |= 1 << (cpu % _ulong_bits)
+
+    return setaffinity(pid, ctypes.sizeof(mask), ctypes.byref(mask)) == 0
@@ -0,0 +1,111 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+Thread Pool Class
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+あらかじめ開始しておいたスレッドに処理を実行させる.
+処理毎にスレッドを作成しないので, 多数の処理が一度に来ても
+スレッドの作成にかかる時間やメモリ使用量が増えない.
+"""
+
+from Queue import Queue
+import threading
+import traceback
+import logging
+
+__all__ = ["ThreadPool"]
+
+#-------------------------------------------------------------------------------
+# ThreadPool
+#-------------------------------------------------------------------------------
+
+class ThreadPool(object):
+    u"""
+    size 個のスレッドを開始しておき, submit() された処理を順番に実行させる
+    クラス. 全てのスレッドが処理中の場合, 処理はキューで空くのを待つ.
+
+    stack_size を指定した場合は, スレッドのスタックの大きさをその
+    バイト数にする. 0 の場合はシステムのデフォルトになる.
+    """
+
+    def __init__(self, size, stack_size = 0, name = "ThreadPool"):
+        self.size       = size
+        self.stack_size = stack_size
+        self.name       = name
+        self.queue      = Queue()
+        self.threads    = [ ]
+        self.busy       = 0     # 処理を実行しているスレッドの数
+        self.lockobj    = threading.Lock()
+
+    def __str__(self):
+        return self.name
+
+    def start(self):
+        u"""
+        スレッドを開始する.
+        fork したプロセスにはスレッドが引き継がれないので,
+        fork した後のプロセスで呼ぶこと.
+        """
+        if self.threads: return
+
+        old = None
+        if self.stack_size:
+            try:
+                old = threading.stack_size(self.stack_size)
+            except (ValueError, threading.ThreadError), e:
+                logging.warning("%s can't set the stack size to %d: %s" %
+                                (self, self.stack_size, e))
+
+        try:
+            for i in xrange(self.size):
+                t = threading.Thread(target = self.worker_thread_proc)
+                t.setName("%s-%d" % (self, i))
+                t.setDaemon(1)
+                t.start()
+                self.threads.append(t)
+        finally:
+            if old is not None: threading.stack_size(old)
+
+        logging.debug("%s started %d threads." % (self, self.size))
+
+    def close(self):
+        u"""処理中のものが終わった後で, 全てのスレッドを終了させる."""
+        for t in self.threads:
+            self.queue.put(None)
+        self.threads = [ ]
+
+    def submit(self, func, *args):
+        u"""func(*args) をスレッドに実行させる."""
+        if self.busy >= self.size:
+            logging.debug("%s is saturated, %d tasks are waiting." %
+                          (self, self.queue.qsize() + 1))
+        self.queue.put((func, args))
+
+    def pending(self):
+        u"""スレッドが空くのを待っている処理の数を返す."""
+        return self.queue.qsize()
+
+    def worker_thread_proc(self):
+        u"""スレッド用プロシージャ"""
+        while True:
+            task = self.queue.get()
+            if task is None: return
+
+            func, args = task
+            self.add_busy(1)
+            try:
+                func(*args)
+            except:
+                logging.error("%s failed running a task:\n%s\n%s\n%s" %
+                    (self, "-"*40, traceback.format_exc().strip(), "-"*40))
+            self.add_busy(-1)
+
+    def add_busy(self, n):
+        u"""処理を実行しているスレッドの数に n を加える."""
+        self.lockobj.acquire()
+        try:
+            self.busy += n
+        finally:
+            self.lockobj.release()
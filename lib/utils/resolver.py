@@ -0,0 +1,105 @@
+﻿# -*- coding: utf_8 -*-
+u"""
+Host Name Resolver Class
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+IP アドレスからホスト名への逆引きを別スレッドで行い, 結果をキャッシュする.
+lookup() はブロッキングせず, 逆引きが済むまでは IP アドレスを返す.
+"""
+
+from Queue import Queue
+import threading
+import logging
+import socket
+import time
+
+__all__ = ["HostResolver"]
+
+#-------------------------------------------------------------------------------
+# HostResolver
+#-------------------------------------------------------------------------------
+
+class HostResolver(object):
+    u"""
+    IP アドレスのホスト名を非同期に逆引きしてキャッシュするクラス.
+
+    逆引きの結果は ttl 秒間キャッシュされ, 期限が切れると次の lookup() で
+    再び逆引きされる. 逆引きに失敗した場合も IP アドレスをキャッシュする.
+    enabled が偽の場合は逆引きを行わずに常に IP アドレスを返す.
+    """
+
+    # キャッシュする最大の件数
+    cache_max = 4096
+
+    def __init__(self, enabled = True, ttl = 3600):
+        self.enabled = enabled
+        self.ttl     = ttl
+        self.cache   = { }      # IP アドレス -> (ホスト名, 期限)
+        self.pending = set()
+        self.queue   = Queue()
+        self.lockobj = threading.Lock()
+        self.thread  = None
+
+    def lookup(self, ip):
+        u"""
+        キャッシュされている IP アドレスのホスト名を返す.
+        ない場合は逆引きを依頼して, IP アドレスをそのまま返す.
+        """
+        if not self.enabled: return ip
+
+        self.lockobj.acquire()
+        try:
+            name, expires = self.cache.get(ip, (ip, 0))
+            if expires < time.time() and ip not in self.pending:
+                self.pending.add(ip)
+                self.queue.put(ip)
+                self.start()
+        finally:
+            self.lockobj.release()
+
+        return name
+
+    def start(self):
+        u"""逆引きを行うスレッドを開始する."""
+        if self.thread: return
+        t = threading.Thread(target = self.resolver_thread_proc)
+        t.setName("HostResolver")
+        t.setDaemon(1)
+        t.start()
+        self.thread = t
+
+    def resolver_thread_proc(self):
+        u"""逆引き用スレッドプロシージャ"""
+        while True:
+            ip = self.queue.get()
+            name = self.resolve(ip)
+
+            self.lockobj.acquire()
+            try:
+                if len(self.cache) >= self.cache_max:
+                    self.expire()
+                self.cache[ip] = (name, time.time() + self.ttl)
+                self.pending.discard(ip)
+            finally:
+                self.lockobj.release()
+
+    def resolve(self, ip):
+        u"""IP アドレスを逆引きしてホスト名を返す. ブロッキングする."""
+        try:
+            return socket.gethostbyaddr(ip)[0]
+        except (socket.error, socket.herror, socket.gaierror), e:
+            logging.debug("HostResolver can't resolve %s: %s" % (ip, e))
+            return ip
+
+    def expire(self):
+        u"""
+        期限の切れたキャッシュを削除する.
+        それでも一杯の場合は全て削除する.
+        """
+        now = time.time()
+        for ip, (name, expires) in self.cache.items():
+            if expires < now: del self.cache[ip]
+        if len(self.cache) >= self.cache_max:
+            self.cache.clear()
@@ -1,103 +1,121 @@
-# -*- coding: utf_8 -*-
-u"""
-Make Index Plug-in
-
-Licensed under the MIT License.
-Copyright (c) 2007-2012 Kota Saito
-
-Reflec の中継状態を表す XML ファイルを作成します.
-Reflec を複数起動している場合, 複数の中継状態が
-1つの XML ファイルに書かれる事になります.
-"""
-
-import os
-import os.path
-import time
-import logging
-import threading
-from xml.etree.ElementTree import ElementTree, Element, SubElement
-
-from reflec.plugin import ReflecBasePlugin
-
-__all__ = ["MakeIndexPlugin"]
-
-__load__ = ["MakeIndexPlugin"]
-
-#-------------------------------------------------------------------------------
-# MakeIndexPlugin
-#-------------------------------------------------------------------------------
-
-class MakeIndexPlugin(ReflecBasePlugin):
-    u"""
-    Reflec でのミラー状況のインデックスファイルを作成するプラグイン.
-    """
-
-    # XML ファイルのエンコーディング
-    encoding = "utf-8"
-
-    # ロックを試す回数
-    lock_try = 3
-
-    def app_start(self, app):
-        self.lock = threading.Lock()
-        self.filename = self.app.abspath(
-            self.option.get("makeindex", "filename", "index.dat") )
-        self.server_address = "%s:%d" % self.server.server_address
-        self.start_time = time.strftime("%Y/%m/%d %H:%M:%S")
-        self.on_list = False
-
-    def client_start_streaming(self, client):
-        if not self.on_list:
-            self.on_list = True
-            self.emit()
-
-    def server_client_num(self, server):
-        if self.on_list:
-            self.emit()
-
-    def client_finish_streaming(self, app):
-        if self.on_list:
-            self.on_list = False
-            self.emit()
-
-    def emit(self, removal = False):
-        u"""
-        インデックスファイルを更新する.
-        """
-        self.lock.acquire()
-        try:
-            doc = None
-            if os.path.isfile(self.filename):
-                doc = ElementTree(file = self.filename)
-            else:
-                root = Element("index")
-                doc = ElementTree(root)
-
-            index = -1
-            for i, e in enumerate(doc.findall("live")):
-                if e.get("server", "") == self.server_address:
-                        index = i
-                        doc.getroot().remove(e)
-
-            if self.on_list:
-                doc.getroot().insert(index, self.live_element())
-
-            f = open(self.filename, "w")
-            f.write('<?xml version="1.0" encoding="%s"?>\n' % self.encoding)
-            doc.write(f, self.encoding)
-            f.close()
-        finally:
-            self.lock.release()
-
-    def live_element(self):
-        u"""
-        現在の状態を表す Element オブジェクトを作成して返す.
-        """
-        el = Element("live", server = self.server_address)
-        SubElement(el, "start").text = self.start_time
-        SubElement(el, "num").text = str(self.server.client_num)
-        SubElement(el, "max").text = str(self.server.client_max)
-        info = SubElement(el, "media")
-        for k, v in self.client.media_info.items():
-            SubElement(info, k).text = v
-        return el
+# -*- coding: utf_8 -*-
+u"""
+Make Index Plug-in
+
+Licensed under the MIT License.
+Copyright (c) 2007-2012 Kota Saito
+
+Reflec の中継状態を表す XML ファイルを作成します.
+Reflec を複数起動している場合や, チャンネルがある場合は, 複数の中継状態が
+1つの XML ファイルに書かれる事になります.
+"""
+
+import os
+import os.path
+import time
+import logging
+import threading
+from xml.etree.ElementTree import ElementTree, Element, SubElement
+
+from reflec.plugin import ReflecBasePlugin
+
+__all__ = ["MakeIndexPlugin"]
+
+__load__ = ["MakeIndexPlugin"]
+
+#-------------------------------------------------------------------------------
+# MakeIndexPlugin
+#-------------------------------------------------------------------------------
+
+class MakeIndexPlugin(ReflecBasePlugin):
+    u"""
+    Reflec でのミラー状況のインデックスファイルを作成するプラグイン.
+    """
+
+    # XML ファイルのエンコーディング
+    encoding = "utf-8"
+
+    # ロックを試す回数
+    lock_try = 3
+
+    def app_start(self, app):
+        self.lock = threading.Lock()
+        self.filename = self.app.abspath(
+            self.option.get("makeindex", "filename", "index.dat") )
+        self.start_time = time.strftime("%Y/%m/%d %H:%M:%S")
+        self.on_list = { }  # チャンネル名 -> インデックスに載せているかどうか
+
+    def client_start_streaming(self, client):
+        name = self.app.channel_name(client)
+        if not self.on_list.get(name):
+            self.on_list[name] = True
+            self.emit(name)
+
+    def server_client_num(self, server):
+        for name, on_list in self.on_list.items():
+            if on_list and self.app.channel_server(name) is server:
+                self.emit(name)
+
+    def client_change_media(self, client, old, new):
+        name = self.app.channel_name(client)
+        if self.on_list.get(name):
+            self.emit(name)
+
+    def client_finish_streaming(self, client):
+        name = self.app.channel_name(client)
+        if self.on_list.get(name):
+            self.on_list[name] = False
+            self.emit(name)
+
+    def live_address(self, name):
+        u"""
+        チャンネル name を配信しているアドレスを返す.
+        """
+        server = self.app.channel_server(name)
+        return "%s:%d%s" % (server.server_address[0],
+                            server.server_address[1],
+                            self.app.channel_path(name))
+
+    def emit(self, name = ""):
+        u"""
+        チャンネル name についてインデックスファイルを更新する.
+        """
+        self.lock.acquire()
+        try:
+            doc = None
+            if os.path.isfile(self.filename):
+                doc = ElementTree(file = self.filename)
+            else:
+                root = Element("index")
+                doc = ElementTree(root)
+
+            address = self.live_address(name)
+            index = -1
+            for i, e in enumerate(doc.findall("live")):
+                if e.get("server", "") == address:
+                        index = i
+                        doc.getroot().remove(e)
+
+            if self.on_list.get(name):
+                doc.getroot().insert(index, self.live_element(name))
+
+            f = open(self.filename, "w")
+            f.write('<?xml version="1.0" encoding="%s"?>\n' % self.encoding)
+            doc.write(f, self.encoding)
+            f.close()
+        finally:
+            self.lock.release()
+
+    def live_element(self, name = ""):
+        u"""
+        チャンネル name の現在の状態を表す Element オブジェクトを作成して返す.
+        """
+        server = self.app.channel_server(name)
+        el = Element("live", server = self.live_address(name))
+        SubElement(el, "start").text = self.start_time
+        SubElement(el, "num").text = str(server.total_client_num())
+        SubElement(el, "max").text = str(server.client_max)
+        info = SubElement(el, "media")
+        for k, v in self.app.channel_client(name).media_info.items():
+            SubElement(info, k).text = v
+        return el
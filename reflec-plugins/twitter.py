@@ -46,20 +46,24 @@ class TwitterPlugin(ReflecBasePlugin):
         self.msg = opt.msg_notify
 
     def client_start_streaming(self, client):
-        rating = self.client.media_info.get("rating", "").lower()
+        rating = client.media_info.get("rating", "").lower()
         if rating.find("yes") >= 0:
             logging.info("Twitter: Twitter notification is blocked by a user.")
             return
 
         info = self.info.copy()
-        for k, v in self.client.media_info.items():
+        for k, v in client.media_info.items():
             if isinstance(v, unicode):
                 v = v.encode(self.encoding)
             info[k] = v
 
-        info["host"] = self.server.server_address[0]
-        info["port"] = self.server.server_address[1]
-        info["address"] = "%s:%d" % (info["host"], info["port"])
+        # チャンネルの場合はそのチャンネルを配信しているアドレスにする
+        name = self.app.channel_name(client)
+        server = self.app.channel_server(name)
+        info["host"] = server.server_address[0]
+        info["port"] = server.server_address[1]
+        info["address"] = "%s:%d%s" % (info["host"], info["port"],
+                                       self.app.channel_path(name))
 
         try:
             self.twitter.accept_followers()